@@ -0,0 +1,128 @@
+"""Benchmark audio compression before upload and archival.
+
+Generates synthetic 16 kHz mono speech-like WAV files, encodes them with every
+configured codec and reports the size reduction, encode time and the estimated
+upload time on a slow link.
+
+Usage:
+    python -m benchmarks.bench_audio [--durations 60 600] [--uplink-kbps 1000]
+"""
+
+import argparse
+import json
+import math
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+from diane.audio import AUDIO_CODECS, AudioEncoder
+
+
+SAMPLE_RATE = 16000
+
+
+def write_synthetic_speech(path: Path, seconds: int, seed: int = 0) -> None:
+    """Write a deterministic speech-like signal (voiced bursts plus noise)."""
+    rng = random.Random(seed)
+    frames = bytearray()
+
+    for i in range(seconds * SAMPLE_RATE):
+        t = i / SAMPLE_RATE
+        # Syllable-rate envelope (~4 Hz) over a few formant-like partials
+        envelope = max(0.0, math.sin(2 * math.pi * 4 * t)) ** 2
+        voiced = (
+            math.sin(2 * math.pi * 140 * t)
+            + 0.5 * math.sin(2 * math.pi * 700 * t)
+            + 0.25 * math.sin(2 * math.pi * 1200 * t)
+        )
+        sample = 6000 * envelope * voiced + rng.gauss(0, 150)
+        frames += struct.pack('<h', max(-32768, min(32767, int(sample))))
+
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(bytes(frames))
+
+
+def upload_seconds(size_bytes: int, uplink_kbps: float) -> float:
+    """Estimate transfer time for a payload on the given uplink."""
+    return size_bytes * 8 / (uplink_kbps * 1000)
+
+
+def run(durations, uplink_kbps: float) -> dict:
+    """Run the benchmark and return machine-readable results."""
+    results = {
+        'benchmark': 'audio_compression',
+        'uplink_kbps': uplink_kbps,
+        'cases': [],
+    }
+
+    if shutil.which('ffmpeg') is None:
+        results['skipped'] = 'ffmpeg not found'
+        return results
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+
+        for seconds in durations:
+            wav_path = tmp / f"speech-{seconds}s.wav"
+            write_synthetic_speech(wav_path, seconds)
+            raw_size = wav_path.stat().st_size
+            raw_upload = upload_seconds(raw_size, uplink_kbps)
+
+            for codec in AUDIO_CODECS:
+                encoder = AudioEncoder(codec=codec)
+                start = time.perf_counter()
+                success, msg, encoded_path = encoder.encode(wav_path, output_dir=tmp / codec)
+                encode_time = time.perf_counter() - start
+
+                if not success:
+                    results['cases'].append({
+                        'duration_s': seconds, 'codec': codec, 'error': msg,
+                    })
+                    continue
+
+                size = encoded_path.stat().st_size
+                encoded_upload = upload_seconds(size, uplink_kbps)
+                results['cases'].append({
+                    'duration_s': seconds,
+                    'codec': codec,
+                    'raw_bytes': raw_size,
+                    'encoded_bytes': size,
+                    'size_ratio': round(size / raw_size, 4),
+                    'encode_s': round(encode_time, 4),
+                    'raw_upload_s': round(raw_upload, 3),
+                    'encoded_upload_s': round(encoded_upload, 3),
+                    'wall_time_saved_s': round(raw_upload - encoded_upload - encode_time, 3),
+                })
+
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--durations', type=int, nargs='+', default=[60, 600],
+                        help='Recording lengths in seconds (default: 60 600)')
+    parser.add_argument('--uplink-kbps', type=float, default=1000,
+                        help='Uplink speed used to estimate upload time (default: 1000)')
+    parser.add_argument('--output', '-o', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.durations, args.uplink_kbps)
+    payload = json.dumps(results, indent=2)
+
+    if args.output:
+        Path(args.output).write_text(payload + '\n', encoding='utf-8')
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
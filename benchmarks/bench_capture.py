@@ -0,0 +1,96 @@
+"""Stress high-rate capture: parallel processes and threads saving records.
+
+Every capture uses the same text, the worst case for filename collisions.
+Reports captures per second and how many records were lost (must be 0);
+with ``--git`` also how many were committed and how many were left pending
+for the next commit (every capture commits under the repository lock).
+
+Usage:
+    python -m benchmarks.bench_capture [--processes 4] [--threads 4] [--per-worker 500]
+"""
+
+import argparse
+import multiprocessing
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from diane.config import config
+from diane.record import Record
+from diane.storage import Storage
+
+from .harness import write_results
+
+
+def _capture_process(records_dir: str, threads: int, per_worker: int, use_git: bool) -> int:
+    config.use_git = use_git
+    config.auto_sync = False
+    storage = Storage(Path(records_dir))
+
+    def capture(_):
+        for _ in range(per_worker):
+            storage.save(Record("same clipboard text", sources=["clipboard"]))
+        return per_worker
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return sum(pool.map(capture, range(threads)))
+
+
+def run(processes: int, threads: int, per_worker: int, use_git: bool) -> dict:
+    with tempfile.TemporaryDirectory(prefix='diane-capture-') as tmpdir:
+        records_dir = Path(tmpdir) / 'records'
+        config.use_git = use_git
+        Storage(records_dir)  # Initialize (and git init) once up front
+
+        start = time.perf_counter()
+        with multiprocessing.Pool(processes) as pool:
+            saved = sum(pool.starmap(
+                _capture_process,
+                [(str(records_dir), threads, per_worker, use_git)] * processes
+            ))
+        elapsed = time.perf_counter() - start
+
+        on_disk = len(list(records_dir.glob('*.md')))
+        if use_git:
+            tracked = subprocess.run(['git', 'ls-files', '*.md'], cwd=records_dir,
+                                     capture_output=True, text=True).stdout.split()
+            pending = bool(Storage(records_dir).pending)
+
+    expected = processes * threads * per_worker
+    result = {
+        'name': 'capture_stress',
+        'processes': processes,
+        'threads': threads,
+        'git': use_git,
+        'expected': expected,
+        'saved': saved,
+        'on_disk': on_disk,
+        'lost': expected - on_disk,
+        'elapsed_s': round(elapsed, 4),
+        'captures_per_s': round(expected / elapsed, 1),
+    }
+    if use_git:
+        result['committed'] = len(tracked)
+        result['pending_left'] = pending
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--per-worker', type=int, default=500)
+    parser.add_argument('--git', action='store_true', help='Commit every capture to git')
+    parser.add_argument('--output', '-o', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    result = run(args.processes, args.threads, args.per_worker, args.git)
+    write_results('capture', [result], args.output)
+    return 1 if result['lost'] or result.get('pending_left') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
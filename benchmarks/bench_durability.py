@@ -0,0 +1,70 @@
+"""Benchmark Storage.save throughput per durability mode.
+
+Runs with git disabled so the numbers isolate the write path: atomic
+temp-file + rename, plus the fsync policy of each DIANE_DURABILITY mode.
+
+Usage:
+    python -m benchmarks.bench_durability [--count 2000] [--group-ms 50]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from diane.config import config
+from diane.durability import DURABILITY_MODES, get_group_committer
+from diane.storage import Storage
+
+from .generate import generate_records
+from .harness import data_home, write_results
+
+
+def bench_mode(mode: str, records, group_ms: int) -> dict:
+    """Save every record in ``mode``; includes the final group flush."""
+    with tempfile.TemporaryDirectory(prefix='diane-durability-') as tmpdir:
+        with data_home(Path(tmpdir)):
+            config.durability = mode
+            config.group_fsync_ms = group_ms
+            storage = Storage()
+
+            start = time.perf_counter()
+            for record in records:
+                storage.save(record)
+            storage.flush()
+            elapsed = time.perf_counter() - start
+
+    result = {
+        'name': f'save_{mode}',
+        'mode': mode,
+        'records': len(records),
+        'elapsed_s': round(elapsed, 4),
+        'records_per_s': round(len(records) / elapsed, 1),
+    }
+    if mode == 'group':
+        result['group_ms'] = group_ms
+        result['fsync_batches'] = get_group_committer().batches
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', '-n', type=int, default=2000, help='Records to save per mode')
+    parser.add_argument('--group-ms', type=int, default=50, help='Group fsync window (ms)')
+    parser.add_argument('--output', '-o', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    records = list(generate_records(args.count, seed=7))
+    saved_mode = config.durability
+    try:
+        results = [bench_mode(mode, records, args.group_ms) for mode in DURABILITY_MODES]
+    finally:
+        config.durability = saved_mode
+
+    write_results('durability', results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
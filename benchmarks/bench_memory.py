@@ -0,0 +1,91 @@
+"""Compare peak RSS of full-archive stats/export: materialized vs streamed.
+
+Each case runs in a fresh interpreter so ``ru_maxrss`` is its own peak.
+
+Usage:
+    python -m benchmarks.bench_memory [--size 100000]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from .generate import generate_archive
+from .harness import write_results
+
+
+CASES = {
+    'stats_list': (
+        "from diane.stats import Statistics\n"
+        "Statistics(storage.list_records()).summary()\n"
+    ),
+    'stats_stream': (
+        "from diane.stats import Statistics\n"
+        "Statistics(storage.iter_records()).summary()\n"
+    ),
+    'export_json_list': (
+        "from diane.export import Exporter\n"
+        "import io\n"
+        "io.StringIO().write(Exporter.to_json(storage.list_records()))\n"
+    ),
+    'export_json_stream': (
+        "from diane.export import Exporter\n"
+        "import os\n"
+        "with open(os.devnull, 'w') as f:\n"
+        "    Exporter.write_export(Exporter.iter_json(storage.iter_records()), f)\n"
+    ),
+}
+
+PRELUDE = (
+    "import resource, sys\n"
+    "from diane.config import config\n"
+    "config.use_git = False\n"
+    "from diane.storage import Storage\n"
+    "storage = Storage()\n"
+    "baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+)
+
+EPILOGUE = (
+    "peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+    "print(baseline, peak)\n"
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=100000, help='Archive size')
+    parser.add_argument('--output', '-o', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='diane-memory-') as tmpdir:
+        home = Path(tmpdir)
+        generate_archive(home / 'records', args.size)
+        env = dict(os.environ, DIANE_DATA_HOME=str(home))
+
+        for name, code in CASES.items():
+            output = subprocess.run(
+                [sys.executable, '-c', PRELUDE + code + EPILOGUE],
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True
+            ).stdout.split()
+            baseline_kb, peak_kb = int(output[0]), int(output[1])
+            results.append({
+                'name': name,
+                'size': args.size,
+                'baseline_rss_kb': baseline_kb,
+                'peak_rss_kb': peak_kb,
+                'growth_kb': peak_kb - baseline_kb,
+            })
+
+    write_results('memory', results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
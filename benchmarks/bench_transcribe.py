@@ -0,0 +1,87 @@
+"""Compare transcription backends by latency and real-time factor.
+
+The first call per backend is reported separately because local backends load
+their model on it; later calls reuse the resident model.
+
+Usage:
+    python -m benchmarks.bench_transcribe \\
+        --backends faster-whisper:base.en whisper.cpp:~/models/ggml-base.en.bin \\
+        [--audio memo.wav ...] [--repeat 3]
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+from diane.audio import get_audio_transcriber
+
+from .bench_audio import write_synthetic_speech
+
+
+def bench_backend(spec: str, audio_files, repeat: int) -> dict:
+    """Transcribe every file ``repeat`` times with one backend."""
+    transcriber = get_audio_transcriber(spec)
+    result = {'backend': spec}
+
+    if not transcriber.is_available():
+        result['skipped'] = transcriber.unavailable_reason()
+        return result
+
+    runs = []
+    for audio_path in audio_files:
+        for _ in range(repeat):
+            success, msg, _ = transcriber.transcribe(audio_path)
+            if not success:
+                result['error'] = msg
+                return result
+            runs.append(dict(transcriber.last_stats, file=audio_path.name))
+
+    cold, warm = runs[0], runs[1:] or runs
+    result.update({
+        'runs': len(runs),
+        'cold_latency_s': round(cold['latency_s'], 4),
+        'warm_latency_median_s': round(statistics.median(r['latency_s'] for r in warm), 4),
+        'warm_rtf_median': (
+            round(statistics.median(r['rtf'] for r in warm), 4)
+            if all(r['rtf'] is not None for r in warm) else None
+        ),
+        'samples': runs,
+    })
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', required=True,
+                        help='DIANE_TRANSCRIBE_MODEL specs to compare')
+    parser.add_argument('--audio', nargs='*', default=[],
+                        help='Audio files (default: a 30s synthetic clip)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per file (default: 3)')
+    parser.add_argument('--output', '-o', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        audio_files = [Path(p) for p in args.audio]
+        if not audio_files:
+            synthetic = Path(tmpdir) / 'synthetic-30s.wav'
+            write_synthetic_speech(synthetic, 30)
+            audio_files = [synthetic]
+
+        results = {
+            'benchmark': 'transcription',
+            'results': [bench_backend(spec, audio_files, args.repeat) for spec in args.backends],
+        }
+
+    payload = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + '\n', encoding='utf-8')
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
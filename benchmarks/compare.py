@@ -0,0 +1,48 @@
+"""Compare two benchmark result files and flag regressions.
+
+Usage:
+    python -m benchmarks.compare BASELINE.json CURRENT.json [--threshold 0.10]
+
+Exits with status 1 when any benchmark's median time regressed by more than
+the threshold.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def load(path: str) -> dict:
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    return {(r['name'], r.get('size')): r for r in data['results'] if 'median_s' in r}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='Allowed relative slowdown (default: 0.10)')
+    args = parser.parse_args(argv)
+
+    baseline = load(args.baseline)
+    current = load(args.current)
+    regressions = 0
+
+    for key in sorted(set(baseline) & set(current), key=lambda k: (k[1] or 0, k[0])):
+        before = baseline[key]['median_s']
+        after = current[key]['median_s']
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        name, size = key
+        print(f"{name:<20} {size or '':>7}  {before:>10.4f}s -> {after:>10.4f}s  {change:+7.1%}{flag}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
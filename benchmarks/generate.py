@@ -0,0 +1,151 @@
+"""Deterministic synthetic record archives for benchmarks.
+
+Archives are written straight to disk (no git) in the same on-disk format as
+``Storage.save``. The same ``seed`` and ``count`` always produce byte-identical
+archives, so results are comparable between runs and releases.
+
+Usage:
+    python -m benchmarks.generate DIR --count 10000 [--seed 0]
+"""
+
+import argparse
+import random
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from diane.record import Record, format_record_id
+
+
+WORDS = (
+    "meeting idea project call remember buy read article book review draft "
+    "todo follow up client design bug fix release deploy server database "
+    "coffee walk music dream thought question answer plan week month year "
+    "garden kitchen train station ticket budget invoice email reply notes "
+    "architecture async rust python git sync backup archive search index "
+    "the a of and to in is it for on with as at by from this that be or"
+).split()
+
+TAGS = ["work", "personal", "ideas", "todo", "reading", "journal", "work/urgent"]
+
+# (sources, weight) - mirrors the capture paths diane actually uses
+SOURCES = [
+    (["stdin"], 70),
+    (["clipboard"], 15),
+    (["audio-recording"], 8),
+    (["audio-file"], 2),
+    (["stdin", "editor"], 5),
+]
+
+START = datetime(2021, 1, 1, 8, 0, 0)
+
+
+def _word_count(rng: random.Random) -> int:
+    """Log-normal note length: mostly one-liners, a long tail of essays."""
+    return max(1, min(2000, int(rng.lognormvariate(2.8, 1.0))))
+
+
+def _content(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(_word_count(rng))]
+    lines = []
+    # Break longer notes into lines of ~12 words
+    for i in range(0, len(words), 12):
+        lines.append(' '.join(words[i:i + 12]))
+    return '\n'.join(lines).capitalize()
+
+
+def generate_records(count: int, seed: int = 0):
+    """Yield ``count`` deterministic records in chronological order."""
+    rng = random.Random(seed)
+    source_choices = [s for s, _ in SOURCES]
+    source_weights = [w for _, w in SOURCES]
+
+    # Spread captures over ~4 years regardless of archive size
+    mean_gap = (4 * 365 * 24 * 3600) / max(count, 1)
+    timestamp = START
+
+    for i in range(count):
+        timestamp += timedelta(seconds=max(1, int(rng.expovariate(1 / mean_gap))))
+        sources = rng.choices(source_choices, source_weights)[0]
+
+        audio_file = None
+        if sources[0].startswith('audio') and rng.random() < 0.5:
+            audio_file = f"audio/diane-recording-{timestamp:%Y%m%d-%H%M%S}.ogg"
+
+        tags = rng.sample(TAGS, rng.randint(1, 2)) if rng.random() < 0.2 else None
+
+        yield Record(
+            content=_content(rng),
+            timestamp=timestamp,
+            sources=list(sources),
+            audio_file=audio_file,
+            tags=tags,
+            # Fixed tag keeps IDs (and so filenames) identical between runs
+            record_id=format_record_id(timestamp, tag='0000'),
+        )
+
+
+def _legacy_markdown(record: Record) -> str:
+    """Render a record the way diane wrote it before record IDs."""
+    lines = ['---', f"timestamp: {record.timestamp:%Y-%m-%d %H:%M}"]
+    if record.tags:
+        lines.append('tags:')
+        lines.extend(f"- {tag}" for tag in record.tags)
+    lines.append('sources:')
+    lines.extend(f"- {source}" for source in record.sources)
+    if record.audio_file:
+        lines.append(f"audio: {record.audio_file}")
+    lines.append('---')
+    return '\n'.join(lines) + f"\n\n{record.content}\n"
+
+
+def generate_archive(records_dir: Path, count: int, seed: int = 0) -> int:
+    """Write a synthetic archive into ``records_dir``.
+
+    About 30% of records use the pre-ID layout (second-resolution filename,
+    minute-resolution timestamp, no ``id`` key) and about 1% have no
+    frontmatter at all, like notes dropped into the directory by hand.
+
+    Returns:
+        Number of files written
+    """
+    records_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed + 1)
+    written = 0
+
+    for record in generate_records(count, seed):
+        variant = rng.random()
+        filepath = record.get_filename(records_dir)
+
+        if variant < 0.01:
+            text = record.content + '\n'
+        elif variant < 0.30:
+            filepath = records_dir / filepath.name.replace(record.id, f"{record.timestamp:%Y-%m-%d--%H-%M-%S}")
+            text = _legacy_markdown(record)
+        else:
+            text = record.to_markdown()
+
+        if filepath.exists():
+            # Same second and same first words: disambiguate like a human would
+            filepath = filepath.with_name(f"{filepath.stem}-{written}{filepath.suffix}")
+
+        filepath.write_text(text, encoding='utf-8')
+        written += 1
+
+    return written
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('records_dir', type=Path, help='Directory to fill')
+    parser.add_argument('--count', '-n', type=int, default=1000, help='Number of records')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    args = parser.parse_args(argv)
+
+    written = generate_archive(args.records_dir, args.count, args.seed)
+    print(f"Wrote {written} records to {args.records_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Shared timing and reporting helpers for diane benchmarks."""
+
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import diane
+from diane.config import config
+
+
+def measure(fn: Callable[[], object], repeat: int = 3, warmup: int = 0) -> Dict[str, float]:
+    """Time ``fn`` several times and summarize wall-clock seconds.
+
+    Garbage collection is disabled while timing so collector pauses do not
+    land on a random repetition.
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+    return {
+        'min_s': round(min(samples), 6),
+        'median_s': round(statistics.median(samples), 6),
+        'mean_s': round(statistics.mean(samples), 6),
+        'repeat': repeat,
+    }
+
+
+@contextmanager
+def data_home(path: Path, use_git: bool = False):
+    """Point the global diane config at ``path`` for the duration of a block."""
+    saved = (config.data_home, config.records_dir, config.audio_dir,
+             config.use_git, config.auto_sync)
+    config.data_home = path
+    config.records_dir = path / 'records'
+    config.audio_dir = config.records_dir / 'audio'
+    config.use_git = use_git
+    config.auto_sync = False
+    try:
+        yield config.records_dir
+    finally:
+        (config.data_home, config.records_dir, config.audio_dir,
+         config.use_git, config.auto_sync) = saved
+
+
+def environment() -> Dict[str, Optional[str]]:
+    """Describe the machine and code under test."""
+    try:
+        git_rev = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        git_rev = None
+
+    return {
+        'diane_version': diane.__version__,
+        'git_rev': git_rev,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': str(os.cpu_count()),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def write_results(name: str, results: List[Dict], output: Optional[str]) -> None:
+    """Emit a benchmark report as JSON to ``output`` or stdout."""
+    payload = json.dumps({
+        'benchmark': name,
+        'environment': environment(),
+        'results': results,
+    }, indent=2)
+
+    if output:
+        Path(output).write_text(payload + '\n', encoding='utf-8')
+    else:
+        print(payload)
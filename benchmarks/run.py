@@ -0,0 +1,185 @@
+"""Run the diane storage/search/stats/export benchmark suite.
+
+Each archive size is generated once (deterministically) into a temporary data
+home, then every benchmark runs against it. Results are JSON so they can be
+stored per release and compared with ``python -m benchmarks.compare``.
+
+Usage:
+    python -m benchmarks.run [--sizes 1000 10000 100000] [--repeat 3]
+                             [--only search export] [--output results.json]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+from diane.export import Exporter
+from diane.stats import Statistics
+from diane.storage import Storage
+
+from .generate import generate_archive, generate_records
+from .harness import data_home, measure, write_results
+
+
+DEFAULT_SIZES = [1000, 10000]
+SAVE_COUNT = 500  # Records written by the save-throughput benchmark
+
+
+def bench_save(ctx):
+    """Storage.save throughput into a fresh store (git disabled)."""
+    records = list(generate_records(SAVE_COUNT, seed=42))
+
+    def run():
+        with tempfile.TemporaryDirectory() as tmpdir:
+            storage = Storage(Path(tmpdir) / 'records')
+            for record in records:
+                storage.save(record)
+
+    stats = measure(run, ctx['repeat'])
+    stats['records_per_s'] = round(SAVE_COUNT / stats['median_s'], 1)
+    return stats
+
+
+def bench_list_all(ctx):
+    return measure(lambda: ctx['storage'].list_records(), ctx['repeat'])
+
+
+def bench_list_limit(ctx):
+    return measure(lambda: ctx['storage'].list_records(limit=10), ctx['repeat'])
+
+
+def bench_list_since(ctx):
+    since = ctx['newest'] - timedelta(days=30)
+    return measure(lambda: ctx['storage'].list_records(since=since), ctx['repeat'])
+
+
+def bench_search(ctx):
+    return measure(lambda: ctx['storage'].search('architecture'), ctx['repeat'])
+
+
+def bench_regex_search(ctx):
+    return measure(lambda: ctx['storage'].regex_search(r'architect\w*'), ctx['repeat'])
+
+
+def bench_rank_search(ctx):
+    """BM25 top-10 with a warm (already built) term index."""
+    ctx['storage'].rank_search('architecture')
+    return measure(lambda: ctx['storage'].rank_search('architecture'), ctx['repeat'])
+
+
+def bench_related(ctx):
+    """TF-IDF top-10 for the newest record, index built (lookup only)."""
+    storage = ctx['storage']
+    name = storage.find_name(ctx['records'][0].id)
+    storage.related(name)
+    return measure(lambda: storage.related(name, refresh=False), ctx['repeat'])
+
+
+def bench_semantic_search(ctx):
+    """Top-10 by embedding cosine, index built (no-op refresh + lookup)."""
+    storage = ctx['storage']
+    storage.semantic_search('architektur')
+    return measure(lambda: storage.semantic_search('architektur'), ctx['repeat'])
+
+
+def bench_fuzzy_search(ctx):
+    return measure(lambda: ctx['storage'].fuzzy_search('architektur'), ctx['repeat'])
+
+
+def bench_stats_summary(ctx):
+    def run():
+        Statistics(ctx['storage'].list_records()).summary()
+    return measure(run, ctx['repeat'])
+
+
+def _bench_export(fmt):
+    def bench(ctx):
+        records = ctx['records']
+        exporter = getattr(Exporter, f'to_{fmt}')
+        return measure(lambda: exporter(records), ctx['repeat'])
+    bench.__name__ = f'bench_export_{fmt}'
+    return bench
+
+
+def bench_cli_cold_start(ctx):
+    """Fresh interpreter running ``diane show -n 10`` against the archive."""
+    env = dict(os.environ, DIANE_DATA_HOME=str(ctx['data_home']))
+    cmd = [sys.executable, '-m', 'diane.cli', 'show', '-n', '10']
+
+    def run():
+        subprocess.run(cmd, env=env, check=True, capture_output=True, stdin=subprocess.DEVNULL)
+    return measure(run, ctx['repeat'])
+
+
+BENCHMARKS = {
+    'save': bench_save,
+    'list_all': bench_list_all,
+    'list_limit': bench_list_limit,
+    'list_since': bench_list_since,
+    'search': bench_search,
+    'regex_search': bench_regex_search,
+    'rank_search': bench_rank_search,
+    'related': bench_related,
+    'semantic_search': bench_semantic_search,
+    'fuzzy_search': bench_fuzzy_search,
+    'stats_summary': bench_stats_summary,
+    'export_json': _bench_export('json'),
+    'export_csv': _bench_export('csv'),
+    'export_html': _bench_export('html'),
+    'export_markdown': _bench_export('markdown'),
+    'cli_cold_start': bench_cli_cold_start,
+}
+
+
+def run_suite(sizes, repeat, only=None, seed=0):
+    """Run the selected benchmarks for each archive size."""
+    selected = {name: fn for name, fn in BENCHMARKS.items()
+                if not only or any(name.startswith(prefix) for prefix in only)}
+    results = []
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory(prefix='diane-bench-') as tmpdir:
+            home = Path(tmpdir)
+            with data_home(home) as records_dir:
+                generate_archive(records_dir, size, seed)
+                storage = Storage()
+                records = storage.list_records()
+                ctx = {
+                    'repeat': repeat,
+                    'size': size,
+                    'data_home': home,
+                    'storage': storage,
+                    'records': records,
+                    'newest': records[0].timestamp,
+                }
+
+                for name, bench in selected.items():
+                    print(f"  {size:>7} {name}...", file=sys.stderr)
+                    result = {'name': name, 'size': size}
+                    result.update(bench(ctx))
+                    results.append(result)
+
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Archive sizes (default: 1000 10000; add 100000 for release runs)')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetitions per benchmark')
+    parser.add_argument('--only', nargs='*', help='Benchmark name prefixes to run')
+    parser.add_argument('--seed', type=int, default=0, help='Archive generator seed')
+    parser.add_argument('--output', '-o', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.repeat, args.only, args.seed)
+    write_results('suite', results, args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,33 @@
-"""Audio recording and transcription for diane."""
+"""Audio recording and transcription for diane.
 
+Transcription backends are selected with ``DIANE_TRANSCRIBE_MODEL``:
+
+- ``openai:whisper-1`` (default) - OpenAI Whisper API, needs OPENAI_API_KEY
+- ``faster-whisper:<size>`` - local CPU model via faster-whisper (int8)
+- ``whisper.cpp:<path/to/ggml-model.bin>`` - local whisper.cpp binary
+"""
+
+import importlib.util
 import os
 import subprocess
 import tempfile
+import time
+import wave
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 import shutil
 
+from . import trace
+from .config import config
+
+
+# Codec name -> (file extension, ffmpeg encoder arguments)
+AUDIO_CODECS = {
+    'opus': ('ogg', ['-c:a', 'libopus', '-application', 'voip']),
+    'flac': ('flac', ['-c:a', 'flac', '-compression_level', '8']),
+}
+
 
 class AudioRecorder:
     """Handle audio recording with auto-detection of available tools."""
@@ -249,58 +269,136 @@ class AudioRecorder:
             return False, f"ffmpeg error: {e}", None
 
 
-class AudioTranscriber:
-    """Handle audio transcription using OpenAI Whisper API."""
+class AudioEncoder:
+    """Compress recorded audio with ffmpeg before upload and archival."""
 
-    def __init__(self):
-        self.api_key = os.environ.get('OPENAI_API_KEY')
-        self.model = os.environ.get('DIANE_TRANSCRIBE_MODEL', 'gpt-4o-audio-preview')
+    def __init__(self, codec: Optional[str] = None, bitrate: Optional[str] = None):
+        self.codec = (codec or config.audio_codec).lower()
+        self.bitrate = bitrate or config.audio_bitrate
+        self.ffmpeg = shutil.which('ffmpeg')
 
     def is_available(self) -> bool:
-        """Check if transcription is available (API key configured)."""
-        return self.api_key is not None
+        """Check if encoding is enabled and ffmpeg is installed."""
+        return self.codec in AUDIO_CODECS and self.ffmpeg is not None
 
-    def transcribe(self, audio_path: Path) -> Tuple[bool, str, Optional[str]]:
-        """Transcribe audio file to text.
+    def get_extension(self) -> str:
+        """Get the file extension produced by the configured codec."""
+        if self.codec in AUDIO_CODECS:
+            return AUDIO_CODECS[self.codec][0]
+        return 'wav'
+
+    def is_encoded(self, audio_path: Path) -> bool:
+        """Check if a file is already in the configured output format."""
+        return audio_path.suffix.lstrip('.').lower() == self.get_extension()
+
+    def encode(
+        self,
+        audio_path: Path,
+        output_dir: Optional[Path] = None
+    ) -> Tuple[bool, str, Optional[Path]]:
+        """Encode an audio file with the configured codec.
+
+        The source file is left untouched; callers decide whether to remove it.
 
         Args:
-            audio_path: Path to audio file
+            audio_path: Path to the source audio file
+            output_dir: Directory for the encoded file (default: next to source)
 
         Returns:
-            Tuple of (success, message, transcription_text)
+            Tuple of (success, message, encoded_file_path)
         """
         if not self.is_available():
-            return False, "OPENAI_API_KEY not set. Set it to enable transcription.", None
+            return False, f"Audio encoding unavailable (codec: {self.codec})", None
 
         if not audio_path.exists():
             return False, f"Audio file not found: {audio_path}", None
 
-        try:
-            import openai
-        except ImportError:
-            return False, "openai package not installed. Run: pip install openai", None
+        extension, codec_args = AUDIO_CODECS[self.codec]
+        output_dir = output_dir or audio_path.parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = output_dir / f"{audio_path.stem}.{extension}"
+
+        cmd = [self.ffmpeg, '-y', '-nostdin', '-i', str(audio_path)]
+        cmd.extend(codec_args)
+        if self.codec == 'opus':
+            cmd.extend(['-b:a', self.bitrate])
+        cmd.append(str(output_path))
 
         try:
-            client = openai.OpenAI(api_key=self.api_key)
+            trace.run(cmd, check=True, capture_output=True)
+        except (subprocess.CalledProcessError, FileNotFoundError) as e:
+            return False, f"ffmpeg encode error: {e}", None
 
-            # Read audio file
-            with open(audio_path, 'rb') as audio_file:
-                # Use Whisper API for transcription
-                response = client.audio.transcriptions.create(
-                    model="whisper-1",  # Whisper model
-                    file=audio_file,
-                    response_format="text"
-                )
+        if output_path.exists() and output_path.stat().st_size > 0:
+            return True, f"Encoded to {output_path.name}", output_path
+        return False, "Encoding failed - empty file", None
 
-            transcription = response.strip()
 
-            if transcription:
-                return True, "Transcription successful", transcription
-            else:
-                return False, "Transcription returned empty result", None
+class Transcriber:
+    """Base class for transcription backends.
+
+    Subclasses implement ``_transcribe``; this class handles validation,
+    timing and real-time-factor reporting so backends can be compared.
+    """
 
+    name = 'base'
+    uploads_audio = False  # True for backends that send audio over the network
+
+    def __init__(self, model: str):
+        self.model = model
+        self.last_stats: Dict[str, Optional[float]] = {}
+
+    def is_available(self) -> bool:
+        """Check if this backend can transcribe."""
+        raise NotImplementedError
+
+    def unavailable_reason(self) -> str:
+        """Explain how to make this backend available."""
+        return f"{self.name} transcription backend is not available"
+
+    def _transcribe(self, audio_path: Path) -> str:
+        """Return the transcription text, raising on backend errors."""
+        raise NotImplementedError
+
+    def transcribe(self, audio_path: Path) -> Tuple[bool, str, Optional[str]]:
+        """Transcribe audio file to text.
+
+        Timing is recorded in ``last_stats``: ``latency_s``, ``audio_s`` and
+        ``rtf`` (latency divided by audio duration; below 1.0 is faster than
+        real time).
+
+        Args:
+            audio_path: Path to audio file
+
+        Returns:
+            Tuple of (success, message, transcription_text)
+        """
+        if not self.is_available():
+            return False, self.unavailable_reason(), None
+
+        if not audio_path.exists():
+            return False, f"Audio file not found: {audio_path}", None
+
+        start = time.perf_counter()
+        try:
+            with trace.span('transcribe', backend=self.name, model=self.model):
+                transcription = (self._transcribe(audio_path) or '').strip()
+        except ImportError as e:
+            return False, f"{self.name} backend not installed: {e}", None
         except Exception as e:
             return False, f"Transcription error: {e}", None
+        finally:
+            latency = time.perf_counter() - start
+            audio_seconds = get_audio_duration(audio_path)
+            self.last_stats = {
+                'latency_s': latency,
+                'audio_s': audio_seconds,
+                'rtf': latency / audio_seconds if audio_seconds else None,
+            }
+
+        if transcription:
+            return True, "Transcription successful", transcription
+        return False, "Transcription returned empty result", None
 
     def transcribe_and_cleanup(
         self,
@@ -335,11 +433,241 @@ class AudioTranscriber:
         return success, msg, transcription
 
 
+class AudioTranscriber(Transcriber):
+    """Handle audio transcription using OpenAI Whisper API."""
+
+    name = 'openai'
+    uploads_audio = True
+
+    def __init__(self, model: str = 'whisper-1'):
+        super().__init__(model)
+        self.api_key = os.environ.get('OPENAI_API_KEY')
+
+    def is_available(self) -> bool:
+        """Check if transcription is available (API key configured)."""
+        return self.api_key is not None
+
+    def unavailable_reason(self) -> str:
+        return "OPENAI_API_KEY not set. Set it to enable transcription."
+
+    def _transcribe(self, audio_path: Path) -> str:
+        import openai
+
+        # Compress raw recordings so only the encoded audio goes over the wire
+        upload_path = audio_path
+        upload_dir = None
+        encoder = get_audio_encoder()
+        if audio_path.suffix.lower() == '.wav' and encoder.is_available():
+            upload_dir = Path(tempfile.mkdtemp(prefix='diane-upload-'))
+            encoded, _, encoded_path = encoder.encode(audio_path, output_dir=upload_dir)
+            if encoded:
+                upload_path = encoded_path
+
+        try:
+            client = openai.OpenAI(api_key=self.api_key)
+
+            # Read audio file
+            with open(upload_path, 'rb') as audio_file:
+                response = client.audio.transcriptions.create(
+                    model=self.model,
+                    file=audio_file,
+                    response_format="text"
+                )
+            return response
+
+        finally:
+            if upload_dir is not None:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+def whisper_threads(default: int) -> int:
+    """CPU threads for local transcription (``DIANE_WHISPER_THREADS``).
+
+    Raises:
+        ValueError: If the variable is not a non-negative integer
+    """
+    value = os.environ.get('DIANE_WHISPER_THREADS', '').strip()
+    if not value:
+        return default
+    try:
+        threads = int(value)
+    except ValueError:
+        threads = -1
+    if threads < 0:
+        raise ValueError(f"DIANE_WHISPER_THREADS must be a non-negative integer, got {value!r}")
+    return threads
+
+
+class FasterWhisperTranscriber(Transcriber):
+    """Local CPU transcription with faster-whisper (CTranslate2, int8)."""
+
+    name = 'faster-whisper'
+
+    def __init__(self, model: str = 'base.en'):
+        super().__init__(model)
+        self.compute_type = os.environ.get('DIANE_WHISPER_COMPUTE_TYPE', 'int8')
+        # 0 lets CTranslate2 pick
+        self.threads = whisper_threads(0)
+        self._model = None  # Loaded once, kept resident across calls
+
+    def is_available(self) -> bool:
+        return importlib.util.find_spec('faster_whisper') is not None
+
+    def unavailable_reason(self) -> str:
+        return "faster-whisper not installed. Run: pip install faster-whisper"
+
+    def load(self):
+        """Load the model (idempotent)."""
+        if self._model is None:
+            from faster_whisper import WhisperModel
+
+            self._model = WhisperModel(
+                self.model,
+                device='cpu',
+                compute_type=self.compute_type,
+                cpu_threads=self.threads,
+            )
+        return self._model
+
+    def _transcribe(self, audio_path: Path) -> str:
+        segments, _ = self.load().transcribe(str(audio_path), beam_size=1)
+        return ' '.join(segment.text.strip() for segment in segments)
+
+
+class WhisperCppTranscriber(Transcriber):
+    """Local CPU transcription with a whisper.cpp binary and a ggml model file."""
+
+    name = 'whisper.cpp'
+
+    def __init__(self, model: str):
+        super().__init__(model)
+        self.binary = os.environ.get('DIANE_WHISPER_CPP_BIN') or next(
+            (tool for tool in ('whisper-cli', 'whisper-cpp', 'whisper.cpp') if shutil.which(tool)),
+            None
+        )
+        self.threads = str(whisper_threads(0) or os.cpu_count() or 4)
+
+    def is_available(self) -> bool:
+        return self.binary is not None and Path(self.model).expanduser().exists()
+
+    def unavailable_reason(self) -> str:
+        if self.binary is None:
+            return "whisper.cpp binary not found. Install it or set DIANE_WHISPER_CPP_BIN"
+        return f"whisper.cpp model not found: {self.model}"
+
+    def _transcribe(self, audio_path: Path) -> str:
+        # whisper.cpp only reads 16 kHz PCM WAV; decode anything else first
+        input_dir = None
+        input_path = audio_path
+        if audio_path.suffix.lower() != '.wav':
+            input_dir = Path(tempfile.mkdtemp(prefix='diane-whisper-'))
+            input_path = input_dir / f"{audio_path.stem}.wav"
+            subprocess.run(
+                ['ffmpeg', '-y', '-nostdin', '-i', str(audio_path),
+                 '-ar', '16000', '-ac', '1', str(input_path)],
+                check=True,
+                capture_output=True
+            )
+
+        try:
+            result = subprocess.run(
+                [self.binary, '-m', str(Path(self.model).expanduser()),
+                 '-f', str(input_path), '-t', self.threads, '-nt', '-np'],
+                check=True,
+                capture_output=True,
+                text=True
+            )
+            return ' '.join(line.strip() for line in result.stdout.splitlines())
+        finally:
+            if input_dir is not None:
+                shutil.rmtree(input_dir, ignore_errors=True)
+
+
+# Backend prefix in DIANE_TRANSCRIBE_MODEL -> (transcriber class, default model)
+TRANSCRIBE_BACKENDS = {
+    'openai': (AudioTranscriber, 'whisper-1'),
+    'faster-whisper': (FasterWhisperTranscriber, 'base.en'),
+    'whisper.cpp': (WhisperCppTranscriber, ''),
+}
+
+# Transcribers are cached per spec so local models stay loaded in long-running processes
+_transcribers: Dict[str, Transcriber] = {}
+
+
+def get_audio_duration(audio_path: Path) -> Optional[float]:
+    """Get the duration of an audio file in seconds, if it can be determined."""
+    try:
+        with wave.open(str(audio_path), 'rb') as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except Exception:
+        pass
+
+    if shutil.which('ffprobe'):
+        try:
+            result = subprocess.run(
+                ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+                 '-of', 'default=noprint_wrappers=1:nokey=1', str(audio_path)],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=10
+            )
+            return float(result.stdout.strip())
+        except (subprocess.SubprocessError, ValueError):
+            pass
+
+    return None
+
+
+def parse_transcribe_model(spec: str) -> Tuple[str, str]:
+    """Split a DIANE_TRANSCRIBE_MODEL value into (backend, model).
+
+    Accepted forms are ``<backend>:<model>`` (e.g. ``faster-whisper:small.en``
+    or ``whisper.cpp:~/models/ggml-base.en.bin``) or a bare OpenAI model name.
+
+    Raises:
+        ValueError: If the spec names a backend that doesn't exist, so a typo
+            in a local backend never falls through to the OpenAI upload
+    """
+    backend, sep, model = spec.partition(':')
+    if sep:
+        if backend not in TRANSCRIBE_BACKENDS:
+            raise ValueError(
+                f"Unknown transcription backend {backend!r} in DIANE_TRANSCRIBE_MODEL "
+                f"(expected one of: {', '.join(TRANSCRIBE_BACKENDS)})"
+            )
+        return backend, model or TRANSCRIBE_BACKENDS[backend][1]
+    if spec.startswith('whisper-'):
+        return 'openai', spec
+    # Anything else (including the old gpt-4o default) uses the OpenAI Whisper endpoint
+    return 'openai', TRANSCRIBE_BACKENDS['openai'][1]
+
+
 def get_audio_recorder() -> AudioRecorder:
     """Get AudioRecorder instance."""
     return AudioRecorder()
 
 
-def get_audio_transcriber() -> AudioTranscriber:
-    """Get AudioTranscriber instance."""
-    return AudioTranscriber()
+def get_audio_encoder() -> AudioEncoder:
+    """Get AudioEncoder instance."""
+    return AudioEncoder()
+
+
+def get_audio_transcriber(spec: Optional[str] = None) -> Transcriber:
+    """Get the transcriber selected by ``DIANE_TRANSCRIBE_MODEL``.
+
+    Args:
+        spec: Backend spec overriding the environment variable
+
+    Returns:
+        Cached Transcriber instance for the spec
+
+    Raises:
+        ValueError: If the spec or DIANE_WHISPER_THREADS is invalid
+    """
+    spec = spec or os.environ.get('DIANE_TRANSCRIBE_MODEL', 'openai:whisper-1')
+    if spec not in _transcribers:
+        backend, model = parse_transcribe_model(spec)
+        transcriber_class = TRANSCRIBE_BACKENDS[backend][0]
+        _transcribers[spec] = transcriber_class(model)
+    return _transcribers[spec]
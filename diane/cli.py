@@ -1,6 +1,11 @@
 """Command-line interface for diane."""
 
+import itertools
 import sys
+import time
+
+_IMPORT_START = time.time()
+
 from datetime import datetime, timedelta
 from typing import Optional
 from pathlib import Path
@@ -21,16 +26,23 @@ click.rich_click.STYLE_ERRORS_SUGGESTION = "yellow italic"
 click.rich_click.SHOW_METAVARS_COLUMN = False
 click.rich_click.APPEND_METAVARS_HELP = True
 
+from . import trace
 from .config import config
+from .history import compact_history, compaction_report
+from .maintenance import TASKS as MAINTENANCE_TASKS, Maintenance
+from .outbox import SyncOutbox
 from .record import Record
 from .storage import Storage
-from .sync import GitSync
+from .sync import REMOTE_POLICIES, GitSync
+
+trace.tracer.add('import', _IMPORT_START, time.time() - _IMPORT_START)
 
 
 @click.group(invoke_without_command=True)
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+@click.option('--profile', is_flag=True, help='Trace phases and dump a cProfile (see: diane trace)')
 @click.pass_context
-def cli(ctx, verbose):
+def cli(ctx, verbose, profile):
     """diane - Minimalist thought capture CLI
 
     \b
@@ -48,13 +60,23 @@ def cli(ctx, verbose):
       tui       Terminal UI
       sync      Git operations
       export    Export records
+      import    Import records (jsonl)
+      pack      Archive old records
+      history   Compact the git history
       stats     Statistics
       setup     First-time setup
       info      Show configuration
+      trace     Summarize --profile / DIANE_TRACE spans
     """
     if verbose:
         config.verbose = True
 
+    if profile:
+        trace.tracer.enable(trace.tracer.path)  # Already on when started via main()
+        profile_path = trace.tracer.start_profile()
+        if verbose:
+            click.echo(f"Tracing to {trace.tracer.path}, profile: {profile_path}", err=True)
+
     # If no command specified, handle stdin or show records
     if ctx.invoked_subcommand is None:
         if not sys.stdin.isatty():
@@ -71,26 +93,42 @@ def cli(ctx, verbose):
 
 
 @cli.command()
-@click.option('--limit', '-n', type=int, default=10, help='Number of records to show')
+@click.option('--limit', '-n', type=int, default=10, help='Number of records to show (0: all)')
 @click.option('--today', is_flag=True, help='Show only today\'s records')
-@click.option('--since', help='Show records since date (YYYY-MM-DD)')
+@click.option('--since', help='Show records since date (YYYY-MM-DD [HH:MM])')
+@click.option('--until', help='Show records up to date (YYYY-MM-DD [HH:MM], inclusive)')
+@click.option('--between', nargs=2, help='Show records between two dates (inclusive)')
+@click.option('--before', help='Show records older than this record ID (next page)')
+@click.option('--offset', type=int, default=0, help='Skip this many records')
+@click.option('--pager', is_flag=True, help='Page through the records with $PAGER')
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
-def show(limit, today, since, verbose):
-    """View recent records"""
+def show(limit, today, since, until, between, before, offset, pager, verbose):
+    """View recent records
+
+    \b
+    Paging through history:
+      diane show -n 20 --offset 20       Second page
+      diane show --before <record id>    Page after a given record
+      diane show -n 0 --pager            Everything, rendered as you scroll
+      diane show -n 0 --between 2024-11-01 2024-11-30
+    """
     if verbose:
         config.verbose = True
 
-    since_date = None
+    since_date, until_date = _date_range(since, until, between)
     if today:
         since_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    elif since:
-        try:
-            since_date = datetime.strptime(since, '%Y-%m-%d')
-        except ValueError:
-            click.echo(f"❌ Invalid date format: {since}. Use YYYY-MM-DD", err=True)
-            sys.exit(1)
 
-    _show_records(limit=limit, today=today, since=since_date, verbose=verbose)
+    _show_records(
+        limit=limit,
+        today=today,
+        since=since_date,
+        verbose=verbose,
+        until=until_date,
+        before=before,
+        offset=max(offset, 0),
+        pager=pager,
+    )
 
 
 @cli.command()
@@ -115,15 +153,34 @@ def record(duration, audio_file, list_devices, verbose):
 
 @cli.command()
 @click.argument('query', required=False)
+@click.option('--rank', is_flag=True, help='Print the best matches by relevance (BM25 + recency)')
+@click.option('--regex', 'regex', is_flag=True, help='Print records matching QUERY as a regular expression')
+@click.option('--semantic', is_flag=True, help='Print the records closest in meaning (local embeddings)')
+@click.option('--limit', '-n', type=int, default=10, help='Number of ranked results')
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
-def search(query, verbose):
-    """Search records interactively (requires ripgrep + fzf)
+def search(query, rank, regex, semantic, limit, verbose):
+    """Search records interactively (ripgrep + fzf, or a built-in picker)
 
     If no query provided, opens fzf to browse all records.
+    With --rank, prints the most relevant records instead; with --regex,
+    prints every record matching the pattern (no external tools needed);
+    with --semantic, prints the records closest in meaning (DIANE_EMBED_MODEL).
     """
     if verbose:
         config.verbose = True
 
+    if semantic:
+        _semantic_search(query or "", limit, verbose)
+        return
+
+    if rank:
+        _ranked_search(query or "", limit, verbose)
+        return
+
+    if regex:
+        _regex_search(query or "", verbose)
+        return
+
     _interactive_search(query or "")
 
 
@@ -145,8 +202,9 @@ def sync():
 
 
 @sync.command('push')
+@click.option('--force', is_flag=True, help='Overwrite the remote history (e.g. after history compact)')
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
-def sync_push(verbose):
+def sync_push(force, verbose):
     """Push records to remote"""
     if verbose:
         config.verbose = True
@@ -156,7 +214,7 @@ def sync_push(verbose):
     if verbose:
         click.echo("Pushing to remote...")
 
-    success, msg = git_sync.push()
+    success, msg = git_sync.push(force=force)
     if success:
         click.echo(f"✅ {msg}" if verbose else "✓")
     else:
@@ -197,45 +255,198 @@ def sync_status():
     click.echo("📡 Sync Status")
     click.echo("─" * 60)
     click.echo(f"Branch: {status['branch'] or 'unknown'}")
-    click.echo(f"Remote: {status['remote_url'] or 'none configured'}")
 
-    if status['has_remote']:
-        if status['ahead'] > 0:
-            click.echo(f"↑ Ahead by {status['ahead']} commit(s)")
-        if status['behind'] > 0:
-            click.echo(f"↓ Behind by {status['behind']} commit(s)")
-        if status['ahead'] == 0 and status['behind'] == 0:
-            click.echo("✅ Up to date")
+    remotes = git_sync.remote_status()
+    if not remotes:
+        click.echo("Remote: none configured")
+    for name, remote in remotes.items():
+        click.echo(f"Remote {name} ({remote['policy']}): {remote['url']}")
+        if remote['ahead'] is None:
+            click.echo("  never fetched")
+        else:
+            if remote['ahead'] > 0:
+                click.echo(f"  ↑ Ahead by {remote['ahead']} commit(s)")
+            if remote['behind'] > 0:
+                click.echo(f"  ↓ Behind by {remote['behind']} commit(s)")
+            if remote['ahead'] == 0 and remote['behind'] == 0:
+                click.echo("  ✅ Up to date")
+        last = remote['last']
+        if last:
+            when = datetime.fromtimestamp(last['finished']).strftime('%Y-%m-%d %H:%M')
+            click.echo(f"  {'Last sync' if last['ok'] else '❌ Last sync failed'}: "
+                       f"{when}, {last['seconds']:.2f}s ({last['message']})")
 
     if status['has_changes']:
         click.echo("⚠ Uncommitted changes")
 
+    outbox = SyncOutbox(git_sync.records_dir)
+    queued = outbox.status()
+    if queued['last']:
+        when = datetime.fromtimestamp(queued['last']['finished']).strftime('%Y-%m-%d %H:%M')
+        click.echo(f"{'Background sync' if queued['last']['ok'] else '❌ Background sync failed'}: "
+                   f"{when} ({queued['last']['message']})")
+    if queued['pending']:
+        if not queued['running']:
+            # Left over from a failed or interrupted worker: try again
+            outbox.spawn()
+        click.echo(f"⏳ {queued['pending']} sync request(s) queued for the background worker")
+    if status['shallow']:
+        click.echo("Shallow clone (older history is fetched when needed: diane sync deepen)")
+
+    _show_maintenance_status(Maintenance(git_sync.records_dir).status())
+
+
+def _show_maintenance_status(status: dict):
+    """Print repository growth and the last run of each maintenance task."""
+    click.echo()
+    click.echo("🧹 Maintenance")
+    click.echo("─" * 60)
+    click.echo(f"Commits since commit-graph: {status['commits']}")
+    click.echo(f"Loose objects (estimate): {status['loose_objects']}")
+    click.echo(f"Packs: {status['packs']}")
+    for task in MAINTENANCE_TASKS:
+        last = status['tasks'].get(task)
+        if last:
+            when = datetime.fromtimestamp(last['finished']).strftime('%Y-%m-%d %H:%M')
+            result = f"{last['seconds']:.2f}s at {when}" + ("" if last['ok'] else " (failed)")
+        else:
+            result = "never run"
+        click.echo(f"  {task}: {result}")
+    if status['running']:
+        click.echo("⏳ Maintenance running in background")
+    elif status['due']:
+        click.echo(f"⚠ Due: {', '.join(status['due'])} (runs after the next capture, or: diane sync maintenance)")
+
+
+@sync.command('maintenance')
+@click.option('--task', '-t', 'tasks', multiple=True, type=click.Choice(list(MAINTENANCE_TASKS)),
+              help='Run only this task (repeatable; default: every task)')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def sync_maintenance(tasks, verbose):
+    """Repack and write the commit graph of the records repository now"""
+    git_sync = GitSync()
+    if not git_sync.is_git_repo():
+        click.echo("❌ Not a git repository", err=True)
+        sys.exit(1)
+
+    results = Maintenance(git_sync.records_dir).run(list(tasks) or list(MAINTENANCE_TASKS))
+    if not results:
+        click.echo("❌ Maintenance is already running", err=True)
+        sys.exit(1)
+
+    failed = [task for task, result in results.items() if not result['ok']]
+    if verbose:
+        for task, result in results.items():
+            click.echo(f"{'✅' if result['ok'] else '❌'} {task}: {result['seconds']:.2f}s")
+    elif not failed:
+        click.echo("✓")
+    if failed:
+        click.echo(f"❌ Failed: {', '.join(failed)}", err=True)
+        sys.exit(1)
+
+
+@sync.command('clone')
+@click.argument('url')
+@click.option('--depth', type=int, help='Shallow clone of this many commits (history is fetched when needed)')
+@click.option('--full', is_flag=True, help='Fetch all history and file versions up front')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def sync_clone(url, depth, full, verbose):
+    """Set up this device from an existing records repository
+
+    Without options the clone is blobless: all commits, but old versions of
+    records are only downloaded when something reads them.
+    """
+    if verbose:
+        config.verbose = True
+
+    git_sync = GitSync()
+    success, msg = git_sync.clone(url, depth=depth, blobless=not full)
+    if success:
+        click.echo(f"✅ {msg}" if verbose else "✓")
+    else:
+        click.echo(f"❌ {msg}", err=True)
+        sys.exit(1)
+
+
+@sync.command('deepen')
+@click.option('--depth', type=int, help='Fetch this many more commits (default: all history)')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def sync_deepen(depth, verbose):
+    """Fetch more history into a shallow clone"""
+    if verbose:
+        config.verbose = True
+
+    success, msg = GitSync().deepen(depth)
+    if success:
+        click.echo(f"✅ {msg}" if verbose else "✓")
+    else:
+        click.echo(f"❌ {msg}", err=True)
+        sys.exit(1)
+
 
 @sync.command('remote')
 @click.argument('url', required=False)
+@click.option('--name', default='origin', show_default=True, help='Remote name (several remotes replicate concurrently)')
+@click.option('--policy', type=click.Choice(list(REMOTE_POLICIES)),
+              help='sync: fetch and push (default for new remotes); push: backup only')
+@click.option('--remove', is_flag=True, help='Remove the remote')
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
-def sync_remote(url, verbose):
-    """Set or show git remote URL"""
+def sync_remote(url, name, policy, remove, verbose):
+    """Set or show git remote URLs"""
     if verbose:
         config.verbose = True
 
     git_sync = GitSync()
 
-    if url:
-        # Set remote
-        success, msg = git_sync.set_remote(url)
-        if success:
-            click.echo(f"✅ {msg}" if verbose else "✓")
-        else:
-            click.echo(f"❌ {msg}", err=True)
+    if remove:
+        success, msg = git_sync.remove_remote(name)
+    elif url or policy:
+        # Set remote (a policy alone only changes the policy)
+        url = url or git_sync.remotes().get(name, {}).get('url')
+        if not url:
+            click.echo(f"❌ No remote named {name}", err=True)
             sys.exit(1)
+        success, msg = git_sync.set_remote(url, name=name, policy=policy)
     else:
-        # Show current remote
-        current = git_sync.get_remote_url()
-        if current:
-            click.echo(current)
-        else:
+        # Show configured remotes
+        remotes = git_sync.remotes()
+        if not remotes:
             click.echo("No remote configured")
+        elif list(remotes) == ['origin'] and remotes['origin']['policy'] == 'sync':
+            click.echo(remotes['origin']['url'])
+        else:
+            for remote_name, remote in remotes.items():
+                click.echo(f"{remote_name}\t{remote['policy']}\t{remote['url']}")
+        return
+
+    if success:
+        click.echo(f"✅ {msg}" if verbose else "✓")
+    else:
+        click.echo(f"❌ {msg}", err=True)
+        sys.exit(1)
+
+
+@sync.command('replicate')
+@click.option('--remote', '-r', 'names', multiple=True, help='Only this remote (repeatable; default: all)')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def sync_replicate(names, verbose):
+    """Sync with every remote concurrently, following each remote's policy"""
+    if verbose:
+        config.verbose = True
+
+    results = GitSync().replicate(list(names) or None)
+    if not results:
+        click.echo("❌ No remote configured", err=True)
+        sys.exit(1)
+
+    failed = [name for name, (success, _, _) in results.items() if not success]
+    for name, (success, msg, seconds) in results.items():
+        if verbose or not success:
+            click.echo(f"{'✅' if success else '❌'} {name}: {msg} ({seconds:.2f}s)", err=not success)
+    if not failed and not verbose:
+        click.echo("✓")
+    if failed:
+        sys.exit(1)
 
 
 # Convenience aliases at top level
@@ -256,12 +467,23 @@ def pull_alias(ctx, verbose):
 
 
 @cli.command()
-@click.argument('format', type=click.Choice(['json', 'csv', 'html', 'markdown']))
-@click.option('--file', '-f', 'output_file', help='Output file (default: stdout)')
+@click.argument('format', type=click.Choice(['json', 'jsonl', 'csv', 'html', 'markdown', 'site']))
+@click.option('--file', '-f', 'output_file', help='Output file (default: stdout; directory for site)')
 @click.option('--today', is_flag=True, help='Export only today\'s records')
+@click.option('--since', help='Export records since date (YYYY-MM-DD [HH:MM])')
+@click.option('--until', help='Export records up to date (YYYY-MM-DD [HH:MM], inclusive)')
+@click.option('--since-last', 'feed_name', metavar='NAME',
+              help='jsonl only: just the records consumer NAME has not seen yet')
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
-def export(format, output_file, today, verbose):
-    """Export records to various formats"""
+def export(format, output_file, today, since, until, feed_name, verbose):
+    """Export records to various formats
+
+    \b
+    'site' writes a multi-page static site into the -f directory and, on
+    later runs, re-renders only the pages whose records changed.
+    'jsonl --since-last NAME' emits new and changed records since NAME's
+    previous run (oldest first); 'diane import jsonl' reads it back.
+    """
     if verbose:
         config.verbose = True
 
@@ -269,41 +491,306 @@ def export(format, output_file, today, verbose):
 
     storage = Storage()
 
-    since = None
+    if format == 'site':
+        _export_site(storage, output_file, verbose)
+        return
+
+    if feed_name:
+        if format != 'jsonl':
+            click.echo("❌ --since-last only works with jsonl", err=True)
+            sys.exit(1)
+        _export_feed(storage, feed_name, output_file, verbose)
+        return
+
+    since_date, until_date = _date_range(since, until)
     if today:
-        since = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        since_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-    results = storage.list_records(limit=None, since=since)
+    records = storage.iter_records(limit=None, since=since_date, until=until_date)
 
-    if not results:
+    # Peek so an empty export still reports instead of writing an empty document
+    first = next(records, None)
+    if first is None:
         click.echo("No records to export")
         return
 
-    # Generate export
+    exported = 0
+
+    def counted():
+        nonlocal exported
+        for record in itertools.chain([first], records):
+            exported += 1
+            yield record
+
+    # Stream the export: only one record is held in memory at a time
     if format == 'json':
-        content = Exporter.to_json(results)
+        chunks = Exporter.iter_json(counted())
+    elif format == 'jsonl':
+        chunks = Exporter.iter_jsonl(counted())
     elif format == 'csv':
-        content = Exporter.to_csv(results)
+        chunks = Exporter.iter_csv(counted())
     elif format == 'html':
-        content = Exporter.to_html(results)
+        chunks = Exporter.iter_html(counted())
     elif format == 'markdown':
-        content = Exporter.to_markdown(results)
+        chunks = Exporter.iter_markdown(counted())
 
     # Output
     if output_file:
-        Exporter.save_export(content, Path(output_file))
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'w', encoding='utf-8') as f:
+            Exporter.write_export(chunks, f)
         if verbose:
-            click.echo(f"✅ Exported {len(results)} records to {output_file}")
+            click.echo(f"✅ Exported {exported} records to {output_file}")
         else:
             click.echo("✓")
     else:
-        click.echo(content)
+        stdout = click.get_text_stream('stdout')
+        Exporter.write_export(chunks, stdout)
+        stdout.write('\n')
+
+
+def _export_feed(storage: Storage, name: str, output_file: Optional[str], verbose: bool):
+    """Stream the records feed NAME has not seen yet, then advance its mark"""
+    from .export import Exporter
+    from .feed import Feed
+
+    try:
+        feed = Feed(name, storage.records_dir)
+    except ValueError as e:
+        click.echo(f"❌ {e}", err=True)
+        sys.exit(1)
+
+    chunks = Exporter.iter_jsonl(feed.iter_changes())
+
+    if output_file:
+        # Appending keeps one growing log per consumer
+        output_path = Path(output_file)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, 'a', encoding='utf-8') as f:
+            Exporter.write_export(chunks, f)
+    else:
+        stdout = click.get_text_stream('stdout')
+        Exporter.write_export(chunks, stdout)
+        stdout.flush()
+
+    # Only now that everything was written is the high-water mark moved
+    feed.commit()
+
+    if verbose:
+        click.echo(f"✅ {feed.emitted} new or changed records for '{name}'", err=True)
+
+
+def _export_site(storage: Storage, output_dir: Optional[str], verbose: bool):
+    """Build or update the static site export"""
+    from .site import build_site
+
+    if not output_dir:
+        click.echo("❌ 'export site' needs an output directory: -f DIR", err=True)
+        sys.exit(1)
+
+    result = build_site(storage.records_dir, Path(output_dir))
+
+    if verbose:
+        click.echo(
+            f"✅ Site in {output_dir}: {result['rendered']} pages rendered, "
+            f"{result['unchanged']} unchanged, {result['removed']} removed"
+        )
+    else:
+        click.echo("✓")
+
+
+@cli.command('import')
+@click.argument('format', type=click.Choice(['jsonl']))
+@click.argument('input_file', required=False, default='-')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def import_records(format, input_file, verbose):
+    """Import records (e.g. from 'diane export jsonl')
+
+    Records are matched by ID: new ones are added, changed ones updated.
+    Reads stdin when no file (or '-') is given.
+    """
+    if verbose:
+        config.verbose = True
+
+    from .export import Exporter
+
+    storage = Storage()
+
+    try:
+        with click.open_file(input_file, 'r', encoding='utf-8') as f:
+            counts = storage.import_records(Exporter.read_jsonl(f))
+    except (OSError, ValueError) as e:
+        click.echo(f"❌ Import failed: {e}", err=True)
+        sys.exit(1)
+
+    if verbose:
+        click.echo(
+            f"✅ Imported {counts['added']} new, {counts['updated']} updated "
+            f"({counts['unchanged']} unchanged)"
+        )
+    else:
+        click.echo("✓")
+
+
+@cli.command()
+@click.option('--older-than', type=int, help='Pack records older than this many days '
+              '(default: $DIANE_PACK_AFTER_DAYS or 365)')
+@click.option('--codec', type=click.Choice(['gzip', 'zstd']), help='Compression (zstd needs zstandard)')
+@click.option('--dry-run', is_flag=True, help='Only show what would be packed')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def pack(older_than, codec, dry_run, verbose):
+    """Pack old records into compressed monthly archives
+
+    Packed records stay readable by show, search, stats and export; the
+    records directory just holds far fewer files. Runs as a single commit.
+    """
+    if verbose:
+        config.verbose = True
+
+    storage = Storage()
+    counts = storage.pack(older_than_days=older_than, codec=codec, dry_run=dry_run)
+
+    if not counts:
+        click.echo("Nothing to pack")
+        return
+
+    if dry_run or verbose:
+        for month, count in sorted(counts.items()):
+            click.echo(f"  {month}: {count} records")
+    total = sum(counts.values())
+    if dry_run:
+        click.echo(f"Would pack {total} records into {len(counts)} monthly archives")
+    elif verbose:
+        click.echo(f"✅ Packed {total} records into {len(counts)} monthly archives")
+    else:
+        click.echo("✓")
+
+
+@cli.command()
+@click.option('--distance', '-d', type=int,
+              help='Maximum SimHash distance in bits (default: $DIANE_DEDUPE_DISTANCE or 3)')
+@click.option('--limit', '-n', type=int, default=0, help='Number of groups to show (0: all)')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def dedupe(distance, limit, verbose):
+    """List groups of near-duplicate records
+
+    Records are compared by SimHash fingerprint through an LSH table, so
+    the archive is never compared pairwise. Nothing is deleted. Set
+    DIANE_DEDUPE=flag (or skip) to catch near-duplicates at capture time.
+    """
+    if verbose:
+        config.verbose = True
+
+    groups = Storage().near_duplicates(distance)
+    if not groups:
+        click.echo("No near-duplicates found")
+        return
+
+    # Largest groups first
+    groups.sort(key=lambda group: len(group), reverse=True)
+    for group in groups[:limit or None]:
+        click.echo(f"{len(group)} records")
+        for record in group:
+            preview = record.content.replace('\n', ' ')
+            click.echo(f"  {record.id}  {preview[:60]}")
+
+    if verbose:
+        total = sum(len(group) for group in groups)
+        click.echo(f"{len(groups)} groups, {total - len(groups)} records could go", err=True)
+
+
+@cli.command()
+@click.argument('record_ref', metavar='RECORD')
+@click.option('--limit', '-n', type=int, default=10, help='Number of related records')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def related(record_ref, limit, verbose):
+    """Show the past notes most similar to a record
+
+    RECORD is a record ID, a unique ID prefix or a filename. Similarity is
+    TF-IDF cosine; the index is built on first use and kept up to date as
+    you capture.
+    """
+    if verbose:
+        config.verbose = True
+
+    storage = Storage()
+    name = storage.find_name(record_ref)
+    if name is None:
+        click.echo(f"❌ No single record matches: {record_ref}", err=True)
+        sys.exit(1)
+
+    results = storage.related(name, limit=max(limit, 1))
+    if not results:
+        click.echo("No related records found")
+        return
+
+    for record, score in results:
+        if verbose:
+            click.echo(f"similarity {score:.3f}", err=True)
+        _display_record(record)
+
+
+@cli.group()
+def history():
+    """Records repository history"""
+    pass
+
+
+@history.command('compact')
+@click.option('--before', help='Compact history before this date (YYYY-MM-DD [HH:MM])')
+@click.option('--older-than', type=int, default=30, show_default=True,
+              help='Compact history older than this many days (ignored with --before)')
+@click.option('--dry-run', is_flag=True, help='Only report the commit and size reduction')
+@click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
+def history_compact(before, older_than, dry_run, verbose):
+    """Squash old per-record commits into one commit per day
+
+    The current tree stays byte-identical and the old history is kept under
+    refs/diane/backup/ until you delete that ref. Copies on other devices
+    must be re-cloned (or force-pushed over) afterwards.
+    """
+    if verbose:
+        config.verbose = True
+
+    git_sync = GitSync()
+    if not git_sync.is_git_repo():
+        click.echo("❌ Not a git repository", err=True)
+        sys.exit(1)
+
+    if git_sync.is_shallow():
+        # Compaction rewrites the whole history, so it needs all of it
+        success, msg = git_sync.deepen()
+        if not success:
+            click.echo(f"❌ {msg}", err=True)
+            sys.exit(1)
+
+    cutoff = _parse_date_option(before) if before else datetime.now() - timedelta(days=older_than)
+
+    if dry_run:
+        report = compaction_report(git_sync.records_dir, cutoff)
+        before_mb = report['bytes_before'] / 1024 / 1024
+        after_mb = report['bytes_after'] / 1024 / 1024
+        click.echo(f"Commits: {report['commits_before']} → {report['commits_after']} "
+                   f"({report['days']} daily commits before {cutoff:%Y-%m-%d %H:%M})")
+        click.echo(f"Reachable objects: {before_mb:.1f} MB → ~{after_mb:.1f} MB "
+                   "(reclaimed once the backup ref is deleted and git gc runs)")
+        return
+
+    success, msg = compact_history(git_sync.records_dir, cutoff)
+    if not success:
+        click.echo(f"❌ {msg}", err=True)
+        sys.exit(1)
+    click.echo(f"✅ {msg}" if verbose else "✓")
+    if verbose and git_sync.get_remote_url():
+        click.echo("⚠ History differs from the remote now: push with 'diane sync push --force'")
 
 
 @cli.command()
 @click.option('--days', type=int, default=7, help='Number of days for recent activity')
+@click.option('--range', 'date_range', nargs=2, help='Only count records between two dates (inclusive)')
 @click.option('--verbose', '-v', is_flag=True, help='Show detailed output')
-def stats(days, verbose):
+def stats(days, date_range, verbose):
     """Show statistics about your records"""
     if verbose:
         config.verbose = True
@@ -311,17 +798,22 @@ def stats(days, verbose):
     from .stats import Statistics
 
     storage = Storage()
-    records = storage.list_records(limit=None)
 
-    if not records:
+    since_date, until_date = _date_range(None, None, date_range)
+
+    # Statistics streams over the records, keeping only aggregates
+    statistics = Statistics(storage.iter_records(limit=None, since=since_date, until=until_date))
+
+    if not statistics.total_count():
         click.echo("No records found")
         return
 
-    statistics = Statistics(records)
     summary = statistics.summary()
 
     click.echo("📊 Record Statistics")
     click.echo("─" * 60)
+    if date_range:
+        click.echo(f"Range: {date_range[0]} → {date_range[1]}")
     click.echo(f"Total Records: {summary['total_records']}")
     click.echo(f"Total Words: {summary['total_words']}")
     click.echo(f"Avg Words/Record: {summary['avg_words_per_record']}")
@@ -357,8 +849,52 @@ def info(paths):
     _show_info()
 
 
+@cli.group('trace')
+def trace_group():
+    """Inspect --profile / DIANE_TRACE spans"""
+    pass
+
+
+@trace_group.command('summarize')
+@click.argument('trace_file', required=False, type=click.Path(dir_okay=False))
+def trace_summarize(trace_file):
+    """Aggregate spans by phase (default: $DIANE_DATA_HOME/trace.jsonl)"""
+    path = Path(trace_file) if trace_file else config.data_home / 'trace.jsonl'
+
+    if not path.exists():
+        click.echo(f"No trace file at {path}. Run a command with --profile or DIANE_TRACE=1")
+        return
+
+    rows = trace.summarize(path)
+    click.echo(f"{'span':<28} {'count':>7} {'total ms':>11} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    click.echo("─" * 78)
+    for row in rows:
+        click.echo(
+            f"{row['name'][:28]:<28} {row['count']:>7} {row['total_ms']:>11.1f} "
+            f"{row['mean_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['max_ms']:>9.2f}"
+        )
+
+
 # Helper functions
 
+def _report_saved(storage: Storage, filepath: Optional[Path], verbose: bool):
+    """Confirm a capture, pointing out a near-duplicate (DIANE_DEDUPE)"""
+    duplicate = storage.last_duplicate
+    if duplicate and storage.last_duplicate_packed:
+        duplicate += " (packed)"
+
+    if filepath is None:
+        click.echo(f"⚠ Skipped: near-duplicate of {duplicate}", err=True)
+        return
+
+    if verbose:
+        click.echo(f"✅ Recorded: {filepath.name}")
+    else:
+        click.echo("✓")
+    if duplicate:
+        click.echo(f"⚠ Near-duplicate of {duplicate}", err=True)
+
+
 def _capture_text(content: str, verbose: bool):
     """Capture text and save as record"""
     storage = Storage()
@@ -369,14 +905,58 @@ def _capture_text(content: str, verbose: bool):
     )
 
     filepath = storage.save(record)
+    _report_saved(storage, filepath, verbose)
 
-    if verbose:
-        click.echo(f"✅ Recorded: {filepath.name}")
-    else:
-        click.echo("✓")
+
+_DATE_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S')
+
+
+def _parse_date_option(value: str, end: bool = False) -> datetime:
+    """Parse a date option value or exit with an error.
+
+    Accepts YYYY-MM-DD, optionally followed by HH:MM[:SS]. With ``end``, a
+    bound is widened to the last microsecond of the day/minute/second given,
+    so it can be used as an inclusive upper limit.
+    """
+    for fmt in _DATE_FORMATS:
+        try:
+            parsed = datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+        if end:
+            if fmt == '%Y-%m-%d':
+                parsed += timedelta(days=1)
+            elif fmt.endswith('%M'):
+                parsed += timedelta(minutes=1)
+            else:
+                parsed += timedelta(seconds=1)
+            parsed -= timedelta(microseconds=1)
+        return parsed
+
+    click.echo(f"❌ Invalid date format: {value}. Use YYYY-MM-DD [HH:MM]", err=True)
+    sys.exit(1)
 
 
-def _show_records(limit: int, today: bool, since: Optional[datetime], verbose: bool):
+def _date_range(since: Optional[str], until: Optional[str], between=None):
+    """Turn since/until/between option values into (since, until) datetimes."""
+    if between:
+        since, until = between
+    return (
+        _parse_date_option(since) if since else None,
+        _parse_date_option(until, end=True) if until else None,
+    )
+
+
+def _show_records(
+    limit: int,
+    today: bool,
+    since: Optional[datetime],
+    verbose: bool,
+    until: Optional[datetime] = None,
+    before: Optional[str] = None,
+    offset: int = 0,
+    pager: bool = False,
+):
     """Display records"""
     storage = Storage()
 
@@ -384,35 +964,62 @@ def _show_records(limit: int, today: bool, since: Optional[datetime], verbose: b
     if today:
         since_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
 
-    results = storage.list_records(limit=limit, since=since_date)
+    # Lazy: each record is read only when it is about to be displayed
+    records = storage.iter_records(
+        limit=limit or None,
+        since=since_date,
+        until=until,
+        before=before,
+        offset=offset,
+    )
 
-    if not results:
+    first = next(records, None)
+    if first is None:
         if verbose:
             click.echo("No records found")
         return
 
-    for record in results:
-        _display_record(record)
+    is_tty = sys.stdout.isatty()
+    shown = 0
+    last = first
+
+    def render():
+        nonlocal shown, last
+        for record in itertools.chain([first], records):
+            shown += 1
+            last = record
+            yield _format_record(record, is_tty)
+
+    if pager and is_tty:
+        # The pager pulls from the generator, so pages are built as they are read
+        click.echo_via_pager(render())
+    else:
+        for text in render():
+            click.echo(text, nl=False)
+
+    # A full page probably has a next one: tell the user how to get it
+    if is_tty and limit and shown == limit:
+        click.echo(f"More: diane show -n {limit} --before {last.id}", err=True)
 
 
 def _display_record(record: Record):
     """Display a record in a readable format"""
+    click.echo(_format_record(record, sys.stdout.isatty()), nl=False)
+
+
+def _format_record(record: Record, is_tty: bool) -> str:
+    """Format a record for display (including the trailing newline)"""
     # Unix philosophy: clean output when piped, pretty when interactive
-    is_tty = sys.stdout.isatty()
+    timestamp = record.timestamp.strftime('%Y-%m-%d %H:%M')
 
     if is_tty:
         # Pretty formatting for terminal
-        click.echo("─" * 60)
-        timestamp = record.timestamp.strftime('%Y-%m-%d %H:%M')
-        click.echo(f"📅 {timestamp}")
-        click.echo()
-        click.echo(record.content)
-        click.echo()
-    else:
-        # Clean output for pipes
-        timestamp = record.timestamp.strftime('%Y-%m-%d %H:%M')
-        clean_content = record.content.replace('\n', ' ')
-        click.echo(f"{timestamp}|{clean_content}")
+        header = f"📅 {timestamp}  " + click.style(record.id, dim=True)
+        return f"{'─' * 60}\n{header}\n\n{record.content}\n\n"
+
+    # Clean output for pipes
+    clean_content = record.content.replace('\n', ' ')
+    return f"{timestamp}|{clean_content}\n"
 
 
 def _show_info():
@@ -510,75 +1117,134 @@ def _run_setup_wizard():
     click.echo()
 
 
-def _interactive_search(query: str):
-    """Launch interactive search using ripgrep + fzf"""
-    import subprocess
+def _ranked_search(query: str, limit: int, verbose: bool):
+    """Print the top records for a query, best first"""
+    if not query.strip():
+        click.echo("❌ --rank needs a query", err=True)
+        sys.exit(1)
+
+    results = Storage().rank_search(query, limit=max(limit, 1))
+
+    if not results:
+        click.echo("No matches found")
+        return
+
+    for record, score in results:
+        if verbose:
+            click.echo(f"score {score:.3f}", err=True)
+        _display_record(record)
 
-    records_dir = config.get_records_dir()
 
-    # Check if rg and fzf are available
+def _semantic_search(query: str, limit: int, verbose: bool):
+    """Print the records closest in meaning to a query, best first"""
+    from .semantic import get_embedder
+
+    if not query.strip():
+        click.echo("❌ --semantic needs a query", err=True)
+        sys.exit(1)
+
+    results = Storage().semantic_search(query, limit=max(limit, 1))
+
+    if not results:
+        click.echo("No matches found")
+        return
+
+    for record, score in results:
+        if verbose:
+            click.echo(f"similarity {score:.3f}", err=True)
+        _display_record(record)
+
+    if verbose:
+        click.echo(f"embeddings: {get_embedder().spec}", err=True)
+
+
+def _regex_search(pattern: str, verbose: bool):
+    """Print every record whose body matches a regular expression"""
+    import re
+
+    if not pattern:
+        click.echo("❌ --regex needs a pattern", err=True)
+        sys.exit(1)
+
     try:
-        subprocess.run(['which', 'rg'], capture_output=True, check=True)
-        subprocess.run(['which', 'fzf'], capture_output=True, check=True)
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        click.echo("❌ This feature requires 'ripgrep' and 'fzf' to be installed.", err=True)
-        click.echo("   Install with: brew install ripgrep fzf  (macOS)", err=True)
-        click.echo("              or: apt install ripgrep fzf   (Ubuntu/Debian)", err=True)
+        results = Storage().regex_search(pattern)
+    except re.error as e:
+        click.echo(f"❌ Invalid pattern: {e}", err=True)
         sys.exit(1)
 
-    # Build the ripgrep + fzf pipeline
+    if not results:
+        click.echo("No matches found")
+        return
+
+    for record in results:
+        _display_record(record)
+
+    if verbose:
+        click.echo(f"{len(results)} matching records", err=True)
+
+
+def _interactive_search(query: str):
+    """Launch interactive search: ripgrep streamed into fzf, or the built-in picker"""
+    import shutil
+    from .packs import PackStore
+
+    if not (shutil.which('rg') and shutil.which('fzf')):
+        _picker_search(query, "ripgrep/fzf not found")
+    elif PackStore(config.get_records_dir()).names():
+        # ripgrep only sees loose files; packed records are read through diane
+        _picker_search(query, "some records are packed")
+    else:
+        _fzf_search(query)
+
+
+def _fzf_search(query: str):
+    """Stream ripgrep matches into fzf; every keystroke re-runs ripgrep"""
+    import shlex
+    import subprocess
+
+    records_dir = config.get_records_dir()
+    rg_cmd = ['rg', '--color=always', '--line-number', '--no-heading', '--smart-case',
+              '--max-depth', '1', '--glob', '*.md']
+
     try:
-        # First run ripgrep to find matches
-        if query:
-            rg_result = subprocess.run(
-                ['rg', '--color=always', '--line-number', '--no-heading', '--smart-case', query],
-                cwd=records_dir,
-                capture_output=True,
-                text=True
-            )
-
-            if not rg_result.stdout:
-                click.echo("No matches found")
-                return
+        # rg writes straight into fzf, so results show up as they are found
+        rg_process = subprocess.Popen(
+            rg_cmd + ['--', query or '.'],
+            cwd=records_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
 
-            initial_input = rg_result.stdout
-        else:
-            # No query - browse all files
-            rg_result = subprocess.run(
-                ['rg', '--color=always', '--line-number', '--no-heading', '.'],
-                cwd=records_dir,
-                capture_output=True,
-                text=True
-            )
-            initial_input = rg_result.stdout
-
-        # Pipe to fzf for interactive selection
         fzf_process = subprocess.Popen(
             [
                 'fzf',
                 '--ansi',
+                '--disabled',  # rg does the matching, fzf only displays
+                '--query', query,
+                '--bind', f"change:reload:{shlex.join(rg_cmd)} -- {{q}} || true",
                 '--color', 'hl:-1:underline,hl+:-1:underline:reverse',
                 '--delimiter', ':',
                 '--preview', f'bat --color=always --style=plain {{1}} || cat {{1}}',
-                '--preview-window', 'up,60%,border-bottom,+{{2}}+3/3,~3'
+                '--preview-window', 'up,60%,border-bottom,+{2}+3/3,~3'
             ],
-            stdin=subprocess.PIPE,
+            cwd=records_dir,
+            stdin=rg_process.stdout,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
             text=True
         )
+        rg_process.stdout.close()  # fzf owns the pipe now
 
-        stdout, stderr = fzf_process.communicate(input=initial_input)
+        stdout, _ = fzf_process.communicate()
+        if rg_process.poll() is None:
+            rg_process.terminate()
+        rg_process.wait()
 
         if fzf_process.returncode == 0 and stdout:
             # User selected a file, extract filename and display
-            parts = stdout.strip().split(':', 1)
-            if parts:
-                filename = parts[0]
-                filepath = records_dir / filename
-                if filepath.exists():
-                    record = Record.from_file(filepath)
-                    _display_record(record)
+            filename = stdout.strip().split(':', 1)[0]
+            filepath = records_dir / filename
+            if filepath.exists():
+                _display_record(Record.from_file(filepath))
 
     except KeyboardInterrupt:
         click.echo("\nSearch cancelled")
@@ -586,6 +1252,52 @@ def _interactive_search(query: str):
         click.echo(f"❌ Search error: {e}", err=True)
 
 
+# Matches listed per query by the built-in picker
+PICKER_LIMIT = 20
+
+
+def _picker_search(query: str, reason: str):
+    """Built-in incremental picker (used when ripgrep/fzf can't be)
+
+    Each query lists the newest matches as they are found; type more text to
+    refine, a number to open a record, or nothing to quit.
+    """
+    storage = Storage()
+    click.echo(f"({reason}: using the built-in picker)", err=True)
+
+    try:
+        while True:
+            if not query:
+                query = click.prompt("search", default="", show_default=False).strip()
+                if not query:
+                    return
+
+            matches = []
+            for record in itertools.islice(storage.iter_search(query), PICKER_LIMIT):
+                matches.append(record)
+                content = record.content.replace('\n', ' ')[:70]
+                click.echo(f"{len(matches):>3}  {record.timestamp:%Y-%m-%d %H:%M}  {content}")
+
+            if not matches:
+                click.echo("No matches found")
+
+            choice = click.prompt(
+                f"[{query}] number to open, text to search again",
+                default="",
+                show_default=False
+            ).strip()
+
+            if choice.isdigit() and 1 <= int(choice) <= len(matches):
+                _display_record(matches[int(choice) - 1])
+                return
+            if not choice:
+                return
+            query = choice
+
+    except (KeyboardInterrupt, click.Abort):
+        click.echo("\nSearch cancelled")
+
+
 def _list_microphones():
     """List available audio input devices"""
     from .audio import get_audio_recorder
@@ -614,10 +1326,10 @@ def _list_microphones():
 
 def _record_and_transcribe(duration: Optional[int], verbose: bool):
     """Record audio and transcribe it"""
-    from .audio import get_audio_recorder, get_audio_transcriber
+    from .audio import get_audio_encoder, get_audio_recorder
 
     recorder = get_audio_recorder()
-    transcriber = get_audio_transcriber()
+    transcriber = _get_transcriber()
 
     # Check recording availability
     if not recorder.is_available():
@@ -627,9 +1339,7 @@ def _record_and_transcribe(duration: Optional[int], verbose: bool):
 
     # Check transcription availability
     if not transcriber.is_available():
-        click.echo("❌ OPENAI_API_KEY not set", err=True)
-        click.echo("   Set it to enable transcription: export OPENAI_API_KEY=sk-...", err=True)
-        sys.exit(1)
+        _report_transcriber_unavailable(transcriber)
 
     # Show recording info
     if verbose or duration is None:
@@ -648,13 +1358,28 @@ def _record_and_transcribe(duration: Optional[int], verbose: bool):
 
     if verbose:
         click.echo(f"✅ {msg}")
+
+    # Compress once so both the upload and the archived copy use the small file
+    encoder = get_audio_encoder()
+    if encoder.is_available() and (transcriber.uploads_audio or config.keep_audio):
+        encoded, msg, encoded_path = encoder.encode(audio_path)
+        if encoded:
+            audio_path.unlink()
+            audio_path = encoded_path
+        if verbose:
+            click.echo(f"{'✅' if encoded else '⚠'} {msg}")
+
+    if verbose:
         click.echo("Transcribing...")
 
-    # Transcribe audio (and clean up on success)
-    success, msg, transcription = transcriber.transcribe_and_cleanup(
-        audio_path,
-        keep_on_failure=True
-    )
+    # Transcribe audio (and clean up on success unless audio is kept)
+    if config.keep_audio:
+        success, msg, transcription = transcriber.transcribe(audio_path)
+    else:
+        success, msg, transcription = transcriber.transcribe_and_cleanup(
+            audio_path,
+            keep_on_failure=True
+        )
 
     if not success:
         click.echo(f"❌ {msg}", err=True)
@@ -663,34 +1388,60 @@ def _record_and_transcribe(duration: Optional[int], verbose: bool):
 
     if verbose:
         click.echo(f"✅ {msg}")
+        _report_transcription_stats(transcriber)
 
     # Save transcription as record
     storage = Storage()
+    audio_file = None
+    if config.keep_audio and audio_path.exists():
+        audio_file = storage.archive_audio(audio_path)
+
     record = Record(
         content=transcription,
         sources=["audio-recording"],
-        audio_file=str(audio_path) if audio_path.exists() else None
+        audio_file=audio_file
     )
 
     filepath = storage.save(record)
+    _report_saved(storage, filepath, verbose)
+
+
+def _get_transcriber():
+    """Get the configured transcriber, or exit on an invalid configuration"""
+    from .audio import get_audio_transcriber
+
+    try:
+        return get_audio_transcriber()
+    except ValueError as e:
+        click.echo(f"❌ {e}", err=True)
+        sys.exit(1)
+
+
+def _report_transcriber_unavailable(transcriber):
+    """Explain why the configured transcription backend can't run, then exit"""
+    click.echo(f"❌ {transcriber.unavailable_reason()}", err=True)
+    if transcriber.name == 'openai':
+        click.echo("   Set it to enable transcription: export OPENAI_API_KEY=sk-...", err=True)
+        click.echo("   Or use a local model: export DIANE_TRANSCRIBE_MODEL=faster-whisper:base.en", err=True)
+    sys.exit(1)
 
-    if verbose:
-        click.echo(f"✅ Recorded: {filepath.name}")
-    else:
-        click.echo("✓")
+
+def _report_transcription_stats(transcriber):
+    """Show backend latency and real-time factor"""
+    stats = transcriber.last_stats
+    line = f"   {transcriber.name}:{transcriber.model} {stats['latency_s']:.2f}s"
+    if stats.get('rtf') is not None:
+        line += f" for {stats['audio_s']:.1f}s of audio (RTF {stats['rtf']:.2f})"
+    click.echo(line)
 
 
 def _transcribe_audio_file(audio_file_path: str, verbose: bool):
     """Transcribe an audio file"""
-    from .audio import get_audio_transcriber
-
-    transcriber = get_audio_transcriber()
+    transcriber = _get_transcriber()
 
     # Check transcription availability
     if not transcriber.is_available():
-        click.echo("❌ OPENAI_API_KEY not set", err=True)
-        click.echo("   Set it to enable transcription: export OPENAI_API_KEY=sk-...", err=True)
-        sys.exit(1)
+        _report_transcriber_unavailable(transcriber)
 
     audio_path = Path(audio_file_path)
 
@@ -710,6 +1461,7 @@ def _transcribe_audio_file(audio_file_path: str, verbose: bool):
 
     if verbose:
         click.echo(f"✅ {msg}")
+        _report_transcription_stats(transcriber)
 
     # Save transcription as record
     storage = Storage()
@@ -720,16 +1472,17 @@ def _transcribe_audio_file(audio_file_path: str, verbose: bool):
     )
 
     filepath = storage.save(record)
-
-    if verbose:
-        click.echo(f"✅ Recorded: {filepath.name}")
-    else:
-        click.echo("✓")
+    _report_saved(storage, filepath, verbose)
 
 
 def main():
     """Entry point for CLI"""
-    cli()
+    # Enable before parsing so the root span covers the whole command
+    if '--profile' in sys.argv[1:2]:
+        trace.tracer.enable()
+
+    with trace.span('command', argv=sys.argv[1:]):
+        cli()
 
 
 if __name__ == '__main__':
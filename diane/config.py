@@ -1,8 +1,30 @@
 """Configuration management for diane."""
 
 import os
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Union
+
+
+def _env_number(name: str, default: Union[int, float], minimum: Union[int, float] = 0):
+    """Read a numeric ``DIANE_*`` variable, falling back to its default.
+
+    A malformed or out-of-range value is reported on stderr rather than
+    raised, so a typo can't break every command (including ``--help``).
+    """
+    value = os.environ.get(name, '').strip()
+    if not value:
+        return default
+    try:
+        number = type(default)(value)
+    except ValueError:
+        number = None
+    if number is None or not number >= minimum:  # also rejects NaN
+        kind = 'an integer' if isinstance(default, int) else 'a number'
+        print(f"⚠️  {name} must be {kind} >= {minimum}, got {value!r}; using {default}",
+              file=sys.stderr)
+        return default
+    return number
 
 
 class Config:
@@ -31,6 +53,52 @@ class Config:
         self.auto_sync = os.environ.get('DIANE_AUTO_SYNC', 'false').lower() == 'true'
         self.auto_sync_async = True  # Non-blocking sync by default
 
+        # Multi-remote replication: concurrent fetches/pushes and the time
+        # after which one remote's network call is abandoned
+        self.sync_workers = _env_number('DIANE_SYNC_WORKERS', 4, minimum=1)
+        self.sync_timeout = _env_number('DIANE_SYNC_TIMEOUT', 30, minimum=1)
+
+        # Write durability: none, fsync (per record) or group (batched fsync)
+        self.durability = os.environ.get('DIANE_DURABILITY', 'none')
+        self.group_fsync_ms = _env_number('DIANE_GROUP_FSYNC_MS', 50)
+
+        # Audio encoding applied before upload and archival (opus, flac or wav)
+        self.audio_codec = os.environ.get('DIANE_AUDIO_CODEC', 'opus').lower()
+        self.audio_bitrate = os.environ.get('DIANE_AUDIO_BITRATE', '24k')
+
+        # Keep dictated audio next to its record (stored under records/audio)
+        self.keep_audio = os.environ.get('DIANE_KEEP_AUDIO', 'false').lower() == 'true'
+        self.audio_dir = self.records_dir / 'audio'
+
+        # Archive tier: records older than this are packed by 'diane pack'
+        # into compressed monthly bundles (gzip, or zstd if installed)
+        self.pack_after_days = _env_number('DIANE_PACK_AFTER_DAYS', 365)
+        self.pack_codec = os.environ.get('DIANE_PACK_CODEC', 'gzip').lower()
+
+        # Background git maintenance of the records repository: thresholds
+        # at which a detached worker writes the commit graph and repacks
+        self.maintenance = os.environ.get('DIANE_MAINTENANCE', 'true').lower() == 'true'
+        self.maintenance_commits = _env_number('DIANE_MAINTENANCE_COMMITS', 100)
+        self.maintenance_loose_objects = _env_number('DIANE_MAINTENANCE_LOOSE_OBJECTS', 1000)
+        self.maintenance_packs = _env_number('DIANE_MAINTENANCE_PACKS', 10)
+
+        # Concurrent captures: seconds to wait for the records repository
+        # lock, and how many may wait at once, before a commit is left pending
+        self.lock_timeout = _env_number('DIANE_LOCK_TIMEOUT', 10.0)
+        self.lock_queue = _env_number('DIANE_LOCK_QUEUE', 16)
+
+        # Near-duplicate captures: 'off', 'flag' (save and report) or 'skip'
+        # (don't save); distance is in SimHash bits out of 64
+        self.dedupe = os.environ.get('DIANE_DEDUPE', 'off').lower()
+        self.dedupe_distance = _env_number('DIANE_DEDUPE_DISTANCE', 3)
+
+        # Semantic search embeddings: 'auto', 'hashing[:dim]' or
+        # 'sentence-transformers[:model]' (falls back to hashing)
+        self.embed_model = os.environ.get('DIANE_EMBED_MODEL', 'auto')
+
+        # Derived search indexes (not synced; rebuilt from the records)
+        self.index_dir = self.data_home / 'index'
+
     def ensure_directories(self):
         """Ensure all required directories exist."""
         self.data_home.mkdir(parents=True, exist_ok=True)
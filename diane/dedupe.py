@@ -0,0 +1,263 @@
+"""Near-duplicate detection with SimHash fingerprints.
+
+Clipboard auto-capture and repeated dictations produce many near-identical
+records. Every record gets a 64-bit SimHash of its words (weighted by
+count): texts that differ in a word or two get fingerprints that differ in a
+few bits, while unrelated texts differ in about half of them. Word pairs
+would also tell word orders apart, but on notes of a few dozen words a
+single edit would then move the fingerprint too far.
+
+Fingerprints are split into ``BANDS`` bands of 16 bits, and each band value
+is a bucket of an LSH table: two fingerprints at most ``BANDS - 1`` bits
+apart share at least one band. The table lives in SQLite next to the search
+index (``$DIANE_DATA_HOME/index/fingerprints.sqlite``), keyed on
+``(band, value)``, so a capture looks up its ``BANDS`` buckets and compares
+against the few records in them, whatever the size of the archive, and
+clustering the archive (``diane dedupe``) is near-linear.
+
+Records added by other devices are fingerprinted when ``refresh`` runs
+(``diane dedupe`` does), like the search index.
+"""
+
+import hashlib
+import itertools
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import trace
+from .index import tokenize
+from .packs import iter_record_entries
+from .record import Record
+
+FINGERPRINT_BITS = 64
+BANDS = 4
+_BAND_BITS = FINGERPRINT_BITS // BANDS
+_BAND_MASK = (1 << _BAND_BITS) - 1
+
+# Capture-time behaviour (DIANE_DEDUPE)
+DEDUPE_MODES = ('off', 'flag', 'skip')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    name TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    fingerprint INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (band, value, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS bands_name ON bands (name);
+"""
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash of the words of ``text``."""
+    features = Counter(tokenize(text))
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature, count in features.items():
+        h = _feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += count if h >> bit & 1 else -count
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count('1')
+
+
+def _to_sql(fingerprint: int) -> int:
+    # SQLite integers are signed 64-bit
+    return fingerprint - (1 << FINGERPRINT_BITS) if fingerprint >> (FINGERPRINT_BITS - 1) else fingerprint
+
+
+def _from_sql(value: int) -> int:
+    return value & ((1 << FINGERPRINT_BITS) - 1)
+
+
+def _bands(fingerprint: int) -> Iterator[Tuple[int, int]]:
+    for band in range(BANDS):
+        yield band, fingerprint >> (band * _BAND_BITS) & _BAND_MASK
+
+
+class FingerprintIndex:
+    """SimHash fingerprints of one records directory, with an LSH table."""
+
+    def __init__(self, records_dir: Path, path: Path):
+        self.records_dir = records_dir
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=10)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _add(self, name: str, fingerprint: int, mtime_ns: int, size: int) -> None:
+        self.db.execute('DELETE FROM bands WHERE name = ?', (name,))
+        self.db.execute('INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)',
+                        (name, mtime_ns, size, _to_sql(fingerprint)))
+        self.db.executemany('INSERT OR IGNORE INTO bands VALUES (?, ?, ?)',
+                            [(band, value, name) for band, value in _bands(fingerprint)])
+
+    def _remove(self, name: str) -> None:
+        self.db.execute('DELETE FROM bands WHERE name = ?', (name,))
+        self.db.execute('DELETE FROM docs WHERE name = ?', (name,))
+
+    def add(self, name: str, fingerprint: int, mtime_ns: int = 0, size: int = 0) -> None:
+        """Add (or replace) one record."""
+        with self.db:
+            self._add(name, fingerprint, mtime_ns, size)
+
+    def docs(self) -> Dict[str, Tuple[int, int, int]]:
+        """Every stored ``name -> (mtime_ns, size, fingerprint)``."""
+        return {name: (mtime_ns, size, _from_sql(fingerprint)) for name, mtime_ns, size, fingerprint
+                in self.db.execute('SELECT name, mtime_ns, size, fingerprint FROM docs')}
+
+    def refresh(self) -> int:
+        """Fingerprint new or changed records and drop removed ones.
+
+        Returns:
+            Number of entries added, updated or removed
+        """
+        changed = 0
+        with trace.span('dedupe.refresh') as attrs:
+            known = {name: (mtime_ns, size) for name, mtime_ns, size
+                     in self.db.execute('SELECT name, mtime_ns, size FROM docs')}
+            with self.db:
+                seen = set()
+                for entry in iter_record_entries(self.records_dir):
+                    seen.add(entry.name)
+                    if known.get(entry.name) == (entry.mtime_ns, entry.size):
+                        continue
+                    try:
+                        record = Record.from_text(entry.read_text(), entry.name)
+                    except Exception:
+                        # Skip files that can't be parsed
+                        continue
+                    self._add(entry.name, simhash(record.content), entry.mtime_ns, entry.size)
+                    changed += 1
+
+                for name in known:
+                    if name not in seen:
+                        self._remove(name)
+                        changed += 1
+            attrs['docs'] = len(seen)
+            attrs['changed'] = changed
+        return changed
+
+    def near(self, fingerprint: int, max_distance: int = BANDS - 1) -> List[Tuple[str, int]]:
+        """Records whose fingerprint is within ``max_distance`` bits, closest first.
+
+        Matches beyond ``BANDS - 1`` bits are only found if they also share a
+        band.
+        """
+        keys = list(_bands(fingerprint))
+        values = ','.join('(?, ?)' for _ in keys)
+        rows = self.db.execute(
+            f'WITH q (band, value) AS (VALUES {values}) '
+            'SELECT DISTINCT d.name, d.fingerprint FROM q '
+            'JOIN bands b ON b.band = q.band AND b.value = q.value '
+            'JOIN docs d ON d.name = b.name',
+            [v for key in keys for v in key]
+        )
+        matches = []
+        for name, other in rows:
+            d = distance(fingerprint, _from_sql(other))
+            if d <= max_distance:
+                matches.append((name, d))
+        matches.sort(key=lambda item: (item[1], item[0]))
+        return matches
+
+    def _buckets(self) -> Iterator[List[Tuple[str, int]]]:
+        """Every LSH bucket holding more than one record."""
+        rows = self.db.execute(
+            'SELECT b.band, b.value, b.name, d.fingerprint FROM bands b '
+            'JOIN docs d ON d.name = b.name '
+            'WHERE (b.band, b.value) IN '
+            '(SELECT band, value FROM bands GROUP BY band, value HAVING count(*) > 1) '
+            'ORDER BY b.band, b.value'
+        )
+        for _, group in itertools.groupby(rows, key=lambda row: (row[0], row[1])):
+            yield [(name, _from_sql(fingerprint)) for _, _, name, fingerprint in group]
+
+    def clusters(self, max_distance: int = BANDS - 1) -> List[List[str]]:
+        """Groups of near-duplicate records, each sorted oldest first.
+
+        Pairs are only compared inside LSH buckets and joined with
+        union-find, so the archive is never compared pairwise.
+        """
+        parent: Dict[str, str] = {}
+
+        def find(name: str) -> str:
+            root = name
+            while parent[root] != root:
+                root = parent[root]
+            while parent[name] != root:
+                parent[name], name = root, parent[name]
+            return root
+
+        def union(a: str, b: str) -> None:
+            parent.setdefault(a, a)
+            parent.setdefault(b, b)
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+
+        with trace.span('dedupe.cluster') as attrs:
+            for bucket in self._buckets():
+                # Exact repeats (the common case) are joined without comparing
+                by_fingerprint: Dict[int, List[str]] = {}
+                for name, fingerprint in bucket:
+                    by_fingerprint.setdefault(fingerprint, []).append(name)
+                for names in by_fingerprint.values():
+                    for name in names[1:]:
+                        union(names[0], name)
+
+                distinct = list(by_fingerprint.items())
+                for i, (fa, a) in enumerate(distinct):
+                    for fb, b in distinct[i + 1:]:
+                        if distance(fa, fb) <= max_distance:
+                            union(a[0], b[0])
+
+            groups: Dict[str, List[str]] = {}
+            for name in parent:
+                groups.setdefault(find(name), []).append(name)
+            clusters = sorted(sorted(group) for group in groups.values() if len(group) > 1)
+            attrs['clusters'] = len(clusters)
+        return clusters
+
+
+def load_fingerprints(records_dir: Path, path: Path, refresh: bool = True) -> FingerprintIndex:
+    """Open the fingerprints for ``records_dir``, optionally refreshing them."""
+    index = FingerprintIndex(records_dir, path)
+    if refresh:
+        index.refresh()
+    return index
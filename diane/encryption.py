@@ -4,6 +4,7 @@ import subprocess
 from pathlib import Path
 from typing import Optional, Tuple
 
+from . import trace
 from .config import config
 
 
@@ -17,7 +18,7 @@ class GPGEncryption:
     def _check_gpg_available(self) -> bool:
         """Check if GPG is available on the system."""
         try:
-            result = subprocess.run(
+            result = trace.run(
                 ['gpg', '--version'],
                 capture_output=True,
                 check=True
@@ -36,7 +37,7 @@ class GPGEncryption:
             return []
 
         try:
-            result = subprocess.run(
+            result = trace.run(
                 ['gpg', '--list-keys', '--with-colons'],
                 capture_output=True,
                 text=True,
@@ -92,7 +93,7 @@ class GPGEncryption:
             return False, "No GPG key configured. Set DIANE_GPG_KEY or use --gpg-key"
 
         try:
-            result = subprocess.run(
+            result = trace.run(
                 ['gpg', '--encrypt', '--armor', '--recipient', recipient, '--trust-model', 'always'],
                 input=content.encode(),
                 capture_output=True,
@@ -119,7 +120,7 @@ class GPGEncryption:
             return False, "GPG is not available on this system"
 
         try:
-            result = subprocess.run(
+            result = trace.run(
                 ['gpg', '--decrypt', '--quiet'],
                 input=encrypted_content.encode(),
                 capture_output=True,
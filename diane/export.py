@@ -1,60 +1,148 @@
 """Export functionality for diane records."""
 
+import io
 import json
 import csv
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, TextIO
 from datetime import datetime
 
-from .record import Record
+from .record import Record, is_record_id
 
 
 class Exporter:
     """Handles exporting records to various formats."""
 
     @staticmethod
-    def to_json(records: List[Record], pretty: bool = True) -> str:
+    def record_to_dict(record: Record) -> dict:
+        """Get the JSON-serializable form of a record."""
+        return {
+            'timestamp': record.timestamp.isoformat(),
+            'content': record.content,
+            'tags': record.tags,
+            'sources': record.sources,
+            'audio_file': record.audio_file,
+        }
+
+    @staticmethod
+    def iter_json(records: Iterable[Record], pretty: bool = True) -> Iterator[str]:
+        """Stream records as a JSON array, one record per chunk.
+
+        Produces exactly the same text as ``to_json``.
+
+        Args:
+            records: Records to export (consumed lazily)
+            pretty: Whether to pretty-print JSON
+
+        Yields:
+            JSON text chunks
+        """
+        separator = ',\n' if pretty else ', '
+        first = True
+
+        for record in records:
+            data = Exporter.record_to_dict(record)
+            if pretty:
+                item = '  ' + json.dumps(data, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            else:
+                item = json.dumps(data, ensure_ascii=False)
+
+            if first:
+                yield ('[\n' if pretty else '[') + item
+                first = False
+            else:
+                yield separator + item
+
+        if first:
+            yield '[]'
+        else:
+            yield '\n]' if pretty else ']'
+
+    @staticmethod
+    def to_json(records: Iterable[Record], pretty: bool = True) -> str:
         """Export records to JSON format.
 
         Args:
-            records: List of records to export
+            records: Records to export
             pretty: Whether to pretty-print JSON
 
         Returns:
             JSON string
         """
-        data = []
+        return ''.join(Exporter.iter_json(records, pretty))
+
+    @staticmethod
+    def iter_jsonl(records: Iterable[Record]) -> Iterator[str]:
+        """Stream records as newline-delimited JSON, one record per line.
+
+        Lines also carry the record ``id``, so ``read_jsonl`` can round-trip
+        them.
+
+        Args:
+            records: Records to export (consumed lazily)
+
+        Yields:
+            One JSON line per record
+        """
         for record in records:
-            data.append({
-                'timestamp': record.timestamp.isoformat(),
-                'content': record.content,
-                'tags': record.tags,
-                'sources': record.sources,
-                'audio_file': record.audio_file,
-            })
-
-        if pretty:
-            return json.dumps(data, indent=2, ensure_ascii=False)
-        else:
-            return json.dumps(data, ensure_ascii=False)
+            data = {'id': record.id}
+            data.update(Exporter.record_to_dict(record))
+            yield json.dumps(data, ensure_ascii=False) + '\n'
 
     @staticmethod
-    def to_csv(records: List[Record]) -> str:
-        """Export records to CSV format.
+    def read_jsonl(lines: Iterable[str]) -> Iterator[Record]:
+        """Parse records from newline-delimited JSON (``iter_jsonl`` output).
 
         Args:
-            records: List of records to export
+            lines: Text lines (blank lines are ignored)
 
-        Returns:
-            CSV string
+        Yields:
+            Record objects
+
+        Raises:
+            ValueError: If a line is not a valid record
         """
-        import io
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+                record_id = data.get('id')
+                if record_id is not None and not is_record_id(record_id):
+                    raise ValueError(f"invalid record id {record_id!r}")
+                yield Record(
+                    content=data['content'],
+                    timestamp=datetime.fromisoformat(data['timestamp']),
+                    sources=data.get('sources') or None,
+                    audio_file=data.get('audio_file'),
+                    tags=data.get('tags') or None,
+                    record_id=record_id,
+                )
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"line {number}: {e}") from e
 
+    @staticmethod
+    def iter_csv(records: Iterable[Record]) -> Iterator[str]:
+        """Stream records as CSV, one row per chunk.
+
+        Args:
+            records: Records to export (consumed lazily)
+
+        Yields:
+            CSV text chunks
+        """
         output = io.StringIO()
         writer = csv.writer(output)
 
+        def flush() -> str:
+            chunk = output.getvalue()
+            output.seek(0)
+            output.truncate()
+            return chunk
+
         # Header
         writer.writerow(['timestamp', 'content', 'tags', 'sources'])
+        yield flush()
 
         # Rows
         for record in records:
@@ -64,21 +152,49 @@ class Exporter:
                 ','.join(record.tags) if record.tags else '',
                 ','.join(record.sources) if record.sources else '',
             ])
+            yield flush()
+
+    @staticmethod
+    def to_csv(records: Iterable[Record]) -> str:
+        """Export records to CSV format.
 
-        return output.getvalue()
+        Args:
+            records: Records to export
+
+        Returns:
+            CSV string
+        """
+        return ''.join(Exporter.iter_csv(records))
 
     @staticmethod
-    def to_html(records: List[Record], title: str = "diane, Records") -> str:
+    def to_html(records: Iterable[Record], title: str = "diane, Records") -> str:
         """Export records to HTML format.
 
         Args:
-            records: List of records to export
+            records: Records to export
             title: Page title
 
         Returns:
             HTML string
         """
-        html_parts = [
+        return ''.join(Exporter.iter_html(records, title))
+
+    @staticmethod
+    def iter_html(records: Iterable[Record], title: str = "diane, Records") -> Iterator[str]:
+        """Stream records as an HTML page.
+
+        Args:
+            records: Records to export (consumed lazily)
+            title: Page title
+
+        Yields:
+            HTML text chunks
+        """
+        return _join_lines(Exporter._html_lines(records, title))
+
+    @staticmethod
+    def _html_lines(records: Iterable[Record], title: str) -> Iterator[str]:
+        yield from [
             '<!DOCTYPE html>',
             '<html lang="en">',
             '<head>',
@@ -143,7 +259,7 @@ class Exporter:
                     tags_html += f'<span class="tag">{tag}</span>'
                 tags_html += '</span>'
 
-            html_parts.extend([
+            yield from [
                 '    <div class="record">',
                 '        <div class="timestamp">',
                 f'            📅 {timestamp_str}',
@@ -153,26 +269,40 @@ class Exporter:
                 f'            {record.content}',
                 '        </div>',
                 '    </div>',
-            ])
+            ]
 
-        html_parts.extend([
+        yield from [
             '</body>',
             '</html>',
-        ])
-
-        return '\n'.join(html_parts)
+        ]
 
     @staticmethod
-    def to_markdown(records: List[Record]) -> str:
+    def to_markdown(records: Iterable[Record]) -> str:
         """Export records to a single Markdown document.
 
         Args:
-            records: List of records to export
+            records: Records to export
 
         Returns:
             Markdown string
         """
-        md_parts = [
+        return ''.join(Exporter.iter_markdown(records))
+
+    @staticmethod
+    def iter_markdown(records: Iterable[Record]) -> Iterator[str]:
+        """Stream records as a single Markdown document.
+
+        Args:
+            records: Records to export (consumed lazily)
+
+        Yields:
+            Markdown text chunks
+        """
+        return _join_lines(Exporter._markdown_lines(records))
+
+    @staticmethod
+    def _markdown_lines(records: Iterable[Record]) -> Iterator[str]:
+        yield from [
             '# diane, Records Export',
             '',
             f'Exported: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}',
@@ -184,20 +314,18 @@ class Exporter:
         for record in records:
             timestamp_str = record.timestamp.strftime('%Y-%m-%d %H:%M:%S')
 
-            md_parts.append(f'## {timestamp_str}')
-            md_parts.append('')
+            yield f'## {timestamp_str}'
+            yield ''
 
             if record.tags:
                 tags_str = ' '.join(f'`{tag}`' for tag in record.tags)
-                md_parts.append(f'**Tags:** {tags_str}')
-                md_parts.append('')
-
-            md_parts.append(record.content)
-            md_parts.append('')
-            md_parts.append('---')
-            md_parts.append('')
+                yield f'**Tags:** {tags_str}'
+                yield ''
 
-        return '\n'.join(md_parts)
+            yield record.content
+            yield ''
+            yield '---'
+            yield ''
 
     @staticmethod
     def save_export(content: str, filepath: Path) -> None:
@@ -209,3 +337,25 @@ class Exporter:
         """
         filepath.parent.mkdir(parents=True, exist_ok=True)
         filepath.write_text(content, encoding='utf-8')
+
+    @staticmethod
+    def write_export(chunks: Iterable[str], stream: TextIO) -> None:
+        """Write streamed export chunks to an open text stream.
+
+        Args:
+            chunks: Output of one of the ``iter_*`` methods
+            stream: Destination (file or stdout)
+        """
+        for chunk in chunks:
+            stream.write(chunk)
+
+
+def _join_lines(lines: Iterable[str]) -> Iterator[str]:
+    """Stream the equivalent of ``'\\n'.join(lines)``."""
+    first = True
+    for line in lines:
+        if first:
+            yield line
+            first = False
+        else:
+            yield '\n' + line
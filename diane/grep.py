@@ -0,0 +1,123 @@
+"""Regex search over raw record files.
+
+Records are scanned with a pattern compiled once: frontmatter is skipped by
+offset, nothing is YAML-parsed, and only the matching files are later turned
+into ``Record`` objects. Plain case-sensitive literals run on the raw bytes;
+everything else is matched on the decoded body, so classes, ``.`` and case
+folding follow Unicode. Large files are memory-mapped (like ripgrep, small
+ones are cheaper to read outright) and large archives are split across
+worker processes.
+"""
+
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional, Pattern, Union
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 4000
+CHUNK_SIZE = 1000
+
+# Files at least this big are memory-mapped instead of read
+MMAP_THRESHOLD = 64 * 1024
+
+_FRONTMATTER_START = b'---\n'
+_FRONTMATTER_END = b'\n---\n'
+
+# Anything here can make a bytes pattern differ from the str one: escapes
+# (\w, \b, \s, \d...), classes, '.', and inline flags such as (?i)
+_BYTES_UNSAFE = re.compile(r'[\\.\[]|\(\?')
+
+
+def compile_pattern(pattern: str, case_sensitive: Optional[bool] = None) -> Pattern:
+    """Compile a search pattern (raises ``re.error`` if it is invalid).
+
+    Patterns are matched line by line (``^``/``$`` anchor at line breaks).
+    Like ``rg --smart-case``, the search ignores case unless the pattern has
+    an uppercase letter or ``case_sensitive`` is given. Plain case-sensitive
+    ASCII patterns are compiled to bytes and run directly on the mapped
+    files; others are matched on each decoded body, where ``\\w``, ``.`` and
+    ignoring case cover non-ASCII text too.
+    """
+    if case_sensitive is None:
+        case_sensitive = pattern != pattern.lower()
+
+    flags = re.MULTILINE
+    if not case_sensitive:
+        flags |= re.IGNORECASE
+
+    if case_sensitive and pattern.isascii() and not _BYTES_UNSAFE.search(pattern):
+        return re.compile(pattern.encode('ascii'), flags)
+    return re.compile(pattern, flags)
+
+
+def _body_offset(data: Union[bytes, mmap.mmap]) -> int:
+    """Offset of the record body (after the frontmatter, if any)."""
+    if data[:4] != _FRONTMATTER_START:
+        return 0
+    end = data.find(_FRONTMATTER_END, 3)
+    return 0 if end < 0 else end + len(_FRONTMATTER_END)
+
+
+def file_matches(path: Union[str, Path], regex: Pattern) -> bool:
+    """Check whether the body of a record file matches ``regex``."""
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+                return body_matches(f.read(), regex)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return body_matches(data, regex)
+    except OSError:
+        return False
+
+
+def body_matches(data: Union[bytes, mmap.mmap], regex: Pattern) -> bool:
+    """Check whether the body of a record file's contents matches ``regex``."""
+    offset = _body_offset(data)
+    if isinstance(regex.pattern, bytes):
+        return regex.search(data, offset) is not None
+    text = data[offset:].decode('utf-8', errors='replace')
+    return regex.search(text) is not None
+
+
+def _scan_chunk(directory: str, names: List[str], pattern, flags: int) -> List[str]:
+    """Worker: names in ``names`` whose body matches."""
+    regex = re.compile(pattern, flags)
+    return [name for name in names if file_matches(os.path.join(directory, name), regex)]
+
+
+def grep_names(
+    directory: Path,
+    names: Iterable[str],
+    regex: Pattern,
+    workers: Optional[int] = None,
+) -> List[str]:
+    """Filter record filenames down to those whose body matches ``regex``.
+
+    Args:
+        directory: Directory holding the files
+        names: Filenames to scan (order is preserved in the result)
+        regex: Pattern from ``compile_pattern``
+        workers: Worker processes (default: one per CPU; 1 disables the pool)
+
+    Returns:
+        Matching filenames
+    """
+    names = list(names)
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(names) < PARALLEL_THRESHOLD:
+        return [name for name in names if file_matches(directory / name, regex)]
+
+    chunks = [names[i:i + CHUNK_SIZE] for i in range(0, len(names), CHUNK_SIZE)]
+    matches: List[str] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_scan_chunk, str(directory), chunk, regex.pattern, regex.flags)
+            for chunk in chunks
+        ]
+        for future in futures:
+            matches.extend(future.result())
+    return matches
@@ -0,0 +1,191 @@
+"""History compaction for the records repository.
+
+Each capture is its own commit, so after a few years the records repository
+holds ~100k commits, each with its own copy of the (large) root tree. That
+makes clones, pulls on a new device and ``rev-list`` slow.
+``diane history compact`` rewrites the history older than a cutoff into one
+commit per day:
+
+- the snapshot of a day is the tree of its last commit (reused as is, so no
+  tree or blob is rewritten and the final tree is byte-identical)
+- commits after the cutoff are replayed unchanged (same tree, author,
+  committer and message) on top of the compacted days
+- the new history is written with one ``git fast-import`` stream, checked
+  against the current tree, and only then swapped in (compare-and-swap on the
+  branch, so a capture made meanwhile aborts the rewrite)
+- the old history stays reachable from ``refs/diane/backup/compact-<time>``
+  until that ref is deleted
+
+Merges are flattened along the first-parent line. The rewritten branch no
+longer shares history with copies on other devices: push it with
+``--force`` and re-clone elsewhere.
+"""
+
+import subprocess
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Tuple
+
+from . import trace
+
+BACKUP_REF_PREFIX = 'refs/diane/backup/compact-'
+WORK_REF = 'refs/diane/compacting'
+
+# Field and record separators of the 'git log' format below
+_FIELD = '\x1f'
+_RECORD = '\x1e'
+_LOG_FORMAT = _FIELD.join(['%H', '%T', '%an <%ae> %ad', '%cn <%ce> %cd', '%B']) + _RECORD
+
+
+class HistoryCommit(NamedTuple):
+    """One first-parent commit: ids, raw identities and message."""
+
+    sha: str
+    tree: str
+    author: str
+    committer: str
+    message: str
+
+    @property
+    def day(self) -> str:
+        """Author's local date (``YYYY-MM-DD``) from the raw ``<epoch> <tz>`` ident."""
+        epoch, tz = self.author.rsplit(' ', 2)[1:]
+        sign = -1 if tz[0] == '-' else 1
+        offset = timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * sign
+        return datetime.fromtimestamp(int(epoch), timezone(offset)).strftime('%Y-%m-%d')
+
+    @property
+    def epoch(self) -> int:
+        return int(self.author.rsplit(' ', 2)[1])
+
+
+def _git(records_dir: Path, *args: str, **kwargs) -> str:
+    result = trace.run(['git', *args], cwd=records_dir, check=True, capture_output=True, text=True, **kwargs)
+    return result.stdout
+
+
+def read_history(records_dir: Path, rev: str = 'HEAD') -> List[HistoryCommit]:
+    """First-parent history of ``rev``, oldest first."""
+    output = _git(records_dir, 'log', '--first-parent', '--reverse', '--date=raw',
+                  f'--format={_LOG_FORMAT}', rev)
+    commits = []
+    for entry in output.split(_RECORD):
+        entry = entry.lstrip('\n')
+        if entry:
+            commits.append(HistoryCommit(*entry.split(_FIELD, 4)))
+    return commits
+
+
+def plan_compaction(commits: List[HistoryCommit], cutoff: datetime) -> List[List[HistoryCommit]]:
+    """Group commits into the commits of the new history.
+
+    Consecutive commits of the same day before ``cutoff`` form one group;
+    every later commit is a group of its own.
+    """
+    cutoff_epoch = cutoff.timestamp()
+    groups: List[List[HistoryCommit]] = []
+    day = None
+    for commit in commits:
+        if commit.epoch >= cutoff_epoch:
+            groups.append([commit])
+            day = None
+        elif groups and day == commit.day:
+            groups[-1].append(commit)
+        else:
+            groups.append([commit])
+            day = commit.day
+    return groups
+
+
+def _day_message(group: List[HistoryCommit]) -> str:
+    subjects = [commit.message.split('\n', 1)[0] for commit in group]
+    return f"Records of {group[-1].day} ({len(group)} commits)\n\n" + '\n'.join(subjects) + '\n'
+
+
+def _fast_import_stream(groups: List[List[HistoryCommit]]) -> bytes:
+    """A fast-import stream writing one commit per group to ``WORK_REF``."""
+    out = [f'reset {WORK_REF}\n'.encode()]
+    for mark, group in enumerate(groups, start=1):
+        last = group[-1]
+        message = (last.message if len(group) == 1 else _day_message(group)).encode('utf-8')
+        out.append(f'commit {WORK_REF}\nmark :{mark}\n'
+                   f'author {last.author}\ncommitter {last.committer}\n'.encode('utf-8'))
+        out.append(b'data %d\n%s\n' % (len(message), message))
+        if mark > 1:
+            out.append(f'from :{mark - 1}\n'.encode())
+        # Point the root at the existing tree: nothing below it is rewritten
+        out.append(f'M 040000 {last.tree} ""\n\n'.encode())
+    return b''.join(out)
+
+
+def _disk_usage(records_dir: Path, *args: str, stdin: str = '') -> int:
+    return int(_git(records_dir, 'rev-list', '--disk-usage', *args, input=stdin).strip() or 0)
+
+
+def compaction_report(records_dir: Path, cutoff: datetime) -> Dict[str, int]:
+    """What compacting history before ``cutoff`` would change, without changing it.
+
+    Returns:
+        ``commits_before``/``commits_after`` and the on-disk size in bytes of
+        everything reachable before and (estimated) after
+    """
+    commits = read_history(records_dir)
+    groups = plan_compaction(commits, cutoff)
+    if not commits:
+        return {'commits_before': 0, 'commits_after': 0, 'days': 0, 'bytes_before': 0, 'bytes_after': 0}
+
+    with trace.span('history.report'):
+        bytes_before = _disk_usage(records_dir, '--objects', 'HEAD')
+        # Kept trees are existing objects; new commits cost about what old ones do
+        commit_bytes = _disk_usage(records_dir, '--first-parent', 'HEAD') / len(commits)
+        trees = '\n'.join(sorted({group[-1].tree for group in groups})) + '\n'
+        bytes_after = _disk_usage(records_dir, '--objects', '--stdin', stdin=trees) + int(commit_bytes * len(groups))
+
+    return {
+        'commits_before': len(commits),
+        'commits_after': len(groups),
+        'days': sum(1 for group in groups if group[-1].epoch < cutoff.timestamp()),
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+    }
+
+
+def compact_history(records_dir: Path, cutoff: datetime) -> Tuple[bool, str]:
+    """Rewrite history before ``cutoff`` into one commit per day.
+
+    Returns:
+        Tuple of (success, message); the message names the backup ref
+    """
+    try:
+        branch = _git(records_dir, 'symbolic-ref', '-q', 'HEAD').strip()
+        head = _git(records_dir, 'rev-parse', 'HEAD').strip()
+    except subprocess.CalledProcessError:
+        return False, "No branch to compact"
+
+    commits = read_history(records_dir, head)
+    groups = plan_compaction(commits, cutoff)
+    if len(groups) == len(commits):
+        return True, "Nothing to compact"
+
+    try:
+        with trace.span('history.fast_import', commits=len(groups)):
+            trace.run(['git', 'fast-import', '--quiet', '--force'], cwd=records_dir,
+                      input=_fast_import_stream(groups), check=True, capture_output=True)
+
+        new_head = _git(records_dir, 'rev-parse', WORK_REF).strip()
+        if _git(records_dir, 'rev-parse', f'{new_head}^{{tree}}') != _git(records_dir, 'rev-parse', f'{head}^{{tree}}'):
+            return False, "Compacted tree differs from the current one; nothing changed"
+
+        backup_ref = BACKUP_REF_PREFIX + datetime.now().strftime('%Y%m%d-%H%M%S')
+        _git(records_dir, 'update-ref', backup_ref, head)
+        # Fails if a capture moved the branch since we read it
+        _git(records_dir, 'update-ref', '-m', 'diane history compact', branch, new_head, head)
+    except subprocess.CalledProcessError as e:
+        error = e.stderr.decode() if isinstance(e.stderr, bytes) else e.stderr
+        return False, f"Compaction failed: {error.strip() if error else e}"
+    finally:
+        trace.run(['git', 'update-ref', '-d', WORK_REF], cwd=records_dir, capture_output=True)
+
+    return True, (f"Compacted {len(commits)} commits into {len(groups)}; "
+                  f"previous history kept at {backup_ref}")
+
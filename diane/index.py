@@ -0,0 +1,267 @@
+"""Precomputed term statistics and BM25 ranking for diane records.
+
+The index stores inverted postings in SQLite (``$DIANE_DATA_HOME/index/
+terms.sqlite``): one row per (term, record) with the term frequency, the
+document frequency of each term, and each record's length in tokens and
+timestamp. Collection totals live in the meta table, so a query reads the
+postings of its own terms only and scores just the records that contain
+them, never the whole archive.
+
+The index is refreshed incrementally: only files that were added or changed
+since the last run (by mtime and size) are re-read, and the walk is skipped
+altogether while the records and packs directories are unchanged (diane
+writes every record through a rename). Packed records (see ``diane.packs``)
+keep the mtime and size of their loose file, so packing does not invalidate
+the index.
+
+Ranking is Okapi BM25 with a recency boost; the top ``k`` results are taken
+with a heap, so only the winners are ever loaded as ``Record`` objects.
+"""
+
+import heapq
+import math
+import re
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import trace
+from .packs import PACKS_DIR, iter_record_entries
+from .record import Record, datetime_to_us
+
+# Bump when the stored layout or tokenization changes (forces a rebuild)
+INDEX_VERSION = 2
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# A brand-new record scores up to RECENCY_WEIGHT higher; the boost halves
+# every RECENCY_HALF_LIFE_DAYS
+RECENCY_WEIGHT = 0.25
+RECENCY_HALF_LIFE_DAYS = 30.0
+
+_TOKEN = re.compile(r'\w+')
+_US_PER_DAY = 86400 * 1_000_000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    timestamp_us INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return _TOKEN.findall(text.lower())
+
+
+class TermIndex:
+    """BM25 postings of one records directory."""
+
+    def __init__(self, records_dir: Path, path: Path):
+        self.records_dir = records_dir
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=10)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            version = None
+            try:
+                row = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+                version = row[0] if row else None
+            except sqlite3.OperationalError:
+                pass
+            if version != INDEX_VERSION:
+                db.executescript('DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS docs; '
+                                 'DROP TABLE IF EXISTS terms; DROP TABLE IF EXISTS postings;')
+            db.executescript(_SCHEMA)
+            with db:
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (INDEX_VERSION,))
+            self._db = db
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _meta(self, key: str, default: int = 0) -> int:
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, **values: int) -> None:
+        self.db.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)', values.items())
+
+    def _listing_stamp(self) -> Dict[str, int]:
+        """mtimes of the directories records are added to or removed from."""
+        stamp = {}
+        for key, directory in (('listed_records', self.records_dir),
+                               ('listed_packs', self.records_dir / PACKS_DIR)):
+            try:
+                stamp[key] = directory.stat().st_mtime_ns
+            except OSError:
+                stamp[key] = 0
+        return stamp
+
+    def _remove(self, doc_id: int, df: Counter) -> None:
+        """Drop one record, counting its terms out of ``df``."""
+        df.subtract(term for term, in self.db.execute('SELECT term FROM postings WHERE doc = ?', (doc_id,)))
+        self.db.execute('DELETE FROM postings WHERE doc = ?', (doc_id,))
+        self.db.execute('DELETE FROM docs WHERE id = ?', (doc_id,))
+
+    def _add(self, name: str, record: Record, mtime_ns: int, size: int, df: Counter) -> int:
+        """Store one record, counting its terms into ``df``; returns its length in tokens."""
+        terms = Counter(tokenize(record.content))
+        length = sum(terms.values())
+        doc_id = self.db.execute(
+            'INSERT INTO docs (name, mtime_ns, size, timestamp_us, length) VALUES (?, ?, ?, ?, ?)',
+            (name, mtime_ns, size, record.timestamp_us, length)
+        ).lastrowid
+        self.db.executemany('INSERT INTO postings VALUES (?, ?, ?)',
+                            [(term, doc_id, tf) for term, tf in terms.items()])
+        df.update(terms.keys())
+        return length
+
+    def _update_df(self, df: Counter) -> None:
+        """Apply the document frequency changes of a refresh in one pass."""
+        self.db.executemany('INSERT INTO terms VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET df = df + excluded.df',
+                            [(term, delta) for term, delta in df.items() if delta])
+        self.db.execute('DELETE FROM terms WHERE df <= 0')
+
+    def refresh(self) -> int:
+        """Bring the index in line with the records directory.
+
+        Returns:
+            Number of documents added, updated or removed
+        """
+        changed = 0
+
+        with trace.span('index.refresh') as attrs:
+            # Taken before listing: records added meanwhile are listed next time
+            stamp = self._listing_stamp()
+            if all(self._meta(key, -1) == value for key, value in stamp.items()):
+                attrs['skipped'] = True
+                return 0
+
+            known = {name: (doc_id, mtime_ns, size, length) for doc_id, name, mtime_ns, size, length
+                     in self.db.execute('SELECT id, name, mtime_ns, size, length FROM docs')}
+            count, total_length = len(known), self._meta('length')
+            df: Counter = Counter()
+            with self.db:
+                seen = set()
+                for entry in iter_record_entries(self.records_dir):
+                    seen.add(entry.name)
+                    doc = known.get(entry.name)
+                    if doc and doc[1] == entry.mtime_ns and doc[2] == entry.size:
+                        continue
+                    try:
+                        record = Record.from_text(entry.read_text(), entry.name)
+                    except Exception:
+                        # Skip files that can't be parsed
+                        continue
+                    if doc:
+                        self._remove(doc[0], df)
+                        total_length -= doc[3]
+                    else:
+                        count += 1
+                    total_length += self._add(entry.name, record, entry.mtime_ns, entry.size, df)
+                    changed += 1
+
+                for name, (doc_id, _, _, length) in known.items():
+                    if name not in seen:
+                        self._remove(doc_id, df)
+                        count -= 1
+                        total_length -= length
+                        changed += 1
+
+                self._update_df(df)
+                self._set_meta(docs=count, length=total_length, **stamp)
+
+            attrs['docs'] = count
+            attrs['changed'] = changed
+        return changed
+
+    def rank(
+        self,
+        query: str,
+        limit: int = 10,
+        now_us: Optional[int] = None,
+        recency_weight: float = RECENCY_WEIGHT,
+        half_life_days: float = RECENCY_HALF_LIFE_DAYS,
+    ) -> List[Tuple[str, float]]:
+        """Score documents against ``query`` with BM25 and a recency boost.
+
+        Args:
+            query: Free-text query (tokenized like the records)
+            limit: Number of results to return (top-k)
+            now_us: Reference time for the recency boost (default: now)
+            recency_weight: Maximum relative boost for a brand-new record
+            half_life_days: Age at which the boost is halved
+
+        Returns:
+            List of (filename, score), best first
+        """
+        terms = sorted(set(tokenize(query)))
+        count = self._meta('docs')
+        if not terms or not count:
+            return []
+
+        with trace.span('index.rank') as attrs:
+            avg_length = self._meta('length') / count or 1.0
+            marks = ','.join('?' * len(terms))
+            idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in
+                   self.db.execute(f'SELECT term, df FROM terms WHERE term IN ({marks})', terms)}
+            if not idf:
+                return []
+
+            # Only the postings of the query terms are read
+            scores: Dict[str, float] = {}
+            timestamps: Dict[str, int] = {}
+            for term, tf, name, timestamp_us, length in self.db.execute(
+                'SELECT p.term, p.tf, d.name, d.timestamp_us, d.length '
+                f'FROM postings p JOIN docs d ON d.id = p.doc WHERE p.term IN ({marks})', terms
+            ):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[name] = scores.get(name, 0.0) + idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+                timestamps[name] = timestamp_us
+            attrs['candidates'] = len(scores)
+
+        if now_us is None:
+            now_us = datetime_to_us(datetime.now())
+        half_life_us = half_life_days * _US_PER_DAY
+
+        def boosted():
+            for name, score in scores.items():
+                age_us = max(now_us - timestamps[name], 0)
+                yield name, score * (1 + recency_weight * 0.5 ** (age_us / half_life_us))
+
+        return heapq.nlargest(limit, boosted(), key=lambda item: item[1])
+
+
+def load_index(records_dir: Path, path: Path) -> TermIndex:
+    """Open the index for ``records_dir`` and refresh it."""
+    index = TermIndex(records_dir, path)
+    index.refresh()
+    return index
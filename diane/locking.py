@@ -0,0 +1,167 @@
+"""Repository lock and pending commits for concurrent captures.
+
+Several processes may capture at once (clipboard monitor, editor plugin,
+scripts). Their ``git add``/``git commit`` calls race on ``.git/index.lock``
+and the loser's record stays uncommitted. Every diane process therefore
+takes ``RepoLock`` around its index operations:
+
+- waiters take a ticket (a file in ``.git/diane-lock/`` named after the
+  time, pid and thread) and go first-come, first-served; the holder also
+  keeps an ``flock`` on ``.git/diane.lock``, so a crashed holder never
+  blocks the others, and tickets of dead processes are swept away
+- the queue is short (``DIANE_LOCK_QUEUE``) and waiting is bounded
+  (``DIANE_LOCK_TIMEOUT``): a capture that cannot get the lock in time does
+  not block, its paths go to ``.git/diane-pending`` and the next commit
+  (or the next ``Storage`` start-up) commits them
+"""
+
+import fcntl
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+from .config import config
+
+LOCK_FILE = 'diane.lock'
+QUEUE_DIR = 'diane-lock'
+PENDING_FILE = 'diane-pending'
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class RepoLock:
+    """Fair, bounded-wait exclusive lock on a records repository."""
+
+    def __init__(self, records_dir: Path, timeout: Optional[float] = None, max_queue: Optional[int] = None):
+        git_dir = records_dir / '.git'
+        self.lock_path = git_dir / LOCK_FILE
+        self.queue_dir = git_dir / QUEUE_DIR
+        self.timeout = config.lock_timeout if timeout is None else timeout
+        self.max_queue = config.lock_queue if max_queue is None else max_queue
+        self._ticket: Optional[Path] = None
+        self._fd: Optional[int] = None
+        self.waited = 0.0
+
+    def _tickets(self) -> List[str]:
+        """Live tickets in arrival order (tickets of dead processes are removed)."""
+        tickets = []
+        for name in sorted(os.listdir(self.queue_dir)):
+            pid = int(name.split('-')[1])
+            if pid != os.getpid() and not _pid_alive(pid):
+                (self.queue_dir / name).unlink(missing_ok=True)
+                continue
+            tickets.append(name)
+        return tickets
+
+    def acquire(self) -> bool:
+        """Wait for our turn, then take the lock.
+
+        Returns:
+            False if the queue is full or the timeout expired
+        """
+        start = time.perf_counter()
+        self.queue_dir.mkdir(exist_ok=True)
+        if len(self._tickets()) >= self.max_queue:
+            return False
+
+        name = f'{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}'
+        self._ticket = self.queue_dir / name
+        self._ticket.touch()
+
+        fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+        delay = 0.001
+        try:
+            while True:
+                if self._tickets()[0] == name:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        self._fd = fd
+                        self.waited = time.perf_counter() - start
+                        return True
+                    except BlockingIOError:
+                        pass  # The previous holder is just releasing
+                if time.perf_counter() - start > self.timeout:
+                    break
+                time.sleep(delay)
+                delay = min(delay * 2, 0.02)
+        except (OSError, ValueError, IndexError):
+            pass
+
+        os.close(fd)
+        self._ticket.unlink(missing_ok=True)
+        self._ticket = None
+        return False
+
+    def release(self) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        if self._ticket is not None:
+            self._ticket.unlink(missing_ok=True)
+            self._ticket = None
+
+    def __enter__(self) -> 'RepoLock':
+        if not self.acquire():
+            raise TimeoutError(f"Could not lock {self.lock_path.parent.parent} within {self.timeout}s")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class PendingCommits:
+    """Paths written to the records directory but not committed yet."""
+
+    def __init__(self, records_dir: Path):
+        self.records_dir = records_dir
+        self.path = records_dir / '.git' / PENDING_FILE
+
+    def add(self, paths: List[str]) -> None:
+        data = ''.join(f'{path}\n' for path in paths).encode('utf-8')
+        while True:
+            fd = os.open(str(self.path), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                # Taken (unlinked) between our open and flock: use a new file
+                if os.fstat(fd).st_nlink == 0:
+                    continue
+                os.write(fd, data)
+                return
+            finally:
+                os.close(fd)
+
+    def take(self) -> List[str]:
+        """Remove and return the pending paths, in order.
+
+        Paths that no longer exist are kept: their deletion is what has to be
+        committed (e.g. records moved into a pack).
+        """
+        try:
+            fd = os.open(str(self.path), os.O_RDONLY)
+        except FileNotFoundError:
+            return []
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            with os.fdopen(os.dup(fd), 'r', encoding='utf-8') as f:
+                paths = dict.fromkeys(line.strip() for line in f if line.strip())
+            self.path.unlink(missing_ok=True)
+        finally:
+            os.close(fd)
+        return list(paths)
+
+    def __bool__(self) -> bool:
+        try:
+            return self.path.stat().st_size > 0
+        except FileNotFoundError:
+            return False
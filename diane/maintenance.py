@@ -0,0 +1,202 @@
+"""Background git maintenance for the records repository.
+
+Every capture is its own commit, so the records repository accumulates loose
+objects and small packs, and commit walks get slower over time. Rather than
+letting ``git commit`` run ``gc --auto`` on the capture path, diane tracks the
+repository's growth itself and, once a threshold is crossed, starts a
+detached worker (``python -m diane.maintenance``) that runs the due tasks:
+
+- ``commit-graph``: ``git commit-graph write --reachable --split``, after
+  ``DIANE_MAINTENANCE_COMMITS`` new commits
+- ``loose-objects``: ``git repack -d``, packing loose objects once there are
+  about ``DIANE_MAINTENANCE_LOOSE_OBJECTS`` of them
+- ``incremental-repack``: ``git repack -d --geometric=2``, rolling small packs
+  together once there are ``DIANE_MAINTENANCE_PACKS`` of them
+
+State and timings live in ``.git/diane-maintenance.json`` (never committed);
+``diane sync status`` reports them. A lock file keeps workers from
+overlapping.
+"""
+
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import trace
+from .config import config
+from .durability import atomic_write
+
+STATE_FILE = 'diane-maintenance.json'
+LOCK_FILE = 'diane-maintenance.lock'
+
+TASKS: Dict[str, List[str]] = {
+    'commit-graph': ['git', 'commit-graph', 'write', '--reachable', '--split'],
+    'loose-objects': ['git', 'repack', '-d', '-q'],
+    'incremental-repack': ['git', 'repack', '-d', '-q', '--geometric=2'],
+}
+
+# Git settings passed to diane's own commits so they don't run gc inline
+NO_AUTO_GC = ['-c', 'gc.auto=0', '-c', 'maintenance.auto=false']
+
+
+class Maintenance:
+    """Growth tracking and maintenance tasks for one records repository."""
+
+    def __init__(self, records_dir: Path):
+        self.records_dir = records_dir
+        self.git_dir = records_dir / '.git'
+        self.state_path = self.git_dir / STATE_FILE
+        self.lock_path = self.git_dir / LOCK_FILE
+
+    def load_state(self) -> dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'commits': 0, 'tasks': {}}
+
+    def _save_state(self, state: dict) -> None:
+        atomic_write(self.state_path, json.dumps(state, separators=(',', ':')))
+
+    def loose_objects(self) -> int:
+        """Estimate the number of loose objects, like ``gc --auto`` does.
+
+        Object names are uniformly distributed, so one fan-out directory
+        (``objects/17``) holds about 1/256 of them.
+        """
+        try:
+            return len(os.listdir(self.git_dir / 'objects' / '17')) * 256
+        except FileNotFoundError:
+            return 0
+
+    def pack_count(self) -> int:
+        try:
+            return sum(1 for name in os.listdir(self.git_dir / 'objects' / 'pack') if name.endswith('.pack'))
+        except FileNotFoundError:
+            return 0
+
+    def due_tasks(self, state: Optional[dict] = None) -> List[str]:
+        """Tasks whose threshold has been crossed (cheap: two directory listings)."""
+        if state is None:
+            state = self.load_state()
+        due = []
+        if state.get('commits', 0) >= config.maintenance_commits:
+            due.append('commit-graph')
+        if self.loose_objects() >= config.maintenance_loose_objects:
+            due.append('loose-objects')
+        if self.pack_count() >= config.maintenance_packs:
+            due.append('incremental-repack')
+        return due
+
+    def note_commit(self, count: int = 1) -> bool:
+        """Record new commits and start the worker if maintenance is due.
+
+        Returns:
+            True if a background worker was started
+        """
+        if not config.maintenance or not self.git_dir.is_dir():
+            return False
+        state = self.load_state()
+        state['commits'] = state.get('commits', 0) + count
+        self._save_state(state)
+        if not self.due_tasks(state) or self.is_running():
+            return False
+        return self.spawn()
+
+    def is_running(self) -> bool:
+        """Check whether a maintenance worker holds the lock."""
+        try:
+            with open(self.lock_path, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                return False
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def spawn(self) -> bool:
+        """Start a detached worker that outlives this process."""
+        try:
+            subprocess.Popen(
+                [sys.executable, '-m', 'diane.maintenance', str(self.records_dir)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                close_fds=True,
+            )
+            return True
+        except OSError:
+            return False
+
+    def run(self, tasks: Optional[List[str]] = None) -> Dict[str, dict]:
+        """Run maintenance tasks now (the due ones unless ``tasks`` is given).
+
+        Returns:
+            Per task: ``seconds``, ``ok`` and ``finished`` (epoch seconds);
+            empty if another worker is already running
+        """
+        with open(self.lock_path, 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return {}
+
+            state = self.load_state()
+            commits_before = state.get('commits', 0)
+            if tasks is None:
+                tasks = self.due_tasks(state)
+
+            results = {}
+            for task in tasks:
+                start = time.perf_counter()
+                try:
+                    trace.run(TASKS[task], cwd=self.records_dir, check=True, capture_output=True)
+                    ok = True
+                except (subprocess.CalledProcessError, FileNotFoundError):
+                    ok = False
+                results[task] = {
+                    'seconds': round(time.perf_counter() - start, 3),
+                    'ok': ok,
+                    'finished': int(time.time()),
+                }
+
+            # Commits made while the tasks ran count towards the next run
+            state = self.load_state()
+            if results.get('commit-graph', {}).get('ok'):
+                state['commits'] = max(state.get('commits', 0) - commits_before, 0)
+            state.setdefault('tasks', {}).update(results)
+            self._save_state(state)
+            return results
+
+    def status(self) -> dict:
+        """Growth since the last run and the timings of each task's last run."""
+        state = self.load_state()
+        return {
+            'commits': state.get('commits', 0),
+            'loose_objects': self.loose_objects(),
+            'packs': self.pack_count(),
+            'due': self.due_tasks(state),
+            'running': self.is_running(),
+            'tasks': state.get('tasks', {}),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the detached worker: ``python -m diane.maintenance DIR``."""
+    argv = sys.argv[1:] if argv is None else argv
+    records_dir = Path(argv[0]) if argv else config.get_records_dir()
+    with trace.span('maintenance.run') as attrs:
+        results = Maintenance(records_dir).run()
+        attrs['tasks'] = ','.join(results)
+    return 0 if all(result['ok'] for result in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""Durable hand-off of sync requests to a detached worker.
+
+A capture must return immediately, but a thread started by a short-lived
+CLI process dies with it. Instead, auto-sync drops a request file into
+``.git/diane-outbox/`` and starts ``python -m diane.outbox`` in its own
+session if no worker holds the lock. The worker drains the outbox: every
+request present when a sync starts is answered by that one sync (requests
+coalesce), and requests that arrive meanwhile trigger one more round.
+Failed syncs are retried with backoff; requests that still fail stay in the
+outbox until the next capture (or ``diane sync status``) restarts the worker.
+"""
+
+import fcntl
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from . import trace
+from .config import config
+from .durability import atomic_write, normalize_mode
+
+OUTBOX_DIR = 'diane-outbox'
+LOCK_FILE = 'diane-outbox.lock'
+STATE_FILE = 'diane-outbox.json'
+
+# Seconds to wait before each retry of a failed sync
+RETRY_DELAYS = (2, 8, 30)
+
+
+class SyncOutbox:
+    """Queue of pending sync requests for one records repository."""
+
+    def __init__(self, records_dir: Path):
+        self.records_dir = records_dir
+        self.git_dir = records_dir / '.git'
+        self.directory = self.git_dir / OUTBOX_DIR
+        self.lock_path = self.git_dir / LOCK_FILE
+        self.state_path = self.git_dir / STATE_FILE
+
+    def pending(self) -> List[Path]:
+        """Queued requests, oldest first."""
+        try:
+            return sorted(self.directory.glob('*.json'))
+        except OSError:
+            return []
+
+    def request(self, reason: str = 'save') -> bool:
+        """Queue a sync and make sure a worker will run it.
+
+        Returns:
+            True if the request was queued
+        """
+        if not self.git_dir.is_dir():
+            return False
+        try:
+            self.directory.mkdir(exist_ok=True)
+            path = self.directory / f'{time.time_ns()}-{os.getpid()}.json'
+            atomic_write(path, json.dumps({'reason': reason, 'queued': time.time()}),
+                         fsync=normalize_mode(config.durability) != 'none')
+        except OSError:
+            return False
+        # A running worker re-checks the outbox before it exits
+        if not self.is_running():
+            self.spawn()
+        return True
+
+    def is_running(self) -> bool:
+        """Check whether a worker holds the lock."""
+        try:
+            with open(self.lock_path, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                return False
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def spawn(self) -> bool:
+        """Start a detached worker that outlives this process."""
+        try:
+            subprocess.Popen(
+                [sys.executable, '-m', 'diane.outbox', str(self.records_dir)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                close_fds=True,
+            )
+            return True
+        except OSError:
+            return False
+
+    def _sync(self) -> Tuple[bool, str]:
+        from .sync import GitSync
+        return GitSync(self.records_dir).sync_all()
+
+    def drain(self, retry_delays=RETRY_DELAYS) -> Optional[Tuple[bool, str]]:
+        """Run syncs until the outbox is empty (worker side).
+
+        Returns:
+            Result of the last sync, or None if another worker is running or
+            there was nothing to do
+        """
+        result = None
+        while True:
+            with open(self.lock_path, 'a') as lock:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return result
+
+                while True:
+                    batch = self.pending()
+                    if not batch:
+                        break
+                    with trace.span('outbox.sync', requests=len(batch)):
+                        success, msg = self._sync()
+                        for delay in retry_delays:
+                            if success:
+                                break
+                            time.sleep(delay)
+                            success, msg = self._sync()
+                    result = (success, msg)
+                    self._save_state(success, msg, len(batch))
+                    if not success:
+                        # Keep the requests for the next attempt
+                        return result
+                    for path in batch:
+                        path.unlink(missing_ok=True)
+
+            # A request queued while we held the lock started no worker
+            if not self.pending():
+                return result
+
+    def _save_state(self, success: bool, msg: str, requests: int) -> None:
+        try:
+            atomic_write(self.state_path, json.dumps({
+                'ok': success,
+                'message': msg,
+                'requests': requests,
+                'finished': int(time.time()),
+            }))
+        except OSError:
+            pass
+
+    def status(self) -> dict:
+        """Pending requests, whether a worker runs, and the last sync it made."""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                last = json.load(f)
+        except (OSError, ValueError):
+            last = None
+        return {'pending': len(self.pending()), 'running': self.is_running(), 'last': last}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the detached worker: ``python -m diane.outbox DIR``."""
+    argv = sys.argv[1:] if argv is None else argv
+    records_dir = Path(argv[0]) if argv else config.get_records_dir()
+    result = SyncOutbox(records_dir).drain()
+    return 0 if result is None or result[0] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
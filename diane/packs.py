@@ -0,0 +1,223 @@
+"""Compressed monthly archives for cold records.
+
+``diane pack`` moves records older than ``DIANE_PACK_AFTER_DAYS`` out of the
+records directory into one bundle per month::
+
+    records/packs/2023-04.pack   compressed records, one gzip (or zstd)
+                                 frame per record, back to back
+    records/packs/2023-04.idx    JSON offset index: codec and, per record,
+                                 [filename, offset, length, mtime_ns, size]
+
+Every record is its own frame, so any one of them is read with a single
+seek and decompress. Packs only ever grow: packing more records of a month
+appends frames and then rewrites the index, so a crash in between leaves the
+old index pointing at a still-valid prefix (and the loose files in place).
+
+Readers see packed and loose records together through ``PackStore`` and
+``iter_record_entries``; a loose file shadows a packed record with the same
+name (e.g. one edited or re-imported after packing).
+"""
+
+import gzip
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from . import trace
+from .durability import atomic_write
+
+PACKS_DIR = 'packs'
+PACK_VERSION = 1
+PACK_CODECS = ('gzip', 'zstd')
+
+
+def get_codec(codec: str) -> str:
+    """Resolve a configured codec, falling back to gzip without zstandard."""
+    if codec == 'zstd':
+        try:
+            import zstandard  # noqa: F401
+            return 'zstd'
+        except ImportError:
+            return 'gzip'
+    return 'gzip'
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class RecordEntry(NamedTuple):
+    """A record file, loose or packed, with the stat data change checks use.
+
+    Packed records keep the mtime and size their loose file had, so caches
+    keyed on them (search index, site, feeds) don't see packing as a change.
+    """
+
+    name: str
+    mtime_ns: int
+    size: int
+    path: Optional[Path] = None
+    pack: Optional['Pack'] = None
+
+    def read_bytes(self) -> bytes:
+        if self.pack is not None:
+            return self.pack.read(self.name)
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def read_text(self) -> str:
+        return self.read_bytes().decode('utf-8')
+
+
+class Pack:
+    """One monthly bundle and its offset index."""
+
+    def __init__(self, directory: Path, month: str):
+        self.month = month
+        self.path = directory / f'{month}.pack'
+        self.index_path = directory / f'{month}.idx'
+        self.codec = 'gzip'
+        self.entries: Dict[str, Tuple[int, int, int, int]] = {}
+        self._data: Optional[mmap.mmap] = None
+
+    def load(self) -> 'Pack':
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        self.codec = index.get('codec', 'gzip')
+        self.entries = {
+            name: (offset, length, mtime_ns, size)
+            for name, offset, length, mtime_ns, size in index['records']
+        }
+        return self
+
+    def read(self, name: str) -> bytes:
+        """Decompress one record."""
+        offset, length, _, _ = self.entries[name]
+        if self._data is None:
+            with open(self.path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return _decompress(self._data[offset:offset + length], self.codec)
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def append(self, records: Iterable[Tuple[str, bytes, int, int]], codec: str) -> int:
+        """Add records (name, data, mtime_ns, size) and rewrite the index.
+
+        Returns:
+            Number of records added
+        """
+        self.close()
+        if not self.entries:
+            self.codec = codec
+
+        offset = self.path.stat().st_size if self.path.exists() else 0
+        added = 0
+        with open(self.path, 'ab') as f:
+            for name, data, mtime_ns, size in records:
+                frame = _compress(data, self.codec)
+                f.write(frame)
+                self.entries[name] = (offset, len(frame), mtime_ns, size)
+                offset += len(frame)
+                added += 1
+            f.flush()
+            os.fsync(f.fileno())
+
+        atomic_write(self.index_path, json.dumps({
+            'version': PACK_VERSION,
+            'codec': self.codec,
+            'records': [[name, *self.entries[name]] for name in sorted(self.entries)],
+        }, separators=(',', ':')), fsync=True)
+        return added
+
+
+class PackStore:
+    """All monthly packs of a records directory."""
+
+    def __init__(self, records_dir: Path):
+        self.directory = records_dir / PACKS_DIR
+        self._packs: Optional[Dict[str, Pack]] = None
+        self._names: Dict[str, Pack] = {}
+
+    def _load(self) -> Dict[str, Pack]:
+        if self._packs is None:
+            self._packs = {}
+            if self.directory.is_dir():
+                with trace.span('storage.packs') as attrs:
+                    for index_path in sorted(self.directory.glob('*.idx')):
+                        try:
+                            pack = Pack(self.directory, index_path.stem).load()
+                        except (OSError, ValueError, KeyError):
+                            continue
+                        self._packs[pack.month] = pack
+                        for name in pack.entries:
+                            self._names[name] = pack
+                    attrs['records'] = len(self._names)
+        return self._packs
+
+    def names(self) -> Dict[str, Pack]:
+        """Map of packed record filename to its pack."""
+        self._load()
+        return self._names
+
+    def read(self, name: str) -> bytes:
+        return self.names()[name].read(name)
+
+    def entries(self) -> Iterator[RecordEntry]:
+        for name, pack in self.names().items():
+            _, _, mtime_ns, size = pack.entries[name]
+            yield RecordEntry(name, mtime_ns, size, pack=pack)
+
+    def add(self, month: str, records: List[Tuple[str, bytes, int, int]], codec: str) -> Path:
+        """Append records to the pack of ``month`` (created if needed)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        pack = self._load().get(month)
+        if pack is None:
+            pack = Pack(self.directory, month)
+            self._packs[month] = pack
+        pack.append(records, get_codec(codec))
+        for name, *_ in records:
+            self._names[name] = pack
+        return pack.path
+
+
+def read_record_text(records_dir: Path, name: str, packs: 'PackStore') -> str:
+    """Text of a record file, loose or packed (a loose copy wins)."""
+    try:
+        with open(records_dir / name, 'r', encoding='utf-8') as f:
+            return f.read()
+    except FileNotFoundError:
+        if name in packs.names():
+            return packs.read(name).decode('utf-8')
+        raise
+
+
+def iter_record_entries(records_dir: Path, packs: Optional[PackStore] = None) -> Iterator[RecordEntry]:
+    """Every record of ``records_dir``, loose files first, then packed ones."""
+    loose = set()
+    with os.scandir(records_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.endswith('.md') or name.startswith('.'):
+                continue
+            stat = entry.stat()
+            loose.add(name)
+            yield RecordEntry(name, stat.st_mtime_ns, stat.st_size, path=Path(entry.path))
+
+    for entry in (packs or PackStore(records_dir)).entries():
+        if entry.name not in loose:
+            yield entry
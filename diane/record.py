@@ -1,13 +1,124 @@
 """Record model for diane entries."""
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import os
+import re
+import sys
+import threading
 import yaml
 
 
+# Record IDs: YYYY-MM-DD--HH-MM-SS-ffffff-xxxx (microseconds + per-process tag).
+# Older records only have the one-second prefix, which still sorts correctly.
+RECORD_ID_PATTERN = re.compile(
+    r'^(\d{4}-\d{2}-\d{2}--\d{2}-\d{2}-\d{2})(?:-(\d{6})-([0-9a-f]{4}))?'
+)
+
+# libyaml bindings are several times faster when available
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+# Distinguishes processes capturing in the same microsecond
+_PROCESS_TAG = os.urandom(2).hex()
+_id_lock = threading.Lock()
+_last_id_time: Optional[datetime] = None
+
+
+def _reset_id_state() -> None:
+    """Give forked children their own process tag."""
+    global _PROCESS_TAG, _id_lock, _last_id_time
+    _PROCESS_TAG = os.urandom(2).hex()
+    _id_lock = threading.Lock()
+    _last_id_time = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_id_state)
+
+
+def format_record_id(timestamp: datetime, tag: Optional[str] = None) -> str:
+    """Format a record ID for a timestamp."""
+    return f"{timestamp:%Y-%m-%d--%H-%M-%S}-{timestamp.microsecond:06d}-{tag or _PROCESS_TAG}"
+
+
+def new_record_id(timestamp: Optional[datetime] = None) -> str:
+    """Generate a sortable record ID that is unique within this process.
+
+    IDs are strictly increasing per process: if the clock has not advanced
+    since the previous ID (or went backwards), the previous time plus one
+    microsecond is used.
+    """
+    global _last_id_time
+
+    with _id_lock:
+        moment = timestamp or datetime.now()
+        if _last_id_time is not None and timestamp is None and moment <= _last_id_time:
+            moment = _last_id_time + timedelta(microseconds=1)
+        if timestamp is None:
+            _last_id_time = moment
+        return format_record_id(moment)
+
+
+def parse_record_id(record_id: str) -> Optional[datetime]:
+    """Get the timestamp encoded in a record ID or filename, if any."""
+    match = RECORD_ID_PATTERN.match(record_id)
+    if not match:
+        return None
+    timestamp = datetime.strptime(match.group(1), '%Y-%m-%d--%H-%M-%S')
+    if match.group(2):
+        timestamp = timestamp.replace(microsecond=int(match.group(2)))
+    return timestamp
+
+
+def is_record_id(value: str) -> bool:
+    """Whether ``value`` is exactly a record ID (safe to build a filename from)."""
+    return isinstance(value, str) and RECORD_ID_PATTERN.fullmatch(value) is not None
+
+
+def record_id_from_filename(filename: str) -> str:
+    """Get the record ID part of a record filename (legacy names included)."""
+    match = RECORD_ID_PATTERN.match(filename)
+    if match:
+        return match.group(0)
+    return Path(filename).stem
+
+
+# Naive local-time epoch used for the compact integer timestamp representation
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def datetime_to_us(value: datetime) -> int:
+    """Convert a naive datetime to integer microseconds since the epoch."""
+    return (value - _EPOCH) // _ONE_MICROSECOND
+
+
+def us_to_datetime(value: int) -> datetime:
+    """Convert integer microseconds since the epoch back to a datetime."""
+    return _EPOCH + value * _ONE_MICROSECOND
+
+
+# Source/tag lists repeat across almost every record; share one tuple per value
+_interned_lists: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+
+def _intern_list(values: Optional[List[str]]) -> Tuple[str, ...]:
+    key = tuple(sys.intern(str(v)) for v in values or ())
+    return _interned_lists.setdefault(key, key)
+
+
 class Record:
-    """Represents a single diane record entry."""
+    """Represents a single diane record entry.
+
+    Records are slotted and store their timestamp as integer microseconds and
+    their sources/tags as shared tuples, so large archives can be held (or
+    streamed) cheaply. ``timestamp``, ``sources`` and ``tags`` are exposed as
+    ``datetime`` and lists as before.
+    """
+
+    __slots__ = ('id', 'content', 'timestamp_us', '_sources', '_tags', 'audio_file')
 
     def __init__(
         self,
@@ -15,33 +126,74 @@ class Record:
         timestamp: Optional[datetime] = None,
         sources: Optional[List[str]] = None,
         audio_file: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        record_id: Optional[str] = None,
     ):
         self.content = content.strip()
-        self.timestamp = timestamp or datetime.now()
+        if record_id is None:
+            record_id = new_record_id(timestamp)
+            timestamp = timestamp or parse_record_id(record_id)
+        self.id = record_id
+        self.timestamp = timestamp or parse_record_id(record_id) or datetime.now()
         self.sources = sources or ["stdin"]
         self.audio_file = audio_file
+        self.tags = tags or []
+
+    @property
+    def timestamp(self) -> datetime:
+        return us_to_datetime(self.timestamp_us)
+
+    @timestamp.setter
+    def timestamp(self, value: datetime) -> None:
+        self.timestamp_us = datetime_to_us(value)
+
+    @property
+    def sources(self) -> List[str]:
+        return list(self._sources)
+
+    @sources.setter
+    def sources(self, value: List[str]) -> None:
+        self._sources = _intern_list(value)
+
+    @property
+    def tags(self) -> List[str]:
+        return list(self._tags)
+
+    @tags.setter
+    def tags(self, value: List[str]) -> None:
+        self._tags = _intern_list(value)
 
     def to_frontmatter(self) -> str:
         """Generate YAML frontmatter for this record."""
         metadata = {
-            'timestamp': self.timestamp.strftime('%Y-%m-%d %H:%M'),
-            'sources': self.sources,
+            'id': self.id,
+            'timestamp': self.timestamp.replace(microsecond=0),
         }
 
+        if self.tags:
+            metadata['tags'] = self.tags
+
+        metadata['sources'] = self.sources
+
         if self.audio_file:
             metadata['audio'] = self.audio_file
 
-        return yaml.dump(metadata, default_flow_style=False, sort_keys=False)
+        return yaml.dump(metadata, Dumper=_YAML_DUMPER, default_flow_style=False, sort_keys=False)
 
     def to_markdown(self) -> str:
         """Generate full markdown content with frontmatter."""
         frontmatter = self.to_frontmatter()
         return f"---\n{frontmatter}---\n\n{self.content}\n"
 
+    def next_id(self) -> None:
+        """Move to the next free ID after a filename collision."""
+        timestamp = parse_record_id(self.id) or self.timestamp
+        self.id = format_record_id(timestamp + timedelta(microseconds=1))
+
     def get_filename(self, records_dir: Path) -> Path:
         """Generate filename for this record."""
-        # Format: YYYY-MM-DD--HH-MM-SS--first-words.txt
-        timestamp_str = self.timestamp.strftime('%Y-%m-%d--%H-%M-%S')
+        # Format: <record id>--first-words.md (sorts chronologically by name)
+        record_id = self.id
 
         # Extract first few words for filename suffix
         words = self.content.split()[:3]
@@ -50,9 +202,9 @@ class Record:
         suffix = suffix[:40]  # Limit length
 
         if suffix:
-            filename = f"{timestamp_str}--{suffix}.md"
+            filename = f"{record_id}--{suffix}.md"
         else:
-            filename = f"{timestamp_str}.md"
+            filename = f"{record_id}.md"
 
         return records_dir / filename
 
@@ -61,7 +213,11 @@ class Record:
         """Load a record from a file."""
         with open(filepath, 'r', encoding='utf-8') as f:
             content = f.read()
+        return cls.from_text(content, filepath.name)
 
+    @classmethod
+    def from_text(cls, content: str, filename: str) -> 'Record':
+        """Load a record from the text of a record file named ``filename``."""
         # Parse frontmatter
         if content.startswith('---\n'):
             parts = content.split('---\n', 2)
@@ -69,21 +225,40 @@ class Record:
                 frontmatter_str = parts[1]
                 body = parts[2].strip()
 
-                metadata = yaml.safe_load(frontmatter_str)
+                metadata = yaml.load(frontmatter_str, Loader=_YAML_LOADER) or {}
 
-                # Parse timestamp
-                timestamp_str = metadata.get('timestamp', '')
-                try:
-                    timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M')
-                except ValueError:
-                    timestamp = datetime.now()
+                # The ID carries full precision; legacy records only have
+                # a minute-precision timestamp and an ID-like filename (also
+                # when that legacy ID was later written to the frontmatter)
+                record_id = str(metadata.get('id') or record_id_from_filename(filename))
+                timestamp = None
+                match = RECORD_ID_PATTERN.match(record_id)
+                if 'id' in metadata and match and match.group(2):
+                    timestamp = parse_record_id(record_id)
+                if timestamp is None:
+                    timestamp = _parse_timestamp(metadata.get('timestamp'))
 
                 return cls(
                     content=body,
                     timestamp=timestamp,
                     sources=metadata.get('sources', ['stdin']),
                     audio_file=metadata.get('audio'),
+                    tags=metadata.get('tags') or [],
+                    record_id=record_id,
                 )
 
         # No frontmatter found, treat entire content as body
-        return cls(content=content)
+        record_id = record_id_from_filename(filename)
+        return cls(content=content, timestamp=parse_record_id(record_id), record_id=record_id)
+
+
+def _parse_timestamp(value) -> datetime:
+    """Parse a frontmatter timestamp (YAML may already have made it a datetime)."""
+    if isinstance(value, datetime):
+        return value
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M'):
+        try:
+            return datetime.strptime(str(value), fmt)
+        except ValueError:
+            continue
+    return datetime.now()
@@ -0,0 +1,248 @@
+"""Related records: TF-IDF vectors and cosine similarity over inverted postings.
+
+Every record is a sparse vector of ``(1 + log tf) * idf`` weights over its
+words. The vectors are stored as inverted postings in SQLite next to the
+search index (``$DIANE_DATA_HOME/index/related.sqlite``): one row per
+(term, record), plus the document frequency of each term and the norm of
+each record. A lookup reads the postings of the record's own terms only, so
+it touches the records that share a word with it, never the whole archive:
+
+- terms found in more than ``MAX_DF_RATIO`` of the records (and more than
+  ``MIN_MAX_DF`` of them: ``the``, ``and``) weigh next to nothing and are
+  skipped
+- long records are represented by their ``QUERY_TERMS`` heaviest terms
+
+``Storage.save`` adds new records once the index exists (first built by
+``diane related``), and ``refresh`` catches up on records changed elsewhere.
+Norms are computed with the idf of their day; they are recomputed when the
+archive has grown by ``RENORM_GROWTH`` since the last pass.
+"""
+
+import heapq
+import math
+import sqlite3
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import trace
+from .index import tokenize
+from .packs import iter_record_entries
+from .record import Record
+
+# Bump when the schema or weighting changes (forces a rebuild)
+RELATED_VERSION = 1
+
+MAX_DF_RATIO = 0.05
+MIN_MAX_DF = 100
+QUERY_TERMS = 100
+RENORM_GROWTH = 0.25
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    norm REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc INTEGER NOT NULL,
+    weight REAL NOT NULL,
+    PRIMARY KEY (term, doc)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc);
+"""
+
+
+def term_weights(text: str) -> Dict[str, float]:
+    """Sublinear term frequencies (``1 + log tf``) of a text."""
+    return {term: 1.0 + math.log(tf) for term, tf in Counter(tokenize(text)).items()}
+
+
+class RelatedIndex:
+    """TF-IDF postings of one records directory."""
+
+    def __init__(self, records_dir: Path, path: Path):
+        self.records_dir = records_dir
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), timeout=10)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            version = None
+            try:
+                row = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+                version = row[0] if row else None
+            except sqlite3.OperationalError:
+                pass
+            if version != RELATED_VERSION:
+                db.executescript('DROP TABLE IF EXISTS meta; DROP TABLE IF EXISTS docs; '
+                                 'DROP TABLE IF EXISTS terms; DROP TABLE IF EXISTS postings;')
+            db.executescript(_SCHEMA)
+            with db:
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (RELATED_VERSION,))
+            self._db = db
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def exists(self) -> bool:
+        """Whether the index has been built (so saves should update it)."""
+        return self.path.exists()
+
+    def _count(self) -> int:
+        return self.db.execute('SELECT count(*) FROM docs').fetchone()[0]
+
+    def _meta(self, key: str, default: int = 0) -> int:
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _idf(self, terms: List[str], count: int) -> Dict[str, float]:
+        """Smoothed idf of ``terms`` in an archive of ``count`` records."""
+        dfs: Dict[str, int] = {}
+        for i in range(0, len(terms), 500):
+            chunk = terms[i:i + 500]
+            marks = ','.join('?' * len(chunk))
+            dfs.update(self.db.execute(f'SELECT term, df FROM terms WHERE term IN ({marks})', chunk))
+        return {term: math.log((1 + count) / (1 + dfs.get(term, 0))) + 1.0 for term in terms}
+
+    def _remove(self, doc_id: int) -> None:
+        own_terms = '(SELECT term FROM postings WHERE doc = ?)'
+        self.db.execute(f'UPDATE terms SET df = df - 1 WHERE term IN {own_terms}', (doc_id,))
+        self.db.execute(f'DELETE FROM terms WHERE df <= 0 AND term IN {own_terms}', (doc_id,))
+        self.db.execute('DELETE FROM postings WHERE doc = ?', (doc_id,))
+        self.db.execute('DELETE FROM docs WHERE id = ?', (doc_id,))
+
+    def _add(self, name: str, text: str, mtime_ns: int, size: int, count: int) -> None:
+        row = self.db.execute('SELECT id FROM docs WHERE name = ?', (name,)).fetchone()
+        if row:
+            self._remove(row[0])
+        weights = term_weights(text)
+        idf = self._idf(list(weights), count + (0 if row else 1))
+        norm = math.sqrt(sum((w * idf[term]) ** 2 for term, w in weights.items())) or 1.0
+        doc_id = self.db.execute('INSERT INTO docs (name, mtime_ns, size, norm) VALUES (?, ?, ?, ?)',
+                                 (name, mtime_ns, size, norm)).lastrowid
+        self.db.executemany('INSERT INTO postings VALUES (?, ?, ?)',
+                            [(term, doc_id, w) for term, w in weights.items()])
+        self.db.executemany('INSERT INTO terms VALUES (?, 1) ON CONFLICT (term) DO UPDATE SET df = df + 1',
+                            [(term,) for term in weights])
+
+    def add(self, name: str, text: str, mtime_ns: int = 0, size: int = 0) -> None:
+        """Add (or replace) one record."""
+        with trace.span('related.add'):
+            with self.db:
+                self._add(name, text, mtime_ns, size, self._count())
+
+    def refresh(self) -> int:
+        """Index new or changed records and drop removed ones.
+
+        Returns:
+            Number of records added, updated or removed
+        """
+        changed = 0
+        with trace.span('related.refresh') as attrs:
+            known = {name: (doc_id, mtime_ns, size) for doc_id, name, mtime_ns, size
+                     in self.db.execute('SELECT id, name, mtime_ns, size FROM docs')}
+            count = len(known)
+            with self.db:
+                seen = set()
+                for entry in iter_record_entries(self.records_dir):
+                    seen.add(entry.name)
+                    doc = known.get(entry.name)
+                    if doc and doc[1] == entry.mtime_ns and doc[2] == entry.size:
+                        continue
+                    try:
+                        record = Record.from_text(entry.read_text(), entry.name)
+                    except Exception:
+                        # Skip files that can't be parsed
+                        continue
+                    self._add(entry.name, record.content, entry.mtime_ns, entry.size, count)
+                    if not doc:
+                        count += 1
+                    changed += 1
+
+                for name, (doc_id, _, _) in known.items():
+                    if name not in seen:
+                        self._remove(doc_id)
+                        count -= 1
+                        changed += 1
+
+            if count > self._meta('norm_docs') * (1 + RENORM_GROWTH):
+                self._renormalize(count)
+            attrs['docs'] = count
+            attrs['changed'] = changed
+        return changed
+
+    def _renormalize(self, count: int) -> None:
+        """Recompute every norm with the current idf."""
+        with trace.span('related.renormalize', docs=count):
+            idf = {term: math.log((1 + count) / (1 + df)) + 1.0
+                   for term, df in self.db.execute('SELECT term, df FROM terms')}
+            norms: Dict[int, float] = {}
+            for term, doc_id, weight in self.db.execute('SELECT term, doc, weight FROM postings'):
+                norms[doc_id] = norms.get(doc_id, 0.0) + (weight * idf.get(term, 1.0)) ** 2
+            with self.db:
+                self.db.executemany('UPDATE docs SET norm = ? WHERE id = ?',
+                                    [(math.sqrt(total) or 1.0, doc_id) for doc_id, total in norms.items()])
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('norm_docs', ?)", (count,))
+
+    def related(self, name: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Records most similar to ``name`` by TF-IDF cosine, best first.
+
+        Returns:
+            List of (filename, similarity), excluding ``name`` itself
+        """
+        with trace.span('related.query') as attrs:
+            row = self.db.execute('SELECT id FROM docs WHERE name = ?', (name,)).fetchone()
+            if not row:
+                return []
+            doc_id = row[0]
+            count = self._count()
+            max_df = max(MIN_MAX_DF, int(count * MAX_DF_RATIO))
+
+            query = {term: (weight, df) for term, weight, df in self.db.execute(
+                'SELECT p.term, p.weight, t.df FROM postings p JOIN terms t ON t.term = p.term '
+                'WHERE p.doc = ?', (doc_id,))}
+            # Weight of the term in both vectors folds into one idf² factor
+            scored = []
+            for term, (weight, df) in query.items():
+                if 1 < df <= max_df:
+                    idf = math.log((1 + count) / (1 + df)) + 1.0
+                    scored.append((weight * idf * idf, term))
+            scored = heapq.nlargest(QUERY_TERMS, scored)
+            attrs['terms'] = len(scored)
+            if not scored:
+                return []
+
+            values = ','.join('(?, ?)' for _ in scored)
+            params = [value for weight, term in scored for value in (term, weight)]
+            rows = self.db.execute(
+                f'WITH q (term, weight) AS (VALUES {values}) '
+                'SELECT d.name, SUM(q.weight * p.weight) / d.norm AS score '
+                'FROM q JOIN postings p ON p.term = q.term JOIN docs d ON d.id = p.doc '
+                'WHERE p.doc != ? GROUP BY p.doc ORDER BY score DESC LIMIT ?',
+                params + [doc_id, limit]
+            ).fetchall()
+
+            norm = self.db.execute('SELECT norm FROM docs WHERE id = ?', (doc_id,)).fetchone()[0]
+            attrs['results'] = len(rows)
+        return [(other, score / norm) for other, score in rows]
+
+
+def load_related(records_dir: Path, path: Path) -> RelatedIndex:
+    """Open the related index for ``records_dir`` and refresh it."""
+    index = RelatedIndex(records_dir, path)
+    index.refresh()
+    return index
@@ -0,0 +1,624 @@
+"""Semantic search: local embeddings in a memory-mapped vector index.
+
+Embedding backends are selected with ``DIANE_EMBED_MODEL``:
+
+- ``auto`` (default) - sentence-transformers if installed, else hashing
+- ``sentence-transformers:<model>`` - small local CPU model
+  (``all-MiniLM-L6-v2`` by default; ``pip install diane-cli[semantic]``)
+- ``hashing:<dim>`` - signed feature hashing of words and their character
+  trigrams; no model and no dependency, matches word forms but not synonyms
+
+A backend that is not installed falls back to hashing. The index lives next
+to the search index (``$DIANE_DATA_HOME/index/semantic/``) in append-only
+files of one generation each, so readers never see a half-written row:
+
+- ``rows-<gen>.tsv``: filename, mtime and size per row
+- ``vectors-<gen>.f32``: unit-length float32 rows, read through ``mmap``
+- ``sig-<gen>.u16``: ``LSH_TABLES`` random-hyperplane signatures per row
+- ``lsh-<gen>-<rows>.u64``: sorted ``(table, signature, row)`` keys, so the
+  rows sharing a query's bucket are found by binary search
+- ``meta.json``: backend, dimension, row counts and current files
+
+Above ``EXACT_LIMIT`` rows a query only scores the rows that share an LSH
+bucket with it (plus rows added since the keys were last sorted); below it,
+every row. Records are embedded in batches of ``BATCH_SIZE``, only when new
+or changed; the records are only listed again once a file was added to or
+removed from the records (or packs) directory. After a capture,
+``Storage.save`` starts ``python -m diane.semantic`` in its own session, so
+capture never waits for a model. The worker re-sorts the LSH keys only once
+``LSH_TAIL`` rows are waiting; ``--full`` sorts them all right away.
+"""
+
+import bisect
+import fcntl
+import heapq
+import importlib.util
+import json
+import math
+import mmap
+import os
+import random
+import subprocess
+import sys
+import zlib
+from array import array
+from operator import mul
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from . import trace
+from .config import config
+from .durability import atomic_write
+from .index import tokenize
+from .packs import PACKS_DIR, iter_record_entries
+from .record import Record
+
+# Bump when the file layout changes (forces a rebuild)
+SEMANTIC_VERSION = 1
+
+BATCH_SIZE = 64
+LSH_TABLES = 16
+LSH_BITS = 8
+# Extra buckets probed per table (see SemanticIndex._probes)
+LSH_PROBES = 2
+# Below this many rows every vector is scored (no LSH lookup)
+EXACT_LIMIT = 5000
+# Rows added since the keys were sorted, scored exactly until the next sort
+LSH_TAIL = 1000
+# Share of dead rows (edited or deleted records) that triggers a compaction
+COMPACT_RATIO = 0.1
+
+META_FILE = 'meta.json'
+LOCK_FILE = 'semantic.lock'
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+class Embedder:
+    """Base class for embedding backends (unit-length vectors)."""
+
+    name = 'base'
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @property
+    def spec(self) -> str:
+        """``<backend>:<model>``, stored with the index it built."""
+        return f'{self.name}:{self.model}'
+
+    @property
+    def dim(self) -> int:
+        raise NotImplementedError
+
+    def is_available(self) -> bool:
+        """Check if this backend can embed."""
+        raise NotImplementedError
+
+    def unavailable_reason(self) -> str:
+        return f"{self.name} embedding backend is not available"
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed a batch of texts."""
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """Signed feature hashing of words and character trigrams (no model)."""
+
+    name = 'hashing'
+
+    # Weight of each character trigram relative to its word
+    TRIGRAM_WEIGHT = 0.3
+
+    def __init__(self, model: str = '256'):
+        super().__init__(model)
+        self._dim = int(model)
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def is_available(self) -> bool:
+        return True
+
+    def _features(self, text: str) -> Dict[str, float]:
+        features: Dict[str, float] = {}
+        for word in tokenize(text):
+            features[word] = features.get(word, 0.0) + 1.0
+            padded = f'<{word}>'
+            for i in range(len(padded) - 2):
+                trigram = padded[i:i + 3]
+                features[trigram] = features.get(trigram, 0.0) + self.TRIGRAM_WEIGHT
+        return features
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self._dim
+            for feature, weight in self._features(text).items():
+                h = zlib.crc32(feature.encode('utf-8'))
+                # Sublinear weight; the top hash bit picks the sign
+                vector[h % self._dim] += math.sqrt(weight) if h >> 31 else -math.sqrt(weight)
+            vectors.append(_normalize(vector))
+        return vectors
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Local CPU embeddings with a sentence-transformers model."""
+
+    name = 'sentence-transformers'
+
+    def __init__(self, model: str = 'all-MiniLM-L6-v2'):
+        super().__init__(model)
+        self._model = None  # Loaded once, kept resident across calls
+
+    def is_available(self) -> bool:
+        return importlib.util.find_spec('sentence_transformers') is not None
+
+    def unavailable_reason(self) -> str:
+        return "sentence-transformers not installed. Run: pip install diane-cli[semantic]"
+
+    def load(self):
+        """Load the model (idempotent)."""
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model, device='cpu')
+        return self._model
+
+    @property
+    def dim(self) -> int:
+        return self.load().get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        return self.load().encode(list(texts), batch_size=BATCH_SIZE, normalize_embeddings=True,
+                                  show_progress_bar=False).tolist()
+
+
+# Backend prefix in DIANE_EMBED_MODEL -> (embedder class, default model)
+EMBED_BACKENDS = {
+    'hashing': (HashingEmbedder, '256'),
+    'sentence-transformers': (SentenceTransformerEmbedder, 'all-MiniLM-L6-v2'),
+}
+
+# Embedders are cached per spec so models stay loaded in long-running processes
+_embedders: Dict[str, Embedder] = {}
+
+
+def get_embedder(spec: Optional[str] = None) -> Embedder:
+    """Get the embedder selected by ``DIANE_EMBED_MODEL``.
+
+    Args:
+        spec: Backend spec overriding the configured one
+
+    Returns:
+        Cached Embedder instance; hashing if the backend is not installed
+    """
+    spec = spec or config.embed_model
+    if spec not in _embedders:
+        backend, _, model = spec.partition(':')
+        if backend == 'auto':
+            backend = 'sentence-transformers' if SentenceTransformerEmbedder().is_available() else 'hashing'
+        embedder: Embedder = HashingEmbedder()
+        if backend in EMBED_BACKENDS:
+            embedder_class, default = EMBED_BACKENDS[backend]
+            chosen = embedder_class(model or default)
+            if chosen.is_available():
+                embedder = chosen
+        _embedders[spec] = embedder
+    return _embedders[spec]
+
+
+class SemanticIndex:
+    """Embeddings of one records directory."""
+
+    def __init__(self, records_dir: Path, directory: Path, embedder: Optional[Embedder] = None):
+        self.records_dir = records_dir
+        self.directory = directory
+        self.meta_path = directory / META_FILE
+        self.lock_path = directory / LOCK_FILE
+        self._embedder = embedder
+        self._planes: Optional[List[List[float]]] = None
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    def exists(self) -> bool:
+        """Whether the index has been built (so saves should update it)."""
+        return self.meta_path.exists()
+
+    def load_meta(self) -> dict:
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return meta if meta.get('version') == SEMANTIC_VERSION else {}
+
+    def _save_meta(self, meta: dict) -> None:
+        atomic_write(self.meta_path, json.dumps(meta))
+
+    def _path(self, meta: dict, kind: str) -> Path:
+        suffix = {'rows': 'tsv', 'vectors': 'f32', 'sig': 'u16'}[kind]
+        return self.directory / f"{kind}-{meta['gen']}.{suffix}"
+
+    def _read_names(self, meta: dict) -> List[str]:
+        """Filenames of the committed rows."""
+        try:
+            with open(self._path(meta, 'rows'), 'rb') as f:
+                data = f.read(meta['rows_bytes']).decode('utf-8')
+        except OSError:
+            return []
+        return [line.partition('\t')[0] for line in data.splitlines()]
+
+    def _read_rows(self, meta: dict) -> List[Tuple[str, int, int]]:
+        """(filename, mtime_ns, size) of the committed rows."""
+        rows = []
+        try:
+            with open(self._path(meta, 'rows'), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if len(rows) == meta['rows']:
+                        break
+                    name, mtime_ns, size = line.rstrip('\n').split('\t')
+                    rows.append((name, int(mtime_ns), int(size)))
+        except OSError:
+            pass
+        return rows
+
+    # Signatures
+
+    def _hyperplanes(self, meta: dict) -> List[List[float]]:
+        """Random ±1 hyperplanes, derived from the seed of the index."""
+        if self._planes is None:
+            dim = meta['dim']
+            bits = random.Random(meta['seed']).randbytes(LSH_TABLES * LSH_BITS * dim)
+            self._planes = [[1.0 if b & 1 else -1.0 for b in bits[i:i + dim]]
+                            for i in range(0, len(bits), dim)]
+        return self._planes
+
+    def _projections(self, meta: dict, vector: List[float]) -> List[float]:
+        return [sum(map(mul, plane, vector)) for plane in self._hyperplanes(meta)]
+
+    def _signatures(self, meta: dict, vector: List[float]) -> List[int]:
+        """One ``LSH_BITS``-bit random-hyperplane signature per table."""
+        projections = self._projections(meta, vector)
+        signatures = []
+        for table in range(LSH_TABLES):
+            signature = 0
+            for bit in range(LSH_BITS):
+                if projections[table * LSH_BITS + bit] > 0:
+                    signature |= 1 << bit
+            signatures.append(signature)
+        return signatures
+
+    def _probes(self, meta: dict, vector: List[float]) -> Iterator[Tuple[int, int]]:
+        """(table, signature) buckets to visit for a query.
+
+        Besides its own bucket, each table is probed with the bits the query
+        is closest to the hyperplane of flipped one at a time (multi-probe
+        LSH): near neighbours most often land there.
+        """
+        projections = self._projections(meta, vector)
+        for table in range(LSH_TABLES):
+            own = projections[table * LSH_BITS:(table + 1) * LSH_BITS]
+            signature = sum(1 << bit for bit, p in enumerate(own) if p > 0)
+            yield table, signature
+            for bit in sorted(range(LSH_BITS), key=lambda b: abs(own[b]))[:LSH_PROBES]:
+                yield table, signature ^ (1 << bit)
+
+    # Writing (under the lock)
+
+    def refresh(self, wait: bool = False, lsh_tail: int = LSH_TAIL) -> Optional[int]:
+        """Embed new or changed records and drop removed ones.
+
+        Args:
+            wait: Wait for a running refresh instead of returning at once
+            lsh_tail: Re-sort the LSH keys when more rows than this were
+                added since the last sort
+
+        Returns:
+            Number of records embedded, or None if another process is
+            refreshing the index
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return None
+            return self._refresh(lsh_tail)
+
+    def _new_generation(self, meta: dict) -> dict:
+        """Meta of the next, empty generation (same hyperplanes if same backend)."""
+        embedder = self.embedder
+        same = meta.get('embedder') == embedder.spec
+        new = {
+            'version': SEMANTIC_VERSION,
+            'embedder': embedder.spec,
+            'dim': embedder.dim,
+            'seed': meta['seed'] if same else random.getrandbits(32),
+            'gen': meta.get('gen', 0) + 1,
+            'rows': 0,
+            'rows_bytes': 0,
+            'lsh': None,
+            'lsh_rows': 0,
+        }
+        for kind in ('rows', 'vectors', 'sig'):
+            self._path(new, kind).write_bytes(b'')
+        return new
+
+    def _drop_generation(self, meta: dict) -> None:
+        if 'gen' in meta:
+            for path in self.directory.glob(f"*-{meta['gen']}.*"):
+                path.unlink(missing_ok=True)
+            for path in self.directory.glob(f"lsh-{meta['gen']}-*.u64"):
+                path.unlink(missing_ok=True)
+
+    def _listing_stamp(self) -> List[int]:
+        """mtimes of the directories records are added to or removed from."""
+        stamp = []
+        for directory in (self.records_dir, self.records_dir / PACKS_DIR):
+            try:
+                stamp.append(directory.stat().st_mtime_ns)
+            except OSError:
+                stamp.append(0)
+        return stamp
+
+    def _refresh(self, lsh_tail: int) -> int:
+        meta = self.load_meta()
+        # Taken before listing: records added meanwhile are listed next time
+        stamp = self._listing_stamp()
+        if meta.get('embedder') == self.embedder.spec and meta.get('listed') == stamp:
+            if self._sort_due(meta, lsh_tail):
+                self._sort_lsh(meta)
+            return 0
+        if meta.get('embedder') != self.embedder.spec:
+            # New index, or another model: vectors are not comparable
+            old = meta
+            meta = self._new_generation(old)
+            self._planes = None
+            self._save_meta(meta)
+            self._drop_generation(old)
+
+        rows = self._read_rows(meta)
+        latest = {name: i for i, (name, _, _) in enumerate(rows)}
+
+        todo = []
+        seen: Set[str] = set()
+        for entry in iter_record_entries(self.records_dir):
+            seen.add(entry.name)
+            i = latest.get(entry.name)
+            if i is not None and rows[i][1] == entry.mtime_ns and rows[i][2] == entry.size:
+                continue
+            todo.append(entry)
+
+        embedded = 0
+        with trace.span('semantic.refresh', backend=self.embedder.spec) as attrs:
+            for start in range(0, len(todo), BATCH_SIZE):
+                batch = []
+                for entry in todo[start:start + BATCH_SIZE]:
+                    try:
+                        record = Record.from_text(entry.read_text(), entry.name)
+                    except Exception:
+                        # Skip files that can't be parsed
+                        continue
+                    batch.append(((entry.name, entry.mtime_ns, entry.size), record.content))
+                if batch:
+                    with trace.span('semantic.embed', texts=len(batch)):
+                        vectors = self.embedder.embed([text for _, text in batch])
+                    self._append(meta, [row for row, _ in batch], vectors)
+                    embedded += len(batch)
+            attrs['embedded'] = embedded
+            attrs['rows'] = meta['rows']
+
+        rows = self._read_rows(meta)
+        live = {i for name, i in {name: i for i, (name, _, _) in enumerate(rows)}.items() if name in seen}
+        if rows and len(rows) - len(live) > COMPACT_RATIO * len(rows):
+            meta = self._compact(meta, rows, live)
+
+        if self._sort_due(meta, lsh_tail):
+            self._sort_lsh(meta)
+        meta['listed'] = stamp
+        self._save_meta(meta)
+        return embedded
+
+    def _append(self, meta: dict, rows: List[Tuple[str, int, int]], vectors: List[List[float]]) -> None:
+        """Append rows to the current generation, then commit them in the meta."""
+        count, dim = meta['rows'], meta['dim']
+        lines = ''.join(f'{name}\t{mtime_ns}\t{size}\n' for name, mtime_ns, size in rows).encode('utf-8')
+        flat = array('f', [x for vector in vectors for x in vector])
+        signatures = array('H', [s for vector in vectors for s in self._signatures(meta, vector)])
+
+        # Cut whatever an interrupted append left past the committed rows
+        for kind, data, committed in (
+            ('rows', lines, meta['rows_bytes']),
+            ('vectors', flat.tobytes(), count * dim * flat.itemsize),
+            ('sig', signatures.tobytes(), count * LSH_TABLES * signatures.itemsize),
+        ):
+            with open(self._path(meta, kind), 'r+b') as f:
+                f.truncate(committed)
+                f.seek(committed)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta['rows'] = count + len(rows)
+        meta['rows_bytes'] += len(lines)
+        self._save_meta(meta)
+
+    def _compact(self, meta: dict, rows: List[Tuple[str, int, int]], live: Set[int]) -> dict:
+        """Copy the live rows into a new generation."""
+        with trace.span('semantic.compact', rows=len(rows), live=len(live)):
+            keep = sorted(live)
+            new = self._new_generation(meta)
+            dim = meta['dim']
+            vectors = array('f')
+            with open(self._path(meta, 'vectors'), 'rb') as f:
+                vectors.fromfile(f, meta['rows'] * dim)
+            signatures = array('H')
+            with open(self._path(meta, 'sig'), 'rb') as f:
+                signatures.fromfile(f, meta['rows'] * LSH_TABLES)
+
+            lines = ''.join('\t'.join(map(str, rows[i])) + '\n' for i in keep).encode('utf-8')
+            self._path(new, 'rows').write_bytes(lines)
+            kept = array('f')
+            kept_signatures = array('H')
+            for i in keep:
+                kept.extend(vectors[i * dim:(i + 1) * dim])
+                kept_signatures.extend(signatures[i * LSH_TABLES:(i + 1) * LSH_TABLES])
+            self._path(new, 'vectors').write_bytes(kept.tobytes())
+            self._path(new, 'sig').write_bytes(kept_signatures.tobytes())
+
+            new['rows'] = len(keep)
+            new['rows_bytes'] = len(lines)
+            self._save_meta(new)
+            self._drop_generation(meta)
+        return new
+
+    @staticmethod
+    def _sort_due(meta: dict, lsh_tail: int) -> bool:
+        """Whether more than ``lsh_tail`` rows are missing from the sorted keys."""
+        return meta['rows'] > EXACT_LIMIT and meta['rows'] - meta['lsh_rows'] > lsh_tail
+
+    def _sort_lsh(self, meta: dict) -> None:
+        """Write the sorted ``table << 48 | signature << 32 | row`` keys."""
+        with trace.span('semantic.sort_lsh', rows=meta['rows']):
+            signatures = array('H')
+            with open(self._path(meta, 'sig'), 'rb') as f:
+                signatures.fromfile(f, meta['rows'] * LSH_TABLES)
+            keys = array('Q', sorted(
+                table << 48 | signatures[row * LSH_TABLES + table] << 32 | row
+                for row in range(meta['rows'])
+                for table in range(LSH_TABLES)
+            ))
+            name = f"lsh-{meta['gen']}-{meta['rows']}.u64"
+            atomic_write(self.directory / name, keys.tobytes())
+
+            old = meta.get('lsh')
+            meta['lsh'] = name
+            meta['lsh_rows'] = meta['rows']
+            self._save_meta(meta)
+            if old and old != name:
+                (self.directory / old).unlink(missing_ok=True)
+
+    # Reading
+
+    def _candidates(self, meta: dict, query: List[float]) -> Set[int]:
+        """Rows sharing an LSH bucket with the query, plus the unsorted tail."""
+        candidates = set(range(meta['lsh_rows'], meta['rows']))
+        if not meta.get('lsh'):
+            return set(range(meta['rows']))
+        with open(self.directory / meta['lsh'], 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            keys = memoryview(mm).cast('Q')
+            try:
+                for table, signature in self._probes(meta, query):
+                    prefix = table << 48 | signature << 32
+                    lo = bisect.bisect_left(keys, prefix)
+                    hi = bisect.bisect_left(keys, prefix + (1 << 32), lo)
+                    candidates.update(keys[i] & 0xFFFFFFFF for i in range(lo, hi))
+            finally:
+                keys.release()
+        return candidates
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Records closest to ``query`` by cosine similarity, best first.
+
+        Returns:
+            List of (filename, similarity)
+        """
+        meta = self.load_meta()
+        if not meta.get('rows') or meta.get('embedder') != self.embedder.spec:
+            return []
+
+        with trace.span('semantic.search') as attrs:
+            vector = self.embedder.embed([query])[0]
+            names = self._read_names(meta)
+            # An edited record's newest row wins
+            live = set({name: i for i, name in enumerate(names)}.values())
+            candidates = live if meta['rows'] <= EXACT_LIMIT else self._candidates(meta, vector) & live
+            attrs['candidates'] = len(candidates)
+
+            dim = meta['dim']
+            with open(self._path(meta, 'vectors'), 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                vectors = memoryview(mm).cast('f')
+                try:
+                    scored = []
+                    for row in candidates:
+                        chunk = vectors[row * dim:(row + 1) * dim]
+                        scored.append((sum(map(mul, vector, chunk)), row))
+                        chunk.release()
+                finally:
+                    vectors.release()
+            best = heapq.nlargest(limit, scored)
+        return [(names[row], score) for score, row in best]
+
+    # Background worker
+
+    def is_running(self) -> bool:
+        """Check whether a refresh holds the lock."""
+        try:
+            with open(self.lock_path, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                return False
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def spawn(self) -> bool:
+        """Start a detached worker that embeds new records."""
+        try:
+            subprocess.Popen(
+                [sys.executable, '-m', 'diane.semantic', str(self.records_dir), str(self.directory)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                close_fds=True,
+            )
+            return True
+        except OSError:
+            return False
+
+    def request(self) -> bool:
+        """Make sure a worker will embed the records saved so far.
+
+        Returns:
+            True if a worker was started
+        """
+        # A running worker lists the records again before it exits
+        if self.is_running():
+            return False
+        return self.spawn()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Entry point of the detached worker: ``python -m diane.semantic RECORDS_DIR INDEX_DIR [--full]``.
+
+    ``--full`` waits for the index and sorts every LSH key; otherwise up to
+    ``LSH_TAIL`` new rows stay unsorted, so a capture doesn't rewrite them all.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    full = '--full' in argv
+    argv = [arg for arg in argv if arg != '--full']
+    if len(argv) != 2:
+        return 2
+    index = SemanticIndex(Path(argv[0]), Path(argv[1]))
+    # Until a pass finds nothing new (or another process holds the index)
+    while index.refresh(wait=full, lsh_tail=0 if full else LSH_TAIL):
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
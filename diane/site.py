@@ -0,0 +1,340 @@
+"""Incremental multi-page static site export.
+
+``diane export site -f DIR`` writes::
+
+    DIR/index.html              months, with record counts
+    DIR/months/YYYY-MM.html     days of the month, one link per record
+    DIR/days/YYYY-MM-DD.html    the records of one day, each with an anchor
+    DIR/style.css
+    DIR/manifest.json
+
+The manifest remembers a content hash for every record file (recomputed only
+when its mtime or size changes) and the input key every page was rendered
+from. A rerun renders only the pages whose key changed, so the cost of a
+rebuild after one new capture is one day page, one month page and the index,
+plus a directory scan. Day pages are rendered on a process pool when many of
+them changed (e.g. the first build).
+"""
+
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import trace
+from .durability import atomic_write
+from .packs import PackStore, iter_record_entries, read_record_text
+from .record import Record, parse_record_id, record_id_from_filename
+
+# Bump when the page templates change (forces a full re-render)
+SITE_VERSION = 1
+
+# Fewer changed day pages than this are rendered in-process
+PARALLEL_THRESHOLD = 16
+
+MANIFEST_NAME = 'manifest.json'
+
+STYLE = """body {
+    font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif;
+    max-width: 800px;
+    margin: 0 auto;
+    padding: 2rem;
+    background: #f5f5f5;
+}
+.record {
+    background: white;
+    padding: 1.5rem;
+    margin-bottom: 1rem;
+    border-radius: 8px;
+    box-shadow: 0 1px 3px rgba(0,0,0,0.1);
+}
+.timestamp {
+    color: #666;
+    font-size: 0.9rem;
+    margin-bottom: 0.5rem;
+}
+.timestamp a {
+    color: inherit;
+    text-decoration: none;
+}
+.tag {
+    display: inline-block;
+    background: #e3f2fd;
+    color: #1976d2;
+    padding: 0.2rem 0.6rem;
+    border-radius: 12px;
+    font-size: 0.85rem;
+    margin-left: 0.3rem;
+}
+.content {
+    line-height: 1.6;
+    white-space: pre-wrap;
+}
+nav {
+    margin-bottom: 1rem;
+}
+h1 {
+    color: #333;
+    border-bottom: 2px solid #1976d2;
+    padding-bottom: 0.5rem;
+}
+"""
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _page(title: str, root: str, body: List[str], nav: str = '') -> str:
+    """Wrap page body lines in the shared layout."""
+    lines = [
+        '<!DOCTYPE html>',
+        '<html lang="en">',
+        '<head>',
+        '    <meta charset="UTF-8">',
+        '    <meta name="viewport" content="width=device-width, initial-scale=1.0">',
+        f'    <title>{html.escape(title)}</title>',
+        f'    <link rel="stylesheet" href="{root}style.css">',
+        '</head>',
+        '<body>',
+    ]
+    if nav:
+        lines.append(f'    <nav>{nav}</nav>')
+    lines.append(f'    <h1>{html.escape(title)}</h1>')
+    lines.extend(body)
+    lines.extend(['</body>', '</html>', ''])
+    return '\n'.join(lines)
+
+
+def _link_text(name: str) -> str:
+    """Readable words from a record filename (``<id>--first-words.md``)."""
+    stem = name[:-3] if name.endswith('.md') else name
+    _, _, suffix = stem.rpartition('--')
+    return suffix.replace('-', ' ') if suffix and not suffix[0].isdigit() else ''
+
+
+def render_day(
+    records_dir: str,
+    output_dir: str,
+    day: str,
+    names: List[str],
+    title: str,
+) -> str:
+    """Render one day page (run in worker processes; arguments are picklable).
+
+    Returns:
+        The page's path relative to the output directory
+    """
+    packs = PackStore(Path(records_dir))
+    body = []
+    for name in names:
+        try:
+            record = Record.from_text(read_record_text(Path(records_dir), name, packs), name)
+        except Exception:
+            # Skip files that can't be parsed
+            continue
+
+        anchor = html.escape(record.id, quote=True)
+        tags = ''.join(f'<span class="tag">{html.escape(tag)}</span>' for tag in record.tags)
+        body.extend([
+            f'    <div class="record" id="{anchor}">',
+            '        <div class="timestamp">',
+            f'            <a href="#{anchor}">📅 {record.timestamp:%Y-%m-%d %H:%M:%S}</a>{tags}',
+            '        </div>',
+            f'        <div class="content">{html.escape(record.content)}</div>',
+            '    </div>',
+        ])
+
+    month = day[:7]
+    nav = f'<a href="../index.html">{html.escape(title)}</a> › <a href="../months/{month}.html">{month}</a>'
+    relpath = f'days/{day}.html'
+    path = Path(output_dir) / relpath
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, _page(day, '../', body, nav))
+    return relpath
+
+
+def _render_month(
+    output_dir: Path,
+    month: str,
+    days: Dict[str, List[Tuple[str, str]]],
+    title: str,
+) -> None:
+    body = []
+    for day in sorted(days, reverse=True):
+        body.append(f'    <h2><a href="../days/{day}.html">{day}</a></h2>')
+        body.append('    <ul>')
+        for name, time in days[day]:
+            anchor = html.escape(record_id_from_filename(name), quote=True)
+            text = html.escape(_link_text(name))
+            body.append(f'        <li><a href="../days/{day}.html#{anchor}">{time}</a> {text}</li>')
+        body.append('    </ul>')
+
+    nav = f'<a href="../index.html">{html.escape(title)}</a>'
+    path = output_dir / 'months' / f'{month}.html'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write(path, _page(month, '../', body, nav))
+
+
+def _render_index(output_dir: Path, months: Dict[str, int], title: str) -> None:
+    body = ['    <ul>']
+    for month in sorted(months, reverse=True):
+        body.append(f'        <li><a href="months/{month}.html">{month}</a> ({months[month]} records)</li>')
+    body.append('    </ul>')
+    atomic_write(output_dir / 'index.html', _page(title, '', body))
+
+
+class SiteBuilder:
+    """Builds (and incrementally rebuilds) the static site for a records directory."""
+
+    def __init__(self, records_dir: Path, output_dir: Path, title: str = "diane, Records"):
+        self.records_dir = records_dir
+        self.output_dir = output_dir
+        self.title = title
+        self.manifest_path = output_dir / MANIFEST_NAME
+        self.records: Dict[str, list] = {}
+        self.pages: Dict[str, str] = {}
+
+    def _load_manifest(self) -> None:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == SITE_VERSION and data.get('title') == self.title:
+            self.records = data.get('records', {})
+            self.pages = data.get('pages', {})
+
+    def _save_manifest(self) -> None:
+        atomic_write(self.manifest_path, json.dumps({
+            'version': SITE_VERSION,
+            'title': self.title,
+            'records': self.records,
+            'pages': self.pages,
+        }, separators=(',', ':')))
+
+    def _scan(self) -> None:
+        """Update per-record entries ``[mtime_ns, size, hash, day, HH:MM]``."""
+        records = {}
+        for entry in iter_record_entries(self.records_dir):
+            name = entry.name
+            known = self.records.get(name)
+            if known and known[0] == entry.mtime_ns and known[1] == entry.size:
+                records[name] = known
+                continue
+
+            data = entry.read_bytes()
+            timestamp = parse_record_id(name)
+            if timestamp is None:
+                try:
+                    timestamp = Record.from_text(data.decode('utf-8'), name).timestamp
+                except Exception:
+                    continue
+            records[name] = [
+                entry.mtime_ns,
+                entry.size,
+                _hash(data),
+                timestamp.strftime('%Y-%m-%d'),
+                timestamp.strftime('%H:%M'),
+            ]
+        self.records = records
+
+    def build(self, workers: Optional[int] = None) -> Dict[str, int]:
+        """Render every page whose inputs changed since the last build.
+
+        Args:
+            workers: Processes for rendering day pages (default: one per CPU)
+
+        Returns:
+            Counts of ``rendered``, ``unchanged`` and ``removed`` pages
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._load_manifest()
+
+        with trace.span('site.scan') as attrs:
+            self._scan()
+            attrs['records'] = len(self.records)
+
+        # Group by day and month (newest first within a day)
+        days: Dict[str, List[str]] = {}
+        for name, entry in self.records.items():
+            days.setdefault(entry[3], []).append(name)
+        months: Dict[str, Dict[str, List[Tuple[str, str]]]] = {}
+        for day, names in days.items():
+            names.sort(reverse=True)
+            months.setdefault(day[:7], {})[day] = [(n, self.records[n][4]) for n in names]
+
+        # Input key of every page; a page is rendered when its key changes
+        keys: Dict[str, str] = {}
+        for day, names in days.items():
+            keys[f'days/{day}.html'] = _hash(
+                '\n'.join(f'{n}:{self.records[n][2]}' for n in names).encode()
+            )
+        for month, month_days in months.items():
+            keys[f'months/{month}.html'] = _hash(json.dumps(month_days, sort_keys=True).encode())
+        month_counts = {m: sum(len(d) for d in md.values()) for m, md in months.items()}
+        keys['index.html'] = _hash(json.dumps(month_counts, sort_keys=True).encode())
+
+        stale = [
+            page for page, key in keys.items()
+            if self.pages.get(page) != key or not (self.output_dir / page).exists()
+        ]
+        stale_days = [page[5:-5] for page in stale if page.startswith('days/')]
+
+        with trace.span('site.render') as attrs:
+            workers = workers or os.cpu_count() or 1
+            if workers > 1 and len(stale_days) >= PARALLEL_THRESHOLD:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [
+                        pool.submit(render_day, str(self.records_dir), str(self.output_dir),
+                                    day, days[day], self.title)
+                        for day in stale_days
+                    ]
+                    for future in futures:
+                        future.result()
+            else:
+                for day in stale_days:
+                    render_day(str(self.records_dir), str(self.output_dir), day, days[day], self.title)
+
+            for page in stale:
+                if page.startswith('months/'):
+                    month = page[7:-5]
+                    _render_month(self.output_dir, month, months[month], self.title)
+            if 'index.html' in stale:
+                _render_index(self.output_dir, month_counts, self.title)
+            attrs['pages'] = len(stale)
+
+        style_path = self.output_dir / 'style.css'
+        if not style_path.exists() or style_path.read_text(encoding='utf-8') != STYLE:
+            atomic_write(style_path, STYLE)
+
+        # Pages whose day or month no longer has records
+        removed = 0
+        for page in set(self.pages) - set(keys):
+            try:
+                (self.output_dir / page).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        self.pages = keys
+        self._save_manifest()
+
+        return {
+            'rendered': len(stale),
+            'unchanged': len(keys) - len(stale),
+            'removed': removed,
+        }
+
+
+def build_site(
+    records_dir: Path,
+    output_dir: Path,
+    title: str = "diane, Records",
+    workers: Optional[int] = None,
+) -> Dict[str, int]:
+    """Build or update the static site for ``records_dir`` in ``output_dir``."""
+    return SiteBuilder(records_dir, output_dir, title).build(workers)
@@ -1,32 +1,41 @@
 """Statistics and analytics for diane records."""
 
+from array import array
 from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, Iterable
 
-from .record import Record
+from .record import Record, datetime_to_us, us_to_datetime
 
 
 class Statistics:
-    """Generate statistics about records."""
+    """Generate statistics about records.
 
-    def __init__(self, records: List[Record]):
-        self.records = records
+    Records are consumed once, while being iterated, and only aggregates are
+    kept (counts per day, word totals and one integer timestamp per record),
+    so ``Storage.iter_records()`` can be passed without holding every body.
+    """
+
+    def __init__(self, records: Iterable[Record]):
+        self._count = 0
+        self._words = 0
+        self._by_date: Counter = Counter()
+        self._timestamps = array('q')
+
+        for record in records:
+            self._count += 1
+            self._words += len(record.content.split())
+            self._by_date[record.timestamp.strftime('%Y-%m-%d')] += 1
+            self._timestamps.append(record.timestamp_us)
 
     def total_count(self) -> int:
         """Get total number of records."""
-        return len(self.records)
+        return self._count
 
 
     def records_by_date(self) -> Dict[str, int]:
         """Get count of records per day."""
-        date_counter = Counter()
-
-        for record in self.records:
-            date_str = record.timestamp.strftime('%Y-%m-%d')
-            date_counter[date_str] += 1
-
-        return dict(sorted(date_counter.items()))
+        return dict(sorted(self._by_date.items()))
 
     def recent_activity(self, days: int = 7) -> Dict[str, int]:
         """Get record counts for recent days.
@@ -37,30 +46,26 @@ class Statistics:
         Returns:
             Dictionary mapping date strings to counts
         """
-        cutoff = datetime.now() - timedelta(days=days)
+        cutoff = datetime_to_us(datetime.now() - timedelta(days=days))
         date_counter = Counter()
 
-        for record in self.records:
-            if record.timestamp >= cutoff:
-                date_str = record.timestamp.strftime('%Y-%m-%d')
+        for timestamp_us in self._timestamps:
+            if timestamp_us >= cutoff:
+                date_str = us_to_datetime(timestamp_us).strftime('%Y-%m-%d')
                 date_counter[date_str] += 1
 
         return dict(sorted(date_counter.items()))
 
     def word_count(self) -> int:
         """Get total word count across all records."""
-        total = 0
-        for record in self.records:
-            total += len(record.content.split())
-        return total
+        return self._words
 
     def average_words_per_record(self) -> float:
         """Get average words per record."""
-        if not self.records:
+        if not self._count:
             return 0.0
 
-        total_words = self.word_count()
-        return total_words / len(self.records)
+        return self._words / self._count
 
     def busiest_day(self) -> tuple:
         """Get the day with most records.
@@ -1,40 +1,102 @@
 """Storage management for diane records."""
 
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime, timedelta
 from difflib import SequenceMatcher
+import bisect
+import os
+import shutil
 import subprocess
+import time
 
+from . import trace
 from .config import config
-from .record import Record
+from .durability import atomic_write, get_group_committer, normalize_mode
+from .record import RECORD_ID_PATTERN, Record, is_record_id, record_id_from_filename
 from .encryption import GPGEncryption
+from .locking import PendingCommits, RepoLock
+from .maintenance import NO_AUTO_GC, Maintenance
+from .packs import PACKS_DIR, PackStore, read_record_text
+
+# Second-precision prefix shared by every record ID (and record filename)
+_ID_PREFIX = '%Y-%m-%d--%H-%M-%S'
+
+
+def id_range(
+    names: List[str],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    before: Optional[str] = None,
+) -> Tuple[int, int]:
+    """Find the slice of sorted record filenames inside a time range.
+
+    Legacy (second-precision) names count as microsecond zero of their second.
+
+    Args:
+        names: Record filenames, sorted ascending
+        since: Inclusive lower bound
+        until: Inclusive upper bound
+        before: Exclusive upper bound given as a record ID
+
+    Returns:
+        ``(lo, hi)`` such that ``names[lo:hi]`` is the range
+    """
+    lo, hi = 0, len(names)
+
+    if since:
+        key = since.strftime(_ID_PREFIX)
+        if since.microsecond:
+            # Legacy names of that second ('...-SS--') sort below this key
+            key += f'-{since.microsecond:06d}'
+        lo = bisect.bisect_left(names, key)
+
+    if until:
+        # Every ID of that second up to this microsecond sorts below the sentinel
+        key = f"{until.strftime(_ID_PREFIX)}-{until.microsecond:06d}\U0010ffff"
+        hi = bisect.bisect_right(names, key)
+
+    if before:
+        hi = min(hi, bisect.bisect_left(names, before))
+
+    return lo, max(lo, hi)
 
 
 class Storage:
     """Handles saving and retrieving records."""
 
-    def __init__(self):
-        self.records_dir = config.get_records_dir()
-        self._ensure_initialized()
+    def __init__(self, records_dir: Optional[Path] = None):
+        self.records_dir = records_dir or config.get_records_dir()
+        self.packs = PackStore(self.records_dir)
+        self.maintenance = Maintenance(self.records_dir)
+        self.pending = PendingCommits(self.records_dir)
+        # Earlier record the last save was a near-duplicate of (DIANE_DEDUPE)
+        self.last_duplicate: Optional[str] = None
+        self.last_duplicate_packed = False
+        with trace.span('storage.init'):
+            self._ensure_initialized()
+            # Captures that could not commit last time (lock timeout, git error)
+            if config.use_git and self.pending:
+                self.commit_pending()
 
     def _ensure_initialized(self):
         """Ensure storage directories and git repo are initialized."""
         config.ensure_directories()
+        self.records_dir.mkdir(parents=True, exist_ok=True)
 
         # Initialize git repo if enabled and not already present
         if config.use_git:
             git_dir = self.records_dir / '.git'
             if not git_dir.exists():
                 try:
-                    subprocess.run(
+                    trace.run(
                         ['git', 'init'],
                         cwd=self.records_dir,
                         check=True,
                         capture_output=True
                     )
                     # Disable GPG signing for this repo
-                    subprocess.run(
+                    trace.run(
                         ['git', 'config', 'commit.gpgsign', 'false'],
                         cwd=self.records_dir,
                         check=True,
@@ -44,13 +106,13 @@ class Storage:
                     gitignore = self.records_dir / '.gitignore'
                     if not gitignore.exists():
                         gitignore.write_text('*.tmp\n*.swp\n')
-                        subprocess.run(
+                        trace.run(
                             ['git', 'add', '.gitignore'],
                             cwd=self.records_dir,
                             check=True,
                             capture_output=True
                         )
-                        subprocess.run(
+                        trace.run(
                             ['git', 'commit', '-m', 'Initialize diane records'],
                             cwd=self.records_dir,
                             check=True,
@@ -60,24 +122,57 @@ class Storage:
                     # Git not available or failed, continue without it
                     config.use_git = False
 
-    def save(self, record: Record) -> Path:
+    def save(self, record: Record) -> Optional[Path]:
         """Save a record to storage.
 
         Args:
             record: The record to save
 
         Returns:
-            Path to the saved file
+            Path to the saved file, or None if ``DIANE_DEDUPE=skip`` skipped it
+            as a near-duplicate of ``last_duplicate`` (which may be packed, see
+            ``last_duplicate_packed``)
         """
-        filepath = record.get_filename(self.records_dir)
+        fingerprint = None
+        self.last_duplicate = None
+        self.last_duplicate_packed = False
+        if config.dedupe in ('flag', 'skip'):
+            fingerprint, self.last_duplicate, self.last_duplicate_packed = self._find_duplicate(record)
+            # Audio captures are always kept: the recording itself differs
+            if self.last_duplicate and config.dedupe == 'skip' and not record.audio_file:
+                return None
+
+        # Write the record (always unencrypted locally). Never replace an
+        # existing record: on an ID collision move to the next free ID.
+        with trace.span('storage.write') as attrs:
+            while True:
+                filepath = record.get_filename(self.records_dir)
+                try:
+                    self._write(filepath, record.to_markdown())
+                    break
+                except FileExistsError:
+                    record.next_id()
+            attrs['file'] = filepath.name
+
+        if fingerprint is not None:
+            self._index_fingerprint(filepath, fingerprint)
 
-        # Write the record (always unencrypted locally)
-        content = record.to_markdown()
-        filepath.write_text(content, encoding='utf-8')
+        # Keep the related-records index current, once it has been built
+        if self._index_path('related.sqlite').exists():
+            self._index_related(filepath, record)
 
-        # Git commit if enabled
+        # Embed it in the background, once semantic search has been used
+        semantic = self._semantic_index()
+        if semantic.exists():
+            semantic.request()
+
+        # Git commit if enabled (together with archived audio, if any)
         if config.use_git:
-            self._git_commit(filepath)
+            paths = [filepath]
+            audio = self._archived_audio(record)
+            if audio:
+                paths.append(audio)
+            self._git_commit(*paths)
 
         # Auto-sync if enabled
         if config.auto_sync:
@@ -85,71 +180,486 @@ class Storage:
 
         return filepath
 
-    def _git_commit(self, filepath: Path):
-        """Commit a file to git."""
+    def _find_duplicate(self, record: Record):
+        """Look ``record`` up in the fingerprint table (its LSH buckets only).
+
+        Returns:
+            Tuple of (fingerprint of the record, name of the closest earlier
+            record within ``config.dedupe_distance`` or None, whether that
+            record is packed)
+        """
+        import sqlite3
+        from .dedupe import FingerprintIndex, simhash
+
+        with trace.span('storage.dedupe') as attrs:
+            fingerprint = simhash(record.content)
+            fingerprints = FingerprintIndex(self.records_dir, self._index_path('fingerprints.sqlite'))
+            try:
+                matches = fingerprints.near(fingerprint, config.dedupe_distance)
+            except sqlite3.Error:
+                # No check rather than a failed capture
+                matches = []
+            finally:
+                fingerprints.close()
+
+            duplicate, packed = None, False
+            for name, _ in matches:
+                # The table may still list records deleted since
+                if (self.records_dir / name).exists():
+                    duplicate = name
+                    break
+                if name in self.packs.names():
+                    duplicate, packed = name, True
+                    break
+            attrs['duplicate'] = duplicate
+        return fingerprint, duplicate, packed
+
+    def _index_fingerprint(self, filepath: Path, fingerprint: int):
+        """Add a saved record to the fingerprint table."""
+        import sqlite3
+        from .dedupe import FingerprintIndex
+
+        fingerprints = FingerprintIndex(self.records_dir, self._index_path('fingerprints.sqlite'))
+        try:
+            stat = filepath.stat()
+            fingerprints.add(filepath.name, fingerprint, stat.st_mtime_ns, stat.st_size)
+        except (sqlite3.Error, OSError):
+            # The next 'diane dedupe' catches up; never fail a capture
+            pass
+        finally:
+            fingerprints.close()
+
+    def _index_related(self, filepath: Path, record: Record):
+        """Add a saved record to the related-records index."""
+        import sqlite3
+        from .related import RelatedIndex
+
+        index = RelatedIndex(self.records_dir, self._index_path('related.sqlite'))
         try:
-            subprocess.run(
-                ['git', 'add', filepath.name],
-                cwd=self.records_dir,
-                check=True,
-                capture_output=True
-            )
-            commit_msg = f"Record: {filepath.name}"
-            subprocess.run(
-                ['git', 'commit', '-m', commit_msg],
-                cwd=self.records_dir,
-                check=True,
-                capture_output=True
-            )
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            # Git operation failed, silently continue
+            stat = filepath.stat()
+            index.add(filepath.name, record.content, stat.st_mtime_ns, stat.st_size)
+        except (sqlite3.Error, OSError):
+            # The next 'diane related' catches up; never fail a capture
             pass
+        finally:
+            index.close()
+
+    def _write(self, filepath: Path, content: str):
+        """Atomically write a record file with the configured durability."""
+        mode = normalize_mode(config.durability)
+        atomic_write(filepath, content, fsync=(mode == 'fsync'), overwrite=False)
+        if mode == 'group':
+            get_group_committer(config.group_fsync_ms).add(filepath)
+
+    def flush(self):
+        """Make all records written so far durable (group durability mode)."""
+        if normalize_mode(config.durability) == 'group':
+            get_group_committer(config.group_fsync_ms).flush()
+
+    def archive_audio(self, audio_path: Path) -> str:
+        """Move an audio file into the records store, compressing it first.
+
+        Args:
+            audio_path: Path to the audio file to keep
+
+        Returns:
+            Path of the archived file relative to the records directory,
+            suitable for ``Record.audio_file``
+        """
+        from .audio import get_audio_encoder
+
+        audio_dir = self.records_dir / config.audio_dir.name
+        audio_dir.mkdir(parents=True, exist_ok=True)
+
+        encoder = get_audio_encoder()
+        if encoder.is_available() and not encoder.is_encoded(audio_path):
+            success, _, encoded_path = encoder.encode(audio_path, output_dir=audio_dir)
+            if success:
+                audio_path.unlink()
+                return str(encoded_path.relative_to(self.records_dir))
+
+        archived_path = audio_dir / audio_path.name
+        shutil.move(str(audio_path), str(archived_path))
+        return str(archived_path.relative_to(self.records_dir))
+
+    def _archived_audio(self, record: Record) -> Optional[Path]:
+        """Return the record's audio file if it lives in the records store.
+
+        Audio transcribed from a user's own file keeps its original path;
+        only audio moved in by ``archive_audio`` belongs in the repository.
+        """
+        if not record.audio_file:
+            return None
+        path = (self.records_dir / record.audio_file).resolve()
+        if not path.is_relative_to(self.records_dir.resolve()) or not path.exists():
+            return None
+        return self.records_dir / path.relative_to(self.records_dir.resolve())
+
+    def import_records(self, records: Iterable[Record]) -> Dict[str, int]:
+        """Add or update records by ID (e.g. from an export feed).
+
+        A record whose ID already exists replaces that file if its content
+        differs; new IDs are written like ``save``. Everything is committed
+        to git once at the end.
+
+        Args:
+            records: Records to import
+
+        Returns:
+            Counts of ``added``, ``updated`` and ``unchanged`` records
+
+        Raises:
+            ValueError: If a record ID is not a valid ID (it becomes a filename)
+        """
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+        existing = {record_id_from_filename(name): name for name in self._record_names()}
+        changed: List[Path] = []
+
+        try:
+            with trace.span('storage.import') as attrs:
+                for record in records:
+                    if not is_record_id(record.id):
+                        raise ValueError(f"invalid record id {record.id!r}")
+                    markdown = record.to_markdown()
+                    name = existing.get(record.id)
+
+                    if name is None:
+                        filepath = record.get_filename(self.records_dir)
+                        self._write(filepath, markdown)
+                        existing[record.id] = filepath.name
+                        counts['added'] += 1
+                    else:
+                        # Packed records are updated with a loose copy, which shadows them
+                        filepath = self.records_dir / name
+                        if self._read_text(name) == markdown:
+                            counts['unchanged'] += 1
+                            continue
+                        mode = normalize_mode(config.durability)
+                        atomic_write(filepath, markdown, fsync=(mode != 'none'))
+                        counts['updated'] += 1
+                    changed.append(filepath)
+                attrs.update(counts)
+        finally:
+            # Commit whatever was written, even if the input broke off halfway
+            self.flush()
+            if config.use_git and changed:
+                self._git_commit(
+                    *changed,
+                    message=f"Import {counts['added']} new, {counts['updated']} updated records"
+                )
+
+        return counts
+
+    def pack(
+        self,
+        older_than_days: Optional[int] = None,
+        codec: Optional[str] = None,
+        dry_run: bool = False,
+    ) -> Dict[str, int]:
+        """Move old loose records into compressed monthly packs.
+
+        Args:
+            older_than_days: Age from which records are packed
+                (default: ``config.pack_after_days``)
+            codec: ``gzip`` or ``zstd`` (default: ``config.pack_codec``)
+            dry_run: Only report what would be packed
+
+        Returns:
+            Number of records packed per month (``YYYY-MM``)
+        """
+        if older_than_days is None:
+            older_than_days = config.pack_after_days
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime(_ID_PREFIX)
+
+        # Only loose files with an ID prefix (their month) older than the cutoff
+        months: Dict[str, List[str]] = {}
+        for name in sorted(os.listdir(self.records_dir)):
+            if name.endswith('.md') and name < cutoff and RECORD_ID_PATTERN.match(name):
+                months.setdefault(name[:7], []).append(name)
+
+        counts = {month: len(names) for month, names in months.items()}
+        if dry_run or not months:
+            return counts
+
+        packed: List[str] = []
+        with trace.span('storage.pack') as attrs:
+            for month, names in months.items():
+                items = []
+                for name in names:
+                    path = self.records_dir / name
+                    stat = path.stat()
+                    items.append((name, path.read_bytes(), stat.st_mtime_ns, stat.st_size))
+                self.packs.add(month, items, codec or config.pack_codec)
+
+                # The pack and its index are durable: the loose copies can go
+                for name in names:
+                    (self.records_dir / name).unlink()
+                packed.extend(names)
+            attrs['records'] = len(packed)
+            attrs['months'] = len(months)
+
+        if config.use_git:
+            # One commit for the whole run (the packs and the deleted loose
+            # copies), left pending like a capture if it can't be made now
+            self._commit_paths([PACKS_DIR] + packed,
+                               f"Pack {len(packed)} records into {len(months)} monthly archives")
+
+        return counts
+
+    def _git_commit(self, filepath: Path, *extra_paths: Path, message: Optional[str] = None):
+        """Commit a file (and any companion files) to git."""
+        paths = [str(p.relative_to(self.records_dir)) for p in (filepath, *extra_paths)]
+        self._commit_paths(paths, message or f"Record: {filepath.name}")
+
+    def commit_pending(self) -> bool:
+        """Commit records left uncommitted by earlier captures.
+
+        Returns:
+            True if nothing is left pending
+        """
+        self._commit_paths([], "Commit pending records")
+        return not self.pending
+
+    def _commit_paths(self, paths: List[str], message: str):
+        """Commit paths and any pending ones under the repository lock.
+
+        A commit that cannot take the lock in time, or that git refuses,
+        leaves its paths pending for the next one instead of blocking or
+        losing them.
+        """
+        lock = RepoLock(self.records_dir)
+        if not lock.acquire():
+            self.pending.add(paths)
+            return
+        try:
+            pending = [path for path in self.pending.take() if path not in paths]
+            if not paths and not pending:
+                return
+            if pending:
+                message = f"{message}\n\nAlso commits {len(pending)} pending:\n" + '\n'.join(pending)
+            if not self._try_commit(paths + pending, message):
+                self.pending.add(paths + pending)
+        finally:
+            lock.release()
+
+    def _tracked_or_existing(self, paths: List[str]) -> List[str]:
+        """Drop missing paths git never tracked (``git add`` would reject them)."""
+        missing = [path for path in paths if not (self.records_dir / path).exists()]
+        if not missing:
+            return paths
+        # Rare (packs, pending deletions): list the index rather than pass paths in argv
+        result = trace.run(
+            ['git', 'ls-files', '-z'],
+            cwd=self.records_dir,
+            capture_output=True,
+            text=True
+        )
+        tracked = set(result.stdout.split('\0')) & set(missing)
+        return [path for path in paths if path in tracked or (self.records_dir / path).exists()]
+
+    def _try_commit(self, paths: List[str], message: str, retry_delays=(0.05, 0.2, 0.5)) -> bool:
+        """``git add`` and ``git commit``, retried while another git holds the index."""
+        try:
+            paths = self._tracked_or_existing(paths)
+        except FileNotFoundError:
+            return False
+        if not paths:
+            return True
+        for delay in (*retry_delays, None):
+            try:
+                trace.run(
+                    ['git', 'add', '-A', '--pathspec-from-file=-'],
+                    input='\n'.join(paths) + '\n',
+                    cwd=self.records_dir,
+                    check=True,
+                    capture_output=True,
+                    text=True
+                )
+                result = trace.run(
+                    ['git', *NO_AUTO_GC, 'commit', '-m', message],
+                    cwd=self.records_dir,
+                    capture_output=True,
+                    text=True
+                )
+                if result.returncode == 0:
+                    # Repacking happens in a background worker, off the capture path
+                    self.maintenance.note_commit()
+                    return True
+                if 'nothing to commit' in result.stdout:
+                    return True
+                error = result.stderr
+            except subprocess.CalledProcessError as e:
+                error = e.stderr or ''
+            except FileNotFoundError:
+                return False
+            # Only a git outside diane's lock (an editor, a shell) is worth waiting for
+            if delay is None or 'index.lock' not in error:
+                return False
+            time.sleep(delay)
+        return False
 
     def _auto_sync_async(self):
-        """Trigger async auto-sync after save."""
+        """Queue an auto-sync after save (run by a detached worker)."""
         try:
             from .sync import GitSync
-            git_sync = GitSync(self.records_dir)
-            git_sync.sync_async()
+            # Nothing is queued (and no worker started) without a remote
+            GitSync(self.records_dir).sync_async()
         except Exception:
             # Silently fail - don't block save operation
             pass
 
+    def _record_names(self) -> List[str]:
+        """Get all record filenames, loose and packed, oldest first.
+
+        Filenames sort chronologically.
+        """
+        with trace.span('storage.glob') as attrs:
+            loose = [
+                name for name in os.listdir(self.records_dir)
+                if name.endswith('.md') and not name.startswith('.')
+            ]
+            packed = self.packs.names()
+            if packed:
+                names = sorted(set(loose).union(packed))
+            else:
+                names = sorted(loose)
+            attrs['files'] = len(loose)
+            attrs['packed'] = len(packed)
+        return names
+
+    def _read_text(self, name: str) -> str:
+        """Text of a record file, loose or packed (loose copies win)."""
+        return read_record_text(self.records_dir, name, self.packs)
+
+    def _read_record(self, name: str) -> Record:
+        """Load a record by filename, loose or packed."""
+        return Record.from_text(self._read_text(name), name)
+
+    def _record_slice(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        before: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[str]:
+        """Iterate over record filenames, newest first.
+
+        Filenames start with the record ID, so the range is found by bisecting
+        the sorted listing: no file outside it is opened. Only the (small)
+        filenames are held in memory.
+
+        Args:
+            since: Only files whose ID time is at or after this time
+            until: Only files whose ID time is at or before this time
+            before: Only files whose ID sorts before this record ID (cursor)
+            offset: Number of files to skip after the other bounds
+        """
+        names = self._record_names()
+        lo, hi = id_range(names, since, until, before)
+
+        # Files without an ID prefix can't be placed in time: skip them in ranges
+        bounded = since is not None or until is not None
+        for index in range(hi - 1, lo - 1, -1):
+            name = names[index]
+            if bounded and not RECORD_ID_PATTERN.match(name):
+                continue
+            if offset:
+                offset -= 1
+                continue
+            yield name
+
+    def iter_records(
+        self,
+        limit: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        before: Optional[str] = None,
+        offset: int = 0,
+    ) -> Iterator[Record]:
+        """Iterate over records, newest first, parsing one file at a time.
+
+        Time bounds apply to the record ID (the filename prefix), so only the
+        files in the range are parsed.
+
+        Args:
+            limit: Maximum number of records to yield
+            since: Only yield records from this time on
+            until: Only yield records up to this time (inclusive)
+            before: Only yield records older than this record ID (cursor
+                returned by a previous page)
+            offset: Number of records to skip
+
+        Yields:
+            Record objects
+        """
+        count = 0
+
+        with trace.span('storage.parse', op='list') as attrs:
+            for name in self._record_slice(since, until, before, offset):
+                try:
+                    record = self._read_record(name)
+                except Exception:
+                    # Skip files that can't be parsed
+                    continue
+
+                count += 1
+                attrs['records'] = count
+                yield record
+
+                if limit and count >= limit:
+                    break
+
     def list_records(
         self,
         limit: Optional[int] = None,
         since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        before: Optional[str] = None,
+        offset: int = 0,
     ) -> List[Record]:
         """List records from storage.
 
         Args:
             limit: Maximum number of records to return
             since: Only return records after this time
+            until: Only return records up to this time
+            before: Only return records older than this record ID
+            offset: Number of records to skip
 
         Returns:
             List of Record objects
         """
-        records = []
-
-        # Get all markdown files
-        for filepath in sorted(self.records_dir.glob('*.md'), reverse=True):
-            try:
-                record = Record.from_file(filepath)
+        return list(self.iter_records(
+            limit=limit, since=since, until=until, before=before, offset=offset
+        ))
 
-                # Apply filters
-                if since and record.timestamp < since:
-                    continue
+    def iter_search(self, query: str, case_sensitive: bool = False) -> Iterator[Record]:
+        """Iterate over records containing ``query``, newest first.
 
-                records.append(record)
+        Args:
+            query: Search query string
+            case_sensitive: Whether search should be case-sensitive
 
-                if limit and len(records) >= limit:
-                    break
+        Yields:
+            Matching Record objects
+        """
+        if not case_sensitive:
+            query = query.lower()
 
-            except Exception:
-                # Skip files that can't be parsed
-                continue
+        with trace.span('storage.parse', op='search') as attrs:
+            matches = 0
+            for name in self._record_slice():
+                try:
+                    record = self._read_record(name)
+                except Exception:
+                    # Skip files that can't be parsed
+                    continue
 
-        return records
+                search_text = record.content if case_sensitive else record.content.lower()
+                if query in search_text:
+                    matches += 1
+                    attrs['matches'] = matches
+                    yield record
 
     def search(self, query: str, case_sensitive: bool = False) -> List[Record]:
         """Search records by content.
@@ -161,27 +671,218 @@ class Storage:
         Returns:
             List of matching Record objects
         """
-        results = []
+        results = list(self.iter_search(query, case_sensitive))
 
-        if not case_sensitive:
-            query = query.lower()
+        # Sort by timestamp, most recent first
+        results.sort(key=lambda r: r.timestamp_us, reverse=True)
+        return results
 
-        for filepath in self.records_dir.glob('*.md'):
-            try:
-                record = Record.from_file(filepath)
-                search_text = record.content if case_sensitive else record.content.lower()
+    def regex_search(
+        self,
+        pattern: str,
+        case_sensitive: Optional[bool] = None,
+        workers: Optional[int] = None,
+    ) -> List[Record]:
+        """Search record bodies with a regular expression, newest first.
 
-                if query in search_text:
-                    results.append(record)
+        Files are scanned as raw bytes (see ``diane.grep``); only matching
+        files are parsed into records.
+
+        Args:
+            pattern: Regular expression (raises ``re.error`` if invalid)
+            case_sensitive: Force case (in)sensitivity; default is smart case
+            workers: Worker processes for large archives
 
+        Returns:
+            List of matching Record objects
+        """
+        from .grep import body_matches, compile_pattern, grep_names
+
+        regex = compile_pattern(pattern, case_sensitive)
+
+        with trace.span('storage.grep') as attrs:
+            names = list(reversed(self._record_names()))
+            packed = self.packs.names()
+
+            # Loose files are scanned in place; packed-only records are decompressed
+            loose = [n for n in names if n not in packed or (self.records_dir / n).exists()]
+            matches = set(grep_names(self.records_dir, loose, regex, workers))
+            loose_names = set(loose)
+            for name in names:
+                if name not in loose_names and body_matches(self.packs.read(name), regex):
+                    matches.add(name)
+
+            names = [name for name in names if name in matches]
+            attrs['matches'] = len(names)
+
+        results = []
+        for name in names:
+            try:
+                results.append(self._read_record(name))
             except Exception:
                 # Skip files that can't be parsed
                 continue
+        return results
 
-        # Sort by timestamp, most recent first
-        results.sort(key=lambda r: r.timestamp, reverse=True)
+    def rank_search(self, query: str, limit: int = 10) -> List[Tuple[Record, float]]:
+        """Search records by relevance (BM25 with a recency boost).
+
+        Term statistics come from the index under ``config.index_dir``, which
+        is refreshed for new or changed records first.
+
+        Args:
+            query: Search query string
+            limit: Number of results to return
+
+        Returns:
+            List of tuples (Record, score), best first
+        """
+        from .index import load_index
+
+        index = load_index(self.records_dir, self._index_path('terms.sqlite'))
+        try:
+            ranked = index.rank(query, limit=limit)
+        finally:
+            index.close()
+
+        results = []
+        with trace.span('storage.parse', op='rank_search'):
+            for name, score in ranked:
+                try:
+                    results.append((self._read_record(name), score))
+                except Exception:
+                    # Skip files that can't be parsed
+                    continue
         return results
 
+    def near_duplicates(self, max_distance: Optional[int] = None) -> List[List[Record]]:
+        """Cluster the archive into groups of near-identical records.
+
+        Fingerprints (see ``diane.dedupe``) are refreshed for new or changed
+        records first.
+
+        Args:
+            max_distance: Maximum SimHash distance in bits
+                (default: ``config.dedupe_distance``)
+
+        Returns:
+            Groups of two or more records, each oldest first
+        """
+        from .dedupe import load_fingerprints
+
+        if max_distance is None:
+            max_distance = config.dedupe_distance
+        fingerprints = load_fingerprints(self.records_dir, self._index_path('fingerprints.sqlite'))
+        try:
+            clusters = fingerprints.clusters(max_distance)
+        finally:
+            fingerprints.close()
+
+        groups = []
+        with trace.span('storage.parse', op='near_duplicates'):
+            for names in clusters:
+                records = []
+                for name in names:
+                    try:
+                        records.append(self._read_record(name))
+                    except Exception:
+                        # Skip files that can't be parsed
+                        continue
+                if len(records) > 1:
+                    groups.append(records)
+        return groups
+
+    def find_name(self, ref: str) -> Optional[str]:
+        """Filename of the record with this ID, ID prefix or filename.
+
+        Returns:
+            The filename, or None if no record (or more than one) matches
+        """
+        names = self._record_names()
+        prefix = ref[:-3] if ref.endswith('.md') else ref
+        i = bisect.bisect_left(names, prefix)
+        matches = []
+        while i < len(names) and names[i].startswith(prefix) and len(matches) < 2:
+            matches.append(names[i])
+            i += 1
+        return matches[0] if len(matches) == 1 else None
+
+    def related(self, name: str, limit: int = 10, refresh: bool = True) -> List[Tuple[Record, float]]:
+        """Find the records most similar to a record (TF-IDF cosine).
+
+        Vectors come from the index under ``config.index_dir``, which is
+        refreshed for new or changed records first (and built on first use).
+
+        Args:
+            name: Filename of the record
+            limit: Number of results to return
+            refresh: Bring the index up to date first (skip for repeated
+                lookups, e.g. in the TUI)
+
+        Returns:
+            List of tuples (Record, similarity), best first
+        """
+        from .related import RelatedIndex, load_related
+
+        path = self._index_path('related.sqlite')
+        if refresh or not path.exists():
+            index = load_related(self.records_dir, path)
+        else:
+            index = RelatedIndex(self.records_dir, path)
+        try:
+            matches = index.related(name, limit=limit)
+        finally:
+            index.close()
+
+        results = []
+        with trace.span('storage.parse', op='related'):
+            for other, score in matches:
+                try:
+                    results.append((self._read_record(other), score))
+                except Exception:
+                    # Skip files that can't be parsed
+                    continue
+        return results
+
+    def semantic_search(self, query: str, limit: int = 10) -> List[Tuple[Record, float]]:
+        """Search records by meaning (cosine similarity of embeddings).
+
+        Embeddings come from the index under ``config.index_dir`` (see
+        ``diane.semantic``). Records saved since are usually embedded by the
+        background worker already; the rest are embedded first, unless the
+        worker is still busy (then its results so far are searched).
+
+        Args:
+            query: Search query string
+            limit: Number of results to return
+
+        Returns:
+            List of tuples (Record, similarity), best first
+        """
+        index = self._semantic_index()
+        index.refresh()
+        matches = index.search(query, limit=limit)
+
+        results = []
+        with trace.span('storage.parse', op='semantic_search'):
+            for name, score in matches:
+                try:
+                    results.append((self._read_record(name), score))
+                except Exception:
+                    # Deleted since it was embedded, or can't be parsed
+                    continue
+        return results
+
+    def _semantic_index(self):
+        from .semantic import SemanticIndex
+
+        return SemanticIndex(self.records_dir, self._index_path('semantic'))
+
+    def _index_path(self, filename: str) -> Path:
+        """Path of a derived index file for this records directory."""
+        # Next to the records directory, like config.index_dir for the default one
+        return self.records_dir.parent / config.index_dir.name / filename
+
     def fuzzy_search(
         self,
         query: str,
@@ -203,31 +904,33 @@ class Storage:
         if not case_sensitive:
             query = query.lower()
 
-        for filepath in self.records_dir.glob('*.md'):
-            try:
-                record = Record.from_file(filepath)
-                search_text = record.content if case_sensitive else record.content.lower()
+        with trace.span('storage.parse', op='fuzzy_search') as attrs:
+            for name in self._record_slice():
+                try:
+                    record = self._read_record(name)
+                    search_text = record.content if case_sensitive else record.content.lower()
 
-                # Calculate similarity using SequenceMatcher
-                similarity = SequenceMatcher(None, query, search_text).ratio()
+                    # Calculate similarity using SequenceMatcher
+                    similarity = SequenceMatcher(None, query, search_text).ratio()
 
-                # Also check for partial matches in words
-                words = search_text.split()
-                word_similarities = [
-                    SequenceMatcher(None, query, word).ratio()
-                    for word in words
-                ]
-                max_word_sim = max(word_similarities) if word_similarities else 0
+                    # Also check for partial matches in words
+                    words = search_text.split()
+                    word_similarities = [
+                        SequenceMatcher(None, query, word).ratio()
+                        for word in words
+                    ]
+                    max_word_sim = max(word_similarities) if word_similarities else 0
 
-                # Use the better of the two scores
-                final_score = max(similarity, max_word_sim)
+                    # Use the better of the two scores
+                    final_score = max(similarity, max_word_sim)
 
-                if final_score >= threshold:
-                    results.append((record, final_score))
+                    if final_score >= threshold:
+                        results.append((record, final_score))
 
-            except Exception:
-                # Skip files that can't be parsed
-                continue
+                except Exception:
+                    # Skip files that can't be parsed
+                    continue
+            attrs['matches'] = len(results)
 
         # Sort by similarity score (descending), then by timestamp (descending)
         results.sort(key=lambda x: (x[1], x[0].timestamp), reverse=True)
@@ -1,12 +1,30 @@
 """Git sync functionality for diane records."""
 
+import json
+import os
+import signal
 import subprocess
 import socket
-import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+from . import trace
 from .config import config
+from .durability import atomic_write
+from .locking import RepoLock
+from .maintenance import NO_AUTO_GC
+
+
+# Replication policies, stored per remote as remote.<name>.dianePolicy:
+# 'sync' fetches and merges from the remote and pushes to it, 'push' only
+# pushes (backups)
+POLICY_SYNC = 'sync'
+POLICY_PUSH = 'push'
+REMOTE_POLICIES = (POLICY_SYNC, POLICY_PUSH)
+
+REPLICATION_STATE_FILE = 'diane-remotes.json'
 
 
 class GitSync:
@@ -26,7 +44,7 @@ class GitSync:
             return None
 
         try:
-            result = subprocess.run(
+            result = trace.run(
                 ['git', 'remote', 'get-url', 'origin'],
                 cwd=self.records_dir,
                 capture_output=True,
@@ -37,44 +55,196 @@ class GitSync:
         except subprocess.CalledProcessError:
             return None
 
-    def set_remote(self, url: str) -> Tuple[bool, str]:
-        """Set or update the remote URL.
+    def set_remote(self, url: str, name: str = 'origin', policy: Optional[str] = None) -> Tuple[bool, str]:
+        """Set or update a remote URL.
 
         Args:
             url: Git remote URL (e.g., git@github.com:user/repo.git)
+            name: Remote name (several remotes are replicated concurrently)
+            policy: ``sync`` (fetch and push) or ``push`` (push only); new
+                remotes default to ``sync``
 
         Returns:
             Tuple of (success, message)
         """
         if not self.is_git_repo():
             return False, "Not a git repository"
+        if policy is not None and policy not in REMOTE_POLICIES:
+            return False, f"Unknown policy: {policy} (use {' or '.join(REMOTE_POLICIES)})"
 
         try:
             # Check if remote exists
-            current_remote = self.get_remote_url()
+            exists = name in self.remotes()
 
-            if current_remote:
+            if exists:
                 # Update existing remote
-                subprocess.run(
-                    ['git', 'remote', 'set-url', 'origin', url],
+                trace.run(
+                    ['git', 'remote', 'set-url', name, url],
                     cwd=self.records_dir,
                     check=True,
                     capture_output=True
                 )
-                return True, f"Remote updated: {url}"
+                msg = f"Remote updated: {url}"
             else:
                 # Add new remote
-                subprocess.run(
-                    ['git', 'remote', 'add', 'origin', url],
+                trace.run(
+                    ['git', 'remote', 'add', name, url],
+                    cwd=self.records_dir,
+                    check=True,
+                    capture_output=True
+                )
+                msg = f"Remote added: {url}"
+
+            if policy is not None:
+                trace.run(
+                    ['git', 'config', f'remote.{name}.dianePolicy', policy],
                     cwd=self.records_dir,
                     check=True,
                     capture_output=True
                 )
-                return True, f"Remote added: {url}"
+            return True, msg
 
         except subprocess.CalledProcessError as e:
             return False, f"Failed to set remote: {e.stderr.decode() if e.stderr else str(e)}"
 
+    def remove_remote(self, name: str) -> Tuple[bool, str]:
+        """Remove a remote (and its replication policy)."""
+        try:
+            trace.run(
+                ['git', 'remote', 'remove', name],
+                cwd=self.records_dir,
+                check=True,
+                capture_output=True
+            )
+            return True, f"Remote removed: {name}"
+        except subprocess.CalledProcessError as e:
+            return False, f"Failed to remove remote: {e.stderr.decode() if e.stderr else str(e)}"
+
+    def remotes(self) -> Dict[str, Dict[str, str]]:
+        """Configured remotes with their ``url`` and replication ``policy``."""
+        if not self.is_git_repo():
+            return {}
+
+        result = trace.run(
+            ['git', 'config', '--get-regexp', r'^remote\..*\.(url|dianepolicy)$'],
+            cwd=self.records_dir,
+            capture_output=True,
+            text=True
+        )
+        remotes: Dict[str, Dict[str, str]] = {}
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition(' ')
+            name, field = key[len('remote.'):].rsplit('.', 1)
+            remote = remotes.setdefault(name, {'url': '', 'policy': POLICY_SYNC})
+            if field == 'url':
+                remote['url'] = value
+            elif value in REMOTE_POLICIES:
+                remote['policy'] = value
+        return remotes
+
+    @trace.traced('sync', op='clone')
+    def clone(self, url: str, depth: Optional[int] = None, blobless: bool = True) -> Tuple[bool, str]:
+        """Bootstrap the records directory from an existing records repository.
+
+        By default only commits and trees are fetched (a blobless partial
+        clone): the records of the checked-out tree are downloaded, older file
+        versions only when something reads them. With ``depth`` the clone is
+        shallow instead, and history is deepened when a sync needs it.
+
+        Args:
+            url: Git remote URL (or path of a bare repository)
+            depth: Number of commits to fetch (shallow clone)
+            blobless: Fetch file contents lazily (ignored with ``depth``)
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if self.is_git_repo():
+            return False, f"Already a git repository: {self.records_dir}"
+        if self.records_dir.exists() and any(self.records_dir.iterdir()):
+            return False, f"Records directory is not empty: {self.records_dir}"
+
+        cmd = ['git', 'clone', '--quiet']
+        if depth:
+            cmd += ['--depth', str(depth)]
+            kind = f"shallow, {depth} commit(s)"
+        elif blobless:
+            cmd.append('--filter=blob:none')
+            kind = "blobless"
+        else:
+            kind = "full"
+        if (depth or blobless) and '://' not in url and ':' not in url.split('/')[0]:
+            # Local paths are hard-linked, which ignores --depth and --filter
+            cmd.append('--no-local')
+        cmd += [url, str(self.records_dir)]
+
+        try:
+            self.records_dir.parent.mkdir(parents=True, exist_ok=True)
+            trace.run(cmd, check=True, capture_output=True)
+            # Disable GPG signing for this repo (like a freshly initialized one)
+            trace.run(
+                ['git', 'config', 'commit.gpgsign', 'false'],
+                cwd=self.records_dir,
+                check=True,
+                capture_output=True
+            )
+        except subprocess.CalledProcessError as e:
+            error_msg = e.stderr.decode() if e.stderr else str(e)
+            return False, f"Clone failed: {error_msg}"
+
+        return True, f"Cloned {url} ({kind})"
+
+    def _current_branch(self) -> str:
+        result = trace.run(
+            ['git', 'branch', '--show-current'],
+            cwd=self.records_dir,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        return result.stdout.strip() or 'master'
+
+    def is_shallow(self) -> bool:
+        """Check if the repository is a shallow clone."""
+        return (self.git_dir / 'shallow').exists()
+
+    def deepen(self, commits: Optional[int] = None) -> Tuple[bool, str]:
+        """Fetch more history into a shallow clone.
+
+        Args:
+            commits: Number of older commits to fetch (default: all of them)
+
+        Returns:
+            Tuple of (success, message)
+        """
+        if not self.is_shallow():
+            return True, "History is complete"
+
+        cmd = ['git', 'fetch', '--quiet', '--unshallow' if commits is None else f'--deepen={commits}', 'origin']
+        try:
+            trace.run(cmd, cwd=self.records_dir, check=True, capture_output=True)
+        except subprocess.CalledProcessError as e:
+            error_msg = e.stderr.decode() if e.stderr else str(e)
+            return False, f"Deepen failed: {error_msg}"
+        return True, "Fetched full history" if commits is None else f"Fetched {commits} more commit(s)"
+
+    def _ensure_merge_base(self, upstream: str) -> None:
+        """Deepen a shallow clone until HEAD and ``upstream`` share history."""
+        commits = 64
+        while self.is_shallow():
+            result = trace.run(
+                ['git', 'merge-base', 'HEAD', upstream],
+                cwd=self.records_dir,
+                capture_output=True
+            )
+            if result.returncode == 0:
+                return
+            success, _ = self.deepen(commits)
+            if not success:
+                return
+            commits *= 4
+
+    @trace.traced('sync', op='push')
     def push(self, force: bool = False) -> Tuple[bool, str]:
         """Push records to remote.
 
@@ -94,7 +264,7 @@ class GitSync:
             cmd = ['git', 'push', '-u', 'origin']
 
             # Get current branch
-            branch_result = subprocess.run(
+            branch_result = trace.run(
                 ['git', 'branch', '--show-current'],
                 cwd=self.records_dir,
                 capture_output=True,
@@ -107,7 +277,7 @@ class GitSync:
             if force:
                 cmd.append('--force')
 
-            result = subprocess.run(
+            result = trace.run(
                 cmd,
                 cwd=self.records_dir,
                 capture_output=True,
@@ -121,6 +291,7 @@ class GitSync:
             error_msg = e.stderr.decode() if e.stderr else str(e)
             return False, f"Push failed: {error_msg}"
 
+    @trace.traced('sync', op='pull')
     def pull(self, force: bool = False) -> Tuple[bool, str]:
         """Pull records from remote.
 
@@ -139,7 +310,7 @@ class GitSync:
         try:
             if force:
                 # Reset to remote state
-                subprocess.run(
+                trace.run(
                     ['git', 'fetch', 'origin'],
                     cwd=self.records_dir,
                     check=True,
@@ -147,7 +318,7 @@ class GitSync:
                 )
 
                 # Get current branch
-                branch_result = subprocess.run(
+                branch_result = trace.run(
                     ['git', 'branch', '--show-current'],
                     cwd=self.records_dir,
                     capture_output=True,
@@ -156,24 +327,38 @@ class GitSync:
                 )
                 branch = branch_result.stdout.strip() or 'master'
 
-                subprocess.run(
-                    ['git', 'reset', '--hard', f'origin/{branch}'],
-                    cwd=self.records_dir,
-                    check=True,
-                    capture_output=True
-                )
+                with RepoLock(self.records_dir):
+                    trace.run(
+                        ['git', 'reset', '--hard', f'origin/{branch}'],
+                        cwd=self.records_dir,
+                        check=True,
+                        capture_output=True
+                    )
                 return True, "Successfully reset to remote state"
             else:
+                if self.is_shallow():
+                    # A shallow clone can only merge once it has the common history
+                    trace.run(
+                        ['git', 'fetch', 'origin'],
+                        cwd=self.records_dir,
+                        check=True,
+                        capture_output=True
+                    )
+                    self._ensure_merge_base(f'origin/{self._current_branch()}')
+
                 # Normal pull
-                result = subprocess.run(
-                    ['git', 'pull', 'origin'],
-                    cwd=self.records_dir,
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
+                with RepoLock(self.records_dir):
+                    result = trace.run(
+                        ['git', 'pull', 'origin'],
+                        cwd=self.records_dir,
+                        capture_output=True,
+                        text=True,
+                        check=True
+                    )
                 return True, "Successfully pulled from remote"
 
+        except TimeoutError as e:
+            return False, f"Pull failed: {e}"
         except subprocess.CalledProcessError as e:
             error_msg = e.stderr.decode() if e.stderr else str(e)
             return False, f"Pull failed: {error_msg}"
@@ -211,11 +396,12 @@ class GitSync:
                 'has_changes': False,
                 'ahead': 0,
                 'behind': 0,
+                'shallow': False,
             }
 
         try:
             # Get branch
-            branch_result = subprocess.run(
+            branch_result = trace.run(
                 ['git', 'branch', '--show-current'],
                 cwd=self.records_dir,
                 capture_output=True,
@@ -225,7 +411,7 @@ class GitSync:
             branch = branch_result.stdout.strip() or 'master'
 
             # Check for changes
-            status_result = subprocess.run(
+            status_result = trace.run(
                 ['git', 'status', '--porcelain'],
                 cwd=self.records_dir,
                 capture_output=True,
@@ -241,7 +427,7 @@ class GitSync:
 
             if remote_url:
                 try:
-                    rev_result = subprocess.run(
+                    rev_result = trace.run(
                         ['git', 'rev-list', '--left-right', '--count', f'origin/{branch}...HEAD'],
                         cwd=self.records_dir,
                         capture_output=True,
@@ -263,6 +449,7 @@ class GitSync:
                 'has_changes': has_changes,
                 'ahead': ahead,
                 'behind': behind,
+                'shallow': self.is_shallow(),
             }
 
         except subprocess.CalledProcessError:
@@ -274,6 +461,7 @@ class GitSync:
                 'has_changes': False,
                 'ahead': 0,
                 'behind': 0,
+                'shallow': False,
             }
 
     def is_online(self, timeout: int = 3) -> bool:
@@ -309,7 +497,7 @@ class GitSync:
             return False
 
         try:
-            result = subprocess.run(
+            result = trace.run(
                 ['git', 'status', '--porcelain'],
                 cwd=self.records_dir,
                 capture_output=True,
@@ -351,21 +539,21 @@ class GitSync:
                 return True, "No conflicts to resolve"
 
             # Use 'ours' strategy - keep local changes
-            subprocess.run(
+            trace.run(
                 ['git', 'checkout', '--ours', '.'],
                 cwd=self.records_dir,
                 check=True,
                 capture_output=True
             )
 
-            subprocess.run(
+            trace.run(
                 ['git', 'add', '.'],
                 cwd=self.records_dir,
                 check=True,
                 capture_output=True
             )
 
-            subprocess.run(
+            trace.run(
                 ['git', 'commit', '--no-edit'],
                 cwd=self.records_dir,
                 check=True,
@@ -387,7 +575,7 @@ class GitSync:
         - There are actual changes to sync
 
         Args:
-            async_mode: Run sync in background thread
+            async_mode: Queue the sync for the background worker
 
         Returns:
             Tuple of (success, message)
@@ -406,19 +594,21 @@ class GitSync:
             return True, "Already in sync"
 
         if async_mode:
-            # Run sync in background
-            thread = threading.Thread(target=self._sync_worker, daemon=True)
-            thread.start()
-            return True, "Sync started in background"
+            # Hand off to the detached worker, which outlives this process
+            from .outbox import SyncOutbox
+            if not SyncOutbox(self.records_dir).request('smart_sync'):
+                return False, "Could not queue sync"
+            return True, "Sync queued for the background worker"
         else:
             # Synchronous sync
             return self._do_smart_sync()
 
+    @trace.traced('sync', op='smart_sync')
     def _do_smart_sync(self) -> Tuple[bool, str]:
         """Perform the actual sync operation."""
         try:
             # Fetch first
-            subprocess.run(
+            trace.run(
                 ['git', 'fetch', 'origin'],
                 cwd=self.records_dir,
                 check=True,
@@ -426,24 +616,34 @@ class GitSync:
                 timeout=30
             )
 
-            # Try to pull with rebase
-            try:
-                subprocess.run(
-                    ['git', 'pull', '--rebase', 'origin'],
-                    cwd=self.records_dir,
-                    check=True,
-                    capture_output=True,
-                    timeout=30
-                )
-            except subprocess.CalledProcessError:
-                # If rebase fails, try to auto-resolve
-                success, msg = self.auto_resolve_conflicts()
-                if not success:
-                    return False, f"Pull failed: {msg}"
+            branch = self._current_branch()
+            if self.is_shallow():
+                self._ensure_merge_base(f'origin/{branch}')
+
+            # Usually both sides only added records: merge without a rebase
+            result = self._disjoint_sync(branch)
+            if result is not None:
+                return result
+
+            # Real conflicts: try to pull with rebase
+            with RepoLock(self.records_dir):
+                try:
+                    trace.run(
+                        ['git', 'pull', '--rebase', 'origin'],
+                        cwd=self.records_dir,
+                        check=True,
+                        capture_output=True,
+                        timeout=30
+                    )
+                except subprocess.CalledProcessError:
+                    # If rebase fails, try to auto-resolve
+                    success, msg = self.auto_resolve_conflicts()
+                    if not success:
+                        return False, f"Pull failed: {msg}"
 
             # Push local changes
             if self.needs_push():
-                subprocess.run(
+                trace.run(
                     ['git', 'push', 'origin'],
                     cwd=self.records_dir,
                     check=True,
@@ -455,20 +655,324 @@ class GitSync:
 
         except subprocess.TimeoutExpired:
             return False, "Sync timeout"
+        except TimeoutError as e:
+            return False, f"Sync failed: {e}"
         except subprocess.CalledProcessError as e:
             error_msg = e.stderr.decode() if e.stderr else str(e)
             return False, f"Sync failed: {error_msg}"
 
-    def _sync_worker(self):
-        """Background worker for async sync."""
+    def _rev_parse(self, rev: str) -> Optional[str]:
+        result = trace.run(
+            ['git', 'rev-parse', '--verify', '-q', rev],
+            cwd=self.records_dir,
+            capture_output=True,
+            text=True
+        )
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    def _changed_paths(self, base: str, commit: str) -> Set[str]:
+        """Paths that differ between two commits."""
+        result = trace.run(
+            ['git', 'diff-tree', '-r', '--no-renames', '--name-only', '-z', base, commit],
+            cwd=self.records_dir,
+            check=True,
+            capture_output=True,
+            text=True
+        )
+        return set(filter(None, result.stdout.split('\0')))
+
+    def _merged_tree(self, head: str, base: str, remote: str) -> str:
+        """Tree of ``head`` plus the changes ``base..remote``, built in a temporary index."""
+        index_file = self.git_dir / 'diane-sync-index'
+        env = dict(os.environ, GIT_INDEX_FILE=str(index_file))
+        try:
+            trace.run(['git', 'read-tree', head], cwd=self.records_dir, env=env, check=True, capture_output=True)
+
+            # Raw diff entries are ':<old mode> <new mode> <old sha> <new sha> <status>', path
+            diff = trace.run(
+                ['git', 'diff-tree', '-r', '--no-renames', '-z', base, remote],
+                cwd=self.records_dir,
+                check=True,
+                capture_output=True,
+                text=True
+            ).stdout.split('\0')
+            entries = []
+            for meta, path in zip(diff[0::2], diff[1::2]):
+                _, new_mode, _, new_sha, status = meta.split(' ')
+                entries.append(f'0 {"0" * 40}\t{path}' if status == 'D' else f'{new_mode} {new_sha}\t{path}')
+
+            trace.run(
+                ['git', 'update-index', '-z', '--index-info'],
+                cwd=self.records_dir,
+                env=env,
+                input=''.join(entry + '\0' for entry in entries),
+                check=True,
+                capture_output=True,
+                text=True
+            )
+            return trace.run(
+                ['git', 'write-tree'], cwd=self.records_dir, env=env, check=True, capture_output=True, text=True
+            ).stdout.strip()
+        finally:
+            index_file.unlink(missing_ok=True)
+
+    def _merge_disjoint(self, upstream: str, branch: str) -> Optional[str]:
+        """Merge ``upstream`` into the branch when both sides changed different files.
+
+        Records are append-only files with unique names, so most syncs just
+        combine two sets of new files. The merged tree is built in a temporary
+        index (the working directory only gains the upstream's files) and
+        committed with ``commit-tree``; fast-forwards need no commit at all.
+
+        Returns:
+            The new branch head, or None when files overlap (or the histories
+            are unrelated) and the rebase path has to run
+        """
+        head = self._rev_parse('HEAD')
+        remote = self._rev_parse(upstream)
+        if head is None:
+            return None
+        if remote is None or remote == head:
+            return head
+
+        merge_base = trace.run(['git', 'merge-base', head, remote], cwd=self.records_dir,
+                               capture_output=True, text=True)
+        if merge_base.returncode != 0:
+            return None
+        base = merge_base.stdout.strip()
+        if base == remote:
+            return head
+
+        remote_paths = self._changed_paths(base, remote)
+        if base == head:
+            new = remote
+        else:
+            if remote_paths & self._changed_paths(base, head):
+                return None
+            tree = self._merged_tree(head, base, remote)
+            new = trace.run(
+                ['git', 'commit-tree', tree, '-p', head, '-p', remote,
+                 '-m', f"Merge {len(remote_paths)} record(s) from {upstream}"],
+                cwd=self.records_dir,
+                check=True,
+                capture_output=True,
+                text=True
+            ).stdout.strip()
+
+        # Check out only what changed (refuses to clobber local edits)
+        try:
+            trace.run(['git', 'read-tree', '-m', '-u', head, new], cwd=self.records_dir,
+                      check=True, capture_output=True)
+        except subprocess.CalledProcessError:
+            return None
+        trace.run(['git', 'update-ref', f'refs/heads/{branch}', new, head], cwd=self.records_dir,
+                  check=True, capture_output=True)
+        return new
+
+    def _disjoint_sync(self, branch: str) -> Optional[Tuple[bool, str]]:
+        """Fast path of smart sync: disjoint merge and one push.
+
+        Returns:
+            Tuple of (success, message), or None when the rebase path has to run
+        """
+        upstream = f'origin/{branch}'
+        head = self._rev_parse('HEAD')
+        remote = self._rev_parse(upstream)
+        if head is not None and head == remote:
+            return True, "Already in sync"
+
+        # Captures commit under the same lock: HEAD and the index stay put
+        with RepoLock(self.records_dir):
+            new = self._merge_disjoint(upstream, branch)
+        if new is None:
+            return None
+        if remote is None:
+            # Nothing on the remote yet: a plain push
+            trace.run(['git', 'push', '-u', 'origin', branch], cwd=self.records_dir,
+                      check=True, capture_output=True, timeout=30)
+            return True, "Smart sync completed (pushed)"
+        if new != remote:
+            trace.run(['git', 'push', 'origin', f'{new}:refs/heads/{branch}'], cwd=self.records_dir,
+                      check=True, capture_output=True, timeout=30)
+        return True, "Smart sync completed (fast path)"
+
+    def _remote_git(self, *args: str) -> subprocess.CompletedProcess:
+        """Run a network git command, bounded by the per-remote timeout.
+
+        The command runs in its own process group so that a timeout also kills
+        its ssh (or hook) children, which would otherwise keep the pipes open.
+        """
+        cmd = ['git', *NO_AUTO_GC, *args]
+        with trace.span('git', argv=cmd) as attrs:
+            process = subprocess.Popen(
+                cmd,
+                cwd=self.records_dir,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True
+            )
+            try:
+                stdout, stderr = process.communicate(timeout=config.sync_timeout)
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.communicate()
+                raise
+            attrs['returncode'] = process.returncode
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+    def _replicate_one(self, name: str, action) -> Tuple[bool, str, float]:
+        """Run ``action(name)`` and turn every failure into a result."""
+        start = time.perf_counter()
         try:
-            self._do_smart_sync()
-        except Exception:
-            # Silently fail in background mode
+            success, msg = action(name)
+        except subprocess.TimeoutExpired:
+            success, msg = False, f"Timed out after {config.sync_timeout}s"
+        except TimeoutError as e:
+            success, msg = False, str(e)
+        except subprocess.CalledProcessError as e:
+            success, msg = False, (e.stderr or str(e)).strip()
+        return success, msg, time.perf_counter() - start
+
+    def _fetch_remote(self, name: str) -> Tuple[bool, str]:
+        # FETCH_HEAD is shared by all remotes: concurrent fetches must not write it
+        self._remote_git('fetch', '--quiet', '--no-write-fetch-head', name)
+        return True, "Fetched"
+
+    def _push_remote(self, name: str) -> Tuple[bool, str]:
+        branch = self._current_branch()
+        if self._rev_parse(f'{name}/{branch}') == self._rev_parse('HEAD'):
+            return True, "Up to date"
+        self._remote_git('push', '--quiet', name, f'HEAD:refs/heads/{branch}')
+        return True, "Pushed"
+
+    def _integrate_remote(self, name: str) -> Tuple[bool, str]:
+        """Merge a fetched remote into the local branch (one remote at a time)."""
+        branch = self._current_branch()
+        if self.is_shallow():
+            self._ensure_merge_base(f'{name}/{branch}')
+        with RepoLock(self.records_dir):
+            if self._merge_disjoint(f'{name}/{branch}', branch) is not None:
+                return True, "Merged"
+
+            # Real conflicts: rebase on the remote, keeping local changes on conflict
+            try:
+                self._remote_git('pull', '--rebase', name, branch)
+            except subprocess.CalledProcessError:
+                success, msg = self.auto_resolve_conflicts()
+                if not success:
+                    return False, f"Pull failed: {msg}"
+        return True, "Rebased"
+
+    @trace.traced('sync', op='replicate')
+    def replicate(self, names: Optional[List[str]] = None) -> Dict[str, Tuple[bool, str, float]]:
+        """Sync with every remote according to its policy.
+
+        Fetches from ``sync`` remotes run concurrently, then each fetched
+        remote is merged in turn (the working tree is shared), then the result
+        is pushed to all remotes concurrently. Every network call is bounded
+        by ``DIANE_SYNC_TIMEOUT``; a slow or unreachable remote only fails
+        itself.
+
+        Args:
+            names: Remotes to replicate (default: all)
+
+        Returns:
+            Per remote: (success, message, seconds)
+        """
+        remotes = self.remotes()
+        if names:
+            remotes = {name: remotes[name] for name in names if name in remotes}
+        if not remotes:
+            return {}
+
+        results: Dict[str, Tuple[bool, str, float]] = {}
+        workers = max(1, min(config.sync_workers, len(remotes)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            sync_names = [name for name, remote in remotes.items() if remote['policy'] == POLICY_SYNC]
+            fetched = dict(zip(sync_names, pool.map(
+                lambda name: self._replicate_one(name, self._fetch_remote), sync_names
+            )))
+
+            elapsed: Dict[str, float] = {}
+            for name, (success, msg, seconds) in fetched.items():
+                if not success:
+                    results[name] = (False, f"Fetch failed: {msg}", seconds)
+                    continue
+                success, msg, merge_seconds = self._replicate_one(name, self._integrate_remote)
+                elapsed[name] = seconds + merge_seconds
+                if not success:
+                    results[name] = (False, msg, elapsed[name])
+
+            push_names = [name for name in remotes if name not in results]
+            for name, (success, msg, seconds) in zip(push_names, pool.map(
+                lambda name: self._replicate_one(name, self._push_remote), push_names
+            )):
+                results[name] = (success, msg if success else f"Push failed: {msg}",
+                                 elapsed.get(name, 0.0) + seconds)
+
+        self._save_replication_state(results)
+        return results
+
+    def _save_replication_state(self, results: Dict[str, Tuple[bool, str, float]]) -> None:
+        state = self.replication_state()
+        for name, (success, msg, seconds) in results.items():
+            state[name] = {'ok': success, 'message': msg, 'seconds': round(seconds, 3),
+                           'finished': int(time.time())}
+        try:
+            atomic_write(self.git_dir / REPLICATION_STATE_FILE, json.dumps(state, separators=(',', ':')))
+        except OSError:
             pass
 
+    def replication_state(self) -> Dict[str, dict]:
+        """Outcome of the last replication of each remote."""
+        try:
+            with open(self.git_dir / REPLICATION_STATE_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def remote_status(self) -> Dict[str, dict]:
+        """Per remote: URL, policy, ahead/behind (as of the last fetch) and last result."""
+        remotes = self.remotes()
+        if not remotes:
+            return {}
+        branch = self._current_branch()
+        last = self.replication_state()
+        status = {}
+        for name, remote in remotes.items():
+            ahead = behind = None
+            result = trace.run(
+                ['git', 'rev-list', '--left-right', '--count', f'{name}/{branch}...HEAD'],
+                cwd=self.records_dir,
+                capture_output=True,
+                text=True
+            )
+            parts = result.stdout.split()
+            if result.returncode == 0 and len(parts) == 2:
+                behind, ahead = int(parts[0]), int(parts[1])
+            status[name] = dict(remote, ahead=ahead, behind=behind, last=last.get(name))
+        return status
+
+    def sync_all(self) -> Tuple[bool, str]:
+        """Sync with every configured remote (smart sync when only origin exists)."""
+        remotes = self.remotes()
+        if not remotes:
+            return True, "No remote configured"
+        if list(remotes) == ['origin'] and remotes['origin']['policy'] == POLICY_SYNC:
+            return self._do_smart_sync()
+
+        results = self.replicate()
+        failed = [name for name, (success, _, _) in results.items() if not success]
+        if failed:
+            return False, f"Sync failed for: {', '.join(failed)}"
+        return True, f"Replicated to {len(results)} remote(s)"
+
     def sync_async(self) -> None:
-        """Trigger async sync (fire and forget)."""
-        if self.get_remote_url() and self.is_online():
-            thread = threading.Thread(target=self._sync_worker, daemon=True)
-            thread.start()
+        """Queue a sync for the detached worker (fire and forget, survives exit)."""
+        if self.remotes():
+            from .outbox import SyncOutbox
+            SyncOutbox(self.records_dir).request()
@@ -0,0 +1,200 @@
+"""Lightweight tracing and profiling for diane commands.
+
+Tracing is off by default and costs one attribute check per span. Enable it
+with ``DIANE_TRACE=1`` (spans go to ``$DIANE_DATA_HOME/trace.jsonl``),
+``DIANE_TRACE=/path/to/file.jsonl``, or ``diane --profile <command>``, which
+also writes a cProfile dump.
+
+Each span is one JSON line::
+
+    {"trace": "...", "name": "git", "start": 1730900000.1, "duration_ms": 12.4,
+     "depth": 1, "attrs": {"argv": ["git", "commit", "-m", "..."], "returncode": 0}}
+"""
+
+import atexit
+import functools
+import json
+import os
+import statistics
+import subprocess
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .config import config
+
+
+class Tracer:
+    """Collects spans for one process and appends them to a JSONL file."""
+
+    def __init__(self):
+        self.enabled = False
+        self.path: Optional[Path] = None
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.spans: List[Dict] = []
+        self._depth = 0
+        self._profiler = None
+        self._profile_path: Optional[Path] = None
+
+    def enable(self, path: Optional[Path] = None) -> None:
+        """Start recording spans, flushed to ``path`` at exit."""
+        if not self.enabled:
+            atexit.register(self.flush)
+        self.enabled = True
+        self.path = path or config.data_home / 'trace.jsonl'
+
+    def start_profile(self, path: Optional[Path] = None) -> Path:
+        """Start a cProfile session dumped to ``path`` at exit."""
+        import cProfile
+
+        self._profile_path = path or (
+            config.data_home / 'profiles' / f"{time.strftime('%Y%m%d-%H%M%S')}-{self.trace_id}.prof"
+        )
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        return self._profile_path
+
+    def add(self, name: str, start: float, duration: float, **attrs) -> None:
+        """Record a finished span (start is a ``time.time()`` value)."""
+        self.spans.append({
+            'trace': self.trace_id,
+            'name': name,
+            'start': round(start, 6),
+            'duration_ms': round(duration * 1000, 3),
+            'depth': self._depth,
+            'attrs': attrs,
+        })
+
+    @contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Dict]:
+        """Time a block; the yielded dict can be updated with extra attributes."""
+        if not self.enabled:
+            yield attrs
+            return
+
+        wall_start = time.time()
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield attrs
+        except SystemExit as e:
+            # Click ends every standalone command this way, successful or not
+            if e.code not in (None, 0):
+                attrs['error'] = 'SystemExit'
+                attrs['exit_code'] = e.code
+            raise
+        except BaseException as e:
+            attrs['error'] = type(e).__name__
+            raise
+        finally:
+            self._depth -= 1
+            self.add(name, wall_start, time.perf_counter() - start, **attrs)
+
+    def flush(self) -> None:
+        """Write collected spans and the profile dump, if any."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profile_path.parent.mkdir(parents=True, exist_ok=True)
+            self._profiler.dump_stats(str(self._profile_path))
+            self._profiler = None
+
+        if not self.enabled or not self.spans:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for item in self.spans:
+                    f.write(json.dumps(item, default=str) + '\n')
+        except OSError:
+            pass  # Tracing must never break a command
+        self.spans = []
+
+
+# Global tracer instance
+tracer = Tracer()
+
+_env = os.environ.get('DIANE_TRACE', '').strip()
+if _env and _env.lower() not in ('0', 'false', 'no'):
+    tracer.enable(None if _env.lower() in ('1', 'true', 'yes') else Path(_env).expanduser())
+
+
+def span(name: str, **attrs):
+    """Shorthand for ``tracer.span``."""
+    return tracer.span(name, **attrs)
+
+
+def traced(name: str, **attrs):
+    """Decorator recording a span around every call of the function."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(name, **attrs):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def run(cmd, **kwargs) -> subprocess.CompletedProcess:
+    """``subprocess.run`` that records a span with the argv and duration.
+
+    Spans are named after the program (``git``, ``gpg``, ...) so summaries can
+    attribute time to subprocesses.
+    """
+    if not tracer.enabled:
+        return subprocess.run(cmd, **kwargs)
+
+    with tracer.span(Path(cmd[0]).name, argv=list(cmd)) as attrs:
+        try:
+            result = subprocess.run(cmd, **kwargs)
+        except subprocess.CalledProcessError as e:
+            attrs['returncode'] = e.returncode
+            raise
+        attrs['returncode'] = result.returncode
+        return result
+
+
+def _span_key(item: Dict) -> str:
+    """Group git/gpg calls by subcommand, everything else by span name."""
+    argv = item.get('attrs', {}).get('argv')
+    if argv and len(argv) > 1 and item['name'] in ('git', 'gpg'):
+        return f"{item['name']} {argv[1]}"
+    return item['name']
+
+
+def summarize(path: Path) -> List[Dict]:
+    """Aggregate a JSONL trace file by span name.
+
+    Returns:
+        One dict per span kind with count, total, mean, p95 and max in
+        milliseconds, sorted by total time descending
+    """
+    durations: Dict[str, List[float]] = defaultdict(list)
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue
+            durations[_span_key(item)].append(item['duration_ms'])
+
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append({
+            'name': name,
+            'count': len(values),
+            'total_ms': round(sum(values), 3),
+            'mean_ms': round(statistics.mean(values), 3),
+            'p95_ms': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+            'max_ms': round(values[-1], 3),
+        })
+
+    rows.sort(key=lambda r: r['total_ms'], reverse=True)
+    return rows
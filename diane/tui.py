@@ -1,17 +1,20 @@
 """Terminal User Interface for diane."""
 
 try:
+    from textual import work
     from textual.app import App, ComposeResult
     from textual.containers import Container, Vertical, Horizontal
     from textual.widgets import Header, Footer, Static, ListView, ListItem, Label
     from textual.binding import Binding
     from textual.reactive import reactive
+    from textual.worker import get_current_worker
     TEXTUAL_AVAILABLE = True
 except ImportError:
     TEXTUAL_AVAILABLE = False
 
 from datetime import datetime
 from typing import List
+import threading
 from .storage import Storage
 from .record import Record
 
@@ -59,6 +62,22 @@ if TEXTUAL_AVAILABLE:
                 self.update("[dim]Select a record to view details[/dim]")
 
 
+    class RelatedRecords(Static):
+        """Widget listing the records most similar to the selected one."""
+
+        def show_related(self, results) -> None:
+            """Display (record, similarity) pairs, best first."""
+            if not results:
+                self.update("[dim]No related records[/dim]")
+                return
+            lines = ["[bold]Related[/bold]"]
+            for record, score in results:
+                timestamp = record.timestamp.strftime('%Y-%m-%d %H:%M')
+                first_line = record.content.split('\n')[0][:60]
+                lines.append(f"[cyan]{timestamp}[/] [dim]{score:.2f}[/] {first_line}")
+            self.update("\n".join(lines))
+
+
     class DianeTUI(App):
         """A Textual app for browsing diane records."""
 
@@ -72,9 +91,20 @@ if TEXTUAL_AVAILABLE:
             border-right: solid $primary;
         }
 
-        #detail {
+        #detail-pane {
             width: 1fr;
+        }
+
+        #detail {
+            height: 1fr;
+            padding: 1 2;
+        }
+
+        #related {
+            height: auto;
+            max-height: 12;
             padding: 1 2;
+            border-top: solid $primary;
         }
 
         ListView {
@@ -106,6 +136,9 @@ if TEXTUAL_AVAILABLE:
             super().__init__(*args, **kwargs)
             self.storage = Storage()
             self.records: List[Record] = []
+            self._related_fresh = False
+            # Serializes index refreshes between related-records workers
+            self._related_lock = threading.Lock()
 
         def compose(self) -> ComposeResult:
             """Create child widgets for the app."""
@@ -116,7 +149,9 @@ if TEXTUAL_AVAILABLE:
                     yield Static("[bold]diane, records[/bold]", id="title")
                     yield ListView(id="records-list")
 
-                yield RecordDetail(id="detail")
+                with Vertical(id="detail-pane"):
+                    yield RecordDetail(id="detail")
+                    yield RelatedRecords(id="related")
 
             yield Footer()
 
@@ -128,6 +163,7 @@ if TEXTUAL_AVAILABLE:
         def refresh_records(self) -> None:
             """Load and display all records."""
             self.records = self.storage.list_records(limit=None)
+            self._related_fresh = False
 
             list_view = self.query_one("#records-list", ListView)
             list_view.clear()
@@ -145,6 +181,32 @@ if TEXTUAL_AVAILABLE:
             if isinstance(item, RecordItem):
                 detail = self.query_one("#detail", RecordDetail)
                 detail.record = item.record
+                pane = self.query_one("#related", RelatedRecords)
+                # Building or refreshing the index can take a while: off the UI thread
+                pane.update("[dim]Related: indexing…[/dim]" if not self._related_fresh
+                            else "[dim]Related: …[/dim]")
+                self.load_related(item.record)
+
+        @work(thread=True, exclusive=True, group="related")
+        def load_related(self, record: Record) -> None:
+            """Look up related records in a worker thread, then show them."""
+            results = self.related_to(record)
+            if not get_current_worker().is_cancelled:
+                self.call_from_thread(self.query_one("#related", RelatedRecords).show_related, results)
+
+        def related_to(self, record: Record, limit: int = 5):
+            """Records similar to ``record`` (empty if the lookup fails)."""
+            name = self.storage.find_name(record.id)
+            if name is None:
+                return []
+            try:
+                with self._related_lock:
+                    # One refresh of the index per record list load
+                    results = self.storage.related(name, limit=limit, refresh=not self._related_fresh)
+                    self._related_fresh = True
+                return results
+            except Exception:
+                return []
 
         def action_refresh(self) -> None:
             """Refresh the record list."""
@@ -0,0 +1,89 @@
+"""Shared fixtures for the test suite."""
+
+from datetime import datetime
+from pathlib import Path
+import os
+import subprocess
+
+import pytest
+
+from diane.config import config
+from diane.record import Record
+from diane.storage import Storage
+
+GIT_IDENTITY = {'GIT_AUTHOR_NAME': 'diane', 'GIT_AUTHOR_EMAIL': 'diane@example.com',
+                'GIT_COMMITTER_NAME': 'diane', 'GIT_COMMITTER_EMAIL': 'diane@example.com'}
+
+
+@pytest.fixture(autouse=True)
+def isolated_config(tmp_path, monkeypatch):
+    """Point the global config at ``tmp_path``, with git, sync and maintenance off.
+
+    Whatever a test changes on ``config`` is put back afterwards, and nothing
+    touches the real ``~/.local/share/diane``.
+    """
+    monkeypatch.setenv('DIANE_DATA_HOME', str(tmp_path))
+    saved = dict(vars(config))
+    config.data_home = tmp_path
+    config.records_dir = tmp_path / 'records'
+    config.audio_dir = config.records_dir / 'audio'
+    config.index_dir = tmp_path / 'index'
+    config.use_git = config.auto_sync = config.maintenance = False
+    yield config
+    vars(config).clear()
+    vars(config).update(saved)
+
+
+@pytest.fixture
+def storage(tmp_path) -> Storage:
+    """A Storage on ``tmp_path/records``."""
+    return Storage(tmp_path / 'records')
+
+
+@pytest.fixture
+def write_record():
+    """Write a record file directly, bypassing Storage."""
+    def write(records_dir: Path, content: str, timestamp: datetime, **fields) -> Path:
+        record = Record(content, timestamp=timestamp, **fields)
+        filepath = record.get_filename(records_dir)
+        filepath.write_text(record.to_markdown())
+        return filepath
+    return write
+
+
+@pytest.fixture
+def git_identity(monkeypatch):
+    """Give git an author and committer for the duration of the test."""
+    for key, value in GIT_IDENTITY.items():
+        monkeypatch.setenv(key, value)
+
+
+@pytest.fixture
+def git(git_identity):
+    """Run git in a directory and return its stripped stdout."""
+    def run(cwd: Path, *args: str, date: int = 0) -> str:
+        env = dict(os.environ)
+        if date:
+            env['GIT_AUTHOR_DATE'] = env['GIT_COMMITTER_DATE'] = f'{date} +0000'
+        result = subprocess.run(['git', *args], cwd=cwd, env=env, check=True,
+                                capture_output=True, text=True)
+        return result.stdout.strip()
+    return run
+
+
+@pytest.fixture
+def remote(tmp_path, git):
+    """Create a bare repository (the stand-in for a hosted remote) with some records."""
+    def create(records: int) -> Path:
+        bare = tmp_path / 'remote.git'
+        work = tmp_path / 'seed'
+        git(tmp_path, 'init', '-q', '--bare', str(bare))
+        git(bare, 'config', 'uploadpack.allowFilter', 'true')
+        git(tmp_path, 'clone', '-q', str(bare), str(work))
+        for i in range(records):
+            (work / f'{i}.md').write_text(f'record {i}\n')
+            git(work, 'add', f'{i}.md')
+            git(work, 'commit', '-q', '-m', f'Record: {i}.md')
+        git(work, 'push', '-q', 'origin', 'HEAD')
+        return bare
+    return create
@@ -0,0 +1,79 @@
+"""Tests for audio module."""
+
+from pathlib import Path
+import wave
+
+from diane.audio import (
+    Transcriber,
+    get_audio_transcriber,
+    parse_transcribe_model,
+    whisper_threads,
+)
+
+
+class EchoTranscriber(Transcriber):
+    """Backend stub that returns a fixed text."""
+
+    name = 'echo'
+
+    def is_available(self) -> bool:
+        return True
+
+    def _transcribe(self, audio_path: Path) -> str:
+        return "  hello diane  "
+
+
+def test_parse_transcribe_model():
+    """Test backend selection from DIANE_TRANSCRIBE_MODEL values."""
+    assert parse_transcribe_model("faster-whisper:small.en") == ("faster-whisper", "small.en")
+    assert parse_transcribe_model("faster-whisper:") == ("faster-whisper", "base.en")
+    assert parse_transcribe_model("whisper.cpp:/models/ggml.bin") == ("whisper.cpp", "/models/ggml.bin")
+    assert parse_transcribe_model("whisper-1") == ("openai", "whisper-1")
+    assert parse_transcribe_model("gpt-4o-audio-preview") == ("openai", "whisper-1")
+    # A typo in a local backend must not fall back to uploading the audio
+    for spec in ("faster_whisper:small", "whispercpp:/models/ggml.bin"):
+        try:
+            parse_transcribe_model(spec)
+        except ValueError:
+            continue
+        raise AssertionError(f"{spec} was accepted")
+
+
+def test_whisper_threads_is_validated(monkeypatch):
+    """Test DIANE_WHISPER_THREADS parsing."""
+    monkeypatch.setenv('DIANE_WHISPER_THREADS', '4')
+    assert whisper_threads(0) == 4
+    for value in ('four', '-2'):
+        monkeypatch.setenv('DIANE_WHISPER_THREADS', value)
+        try:
+            whisper_threads(0)
+        except ValueError:
+            continue
+        raise AssertionError(f"{value} was accepted")
+    monkeypatch.delenv('DIANE_WHISPER_THREADS')
+    assert whisper_threads(3) == 3
+
+
+def test_transcriber_is_cached_per_spec():
+    """Test that transcribers (and their loaded models) are reused."""
+    first = get_audio_transcriber("faster-whisper:tiny.en")
+    assert get_audio_transcriber("faster-whisper:tiny.en") is first
+    assert get_audio_transcriber("faster-whisper:base.en") is not first
+
+
+def test_transcribe_reports_real_time_factor(tmp_path):
+    """Test latency and RTF stats for a WAV input."""
+    audio_path = tmp_path / "clip.wav"
+    with wave.open(str(audio_path), 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b'\x00\x00' * 32000)
+
+    transcriber = EchoTranscriber("stub")
+    success, _, text = transcriber.transcribe(audio_path)
+
+    assert success
+    assert text == "hello diane"
+    assert transcriber.last_stats['audio_s'] == 2.0
+    assert transcriber.last_stats['rtf'] < 1.0
@@ -0,0 +1,21 @@
+"""Tests for config module."""
+
+from diane.config import Config
+
+
+def test_malformed_numbers_fall_back_with_a_warning(monkeypatch, capsys):
+    """Test that a bad numeric variable warns and keeps the default."""
+    monkeypatch.setenv('DIANE_SYNC_TIMEOUT', '30s')
+    monkeypatch.setenv('DIANE_SYNC_WORKERS', '0')
+    monkeypatch.setenv('DIANE_LOCK_TIMEOUT', 'nan')
+    monkeypatch.setenv('DIANE_DEDUPE_DISTANCE', '5')
+    monkeypatch.setenv('DIANE_GROUP_FSYNC_MS', '')
+
+    config = Config()
+
+    assert (config.sync_timeout, config.sync_workers, config.lock_timeout) == (30, 4, 10.0)
+    assert config.dedupe_distance == 5 and config.group_fsync_ms == 50
+    err = capsys.readouterr().err
+    assert "DIANE_SYNC_TIMEOUT must be an integer >= 1, got '30s'; using 30" in err
+    assert 'DIANE_SYNC_WORKERS' in err and 'DIANE_LOCK_TIMEOUT' in err
+    assert 'DIANE_DEDUPE_DISTANCE' not in err
@@ -0,0 +1,75 @@
+"""Tests for dedupe module."""
+
+from datetime import datetime
+
+from diane.config import config
+from diane.dedupe import FingerprintIndex, distance, simhash
+from diane.record import Record, record_id_from_filename
+
+NOTE = ("Call the dentist on Monday morning to move the appointment, then pick up "
+        "the prescription and ask about the insurance form for the last visit")
+
+
+def test_simhash_clusters_near_duplicates(tmp_path):
+    """Test that near-identical texts are close and get clustered through the LSH table."""
+    edited = NOTE.replace('Monday', 'Tuesday')
+    other = "Ideas for the garden: tomatoes along the fence, herbs by the kitchen door"
+    assert distance(simhash(NOTE), simhash(NOTE)) == 0
+    assert distance(simhash(NOTE), simhash(edited)) < distance(simhash(NOTE), simhash(other))
+
+    index = FingerprintIndex(tmp_path, tmp_path / 'fingerprints.sqlite')
+    index.add('a.md', simhash(NOTE))
+    index.add('b.md', simhash(NOTE))
+    index.add('c.md', simhash(NOTE) ^ 0b101)  # 2 bits off
+    index.add('d.md', simhash(other))
+    index.add('e.md', (1 << 64) - 1)  # top bit set: stored as a signed integer
+
+    assert [name for name, _ in index.near(simhash(NOTE))] == ['a.md', 'b.md', 'c.md']
+    assert index.clusters() == [['a.md', 'b.md', 'c.md']]
+    assert index.clusters(max_distance=1) == [['a.md', 'b.md']]
+    assert index.near((1 << 64) - 2) == [('e.md', 1)]
+
+    index.add('b.md', simhash(other))  # replaced: leaves its old buckets
+    assert index.clusters() == [['a.md', 'c.md'], ['b.md', 'd.md']]
+    docs = index.docs()
+    index.close()
+
+    reloaded = FingerprintIndex(tmp_path, index.path)
+    assert reloaded.docs() == docs
+    reloaded.close()
+
+
+def test_capture_flags_or_skips_near_duplicates(storage):
+    """Test DIANE_DEDUPE at capture time and clustering an existing archive."""
+    config.dedupe = 'off'
+    first = storage.save(Record(NOTE))
+    storage.save(Record("Something else entirely, about the weekend trip"))
+
+    config.dedupe = 'flag'
+    second = storage.save(Record(NOTE))
+    # Records saved before the table existed are found after a refresh
+    assert second != first and storage.last_duplicate is None
+    assert [[r.id for r in group] for group in storage.near_duplicates()] == [
+        [record_id_from_filename(first.name), record_id_from_filename(second.name)]]
+
+    third = storage.save(Record(NOTE.replace("Monday", "Tuesday")))
+    assert third.exists() and storage.last_duplicate == first.name
+
+    config.dedupe = 'skip'
+    skipped = storage.save(Record(NOTE))
+    assert skipped is None and storage.last_duplicate == first.name
+    assert not storage.last_duplicate_packed
+    assert len(list(storage.records_dir.glob('*.md'))) == 4
+
+    kept = storage.save(Record("A brand new thought"))
+    assert kept.exists() and storage.last_duplicate is None
+
+    # Packed records are still found, and reported as packed
+    old = "An old note about the lease renewal and the deposit"
+    config.dedupe = 'off'
+    packed = storage.save(Record(old, timestamp=datetime(2020, 3, 1, 9, 0)))
+    storage.pack(older_than_days=30)
+    storage.near_duplicates()  # fingerprints the record
+    config.dedupe = 'skip'
+    assert storage.save(Record(old)) is None
+    assert storage.last_duplicate == packed.name and storage.last_duplicate_packed
@@ -0,0 +1,34 @@
+"""Tests for durability module."""
+
+from diane.durability import GroupCommitter, atomic_write, normalize_mode
+
+
+def test_atomic_write_replaces_without_leftovers(tmp_path):
+    """Test that atomic writes replace content and leave no temp files."""
+    path = tmp_path / "record.md"
+
+    atomic_write(path, "first")
+    atomic_write(path, "second ✓", fsync=True)
+
+    assert path.read_text(encoding='utf-8') == "second ✓"
+    assert [p.name for p in tmp_path.iterdir()] == ["record.md"]
+
+
+def test_group_committer_flushes_pending_files(tmp_path):
+    """Test that a group flush covers every pending file once."""
+    committer = GroupCommitter(interval_ms=60000)
+    for i in range(5):
+        path = tmp_path / f"{i}.md"
+        atomic_write(path, str(i))
+        committer.add(path)
+
+    assert committer.flush() == 5
+    assert committer.flush() == 0
+    assert committer.batches == 1
+
+
+def test_normalize_mode():
+    """Test durability setting aliases and fallback."""
+    assert normalize_mode("fsync-per-record") == "fsync"
+    assert normalize_mode("GROUP") == "group"
+    assert normalize_mode("bogus") == "none"
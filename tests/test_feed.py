@@ -0,0 +1,76 @@
+"""Tests for feed module."""
+
+from datetime import datetime
+import io
+import os
+
+from diane.export import Exporter
+from diane.feed import Feed
+from diane.record import Record
+from diane.storage import Storage
+
+
+def _run(feed: Feed) -> list:
+    contents = [record.content for record in feed.iter_changes()]
+    feed.commit()
+    return contents
+
+
+def test_feed_emits_only_new_and_changed_records(storage, tmp_path):
+    """Test the high-water mark, content hashes and commit-after-write."""
+    feeds_dir = tmp_path / "feeds"
+    first = storage.save(Record("one", timestamp=datetime(2024, 11, 1, 9, 0)))
+    storage.save(Record("two", timestamp=datetime(2024, 11, 2, 9, 0)))
+
+    assert _run(Feed("nightly", storage.records_dir, feeds_dir)) == ["one", "two"]
+    assert _run(Feed("nightly", storage.records_dir, feeds_dir)) == []
+
+    # Not committed: the next run sees the same records again
+    storage.save(Record("three", timestamp=datetime(2024, 11, 3, 9, 0)))
+    list(Feed("nightly", storage.records_dir, feeds_dir).iter_changes())
+    assert _run(Feed("nightly", storage.records_dir, feeds_dir)) == ["three"]
+
+    # A touch is not a change, an edit is
+    os.utime(first)
+    assert _run(Feed("nightly", storage.records_dir, feeds_dir)) == []
+    first.write_text(first.read_text().replace("one", "one, edited"))
+    assert _run(Feed("nightly", storage.records_dir, feeds_dir)) == ["one, edited"]
+
+    # Each consumer has its own mark
+    assert len(_run(Feed("other", storage.records_dir, feeds_dir))) == 3
+
+
+def test_jsonl_round_trip(tmp_path):
+    """Test that export jsonl and import_records reproduce the records."""
+    source = Storage(tmp_path / "a" / "records")
+    source.save(Record("first", timestamp=datetime(2024, 11, 1, 9, 0), tags=["x"]))
+    source.save(Record("second\nline", timestamp=datetime(2024, 11, 2, 9, 0)))
+    legacy = source.records_dir / "2024-10-01--08-30-15--legacy.md"
+    legacy.write_text("---\ntimestamp: 2024-10-01 08:30\nsources: [stdin]\n---\n\nLegacy\n")
+
+    exported = ''.join(Exporter.iter_jsonl(source.iter_records()))
+    target = Storage(tmp_path / "b" / "records")
+    counts = target.import_records(Exporter.read_jsonl(io.StringIO(exported)))
+
+    assert counts == {'added': 3, 'updated': 0, 'unchanged': 0}
+    assert ''.join(Exporter.iter_jsonl(target.iter_records())) == exported
+
+    edited = exported.replace('"first"', '"first, edited"')
+    counts = target.import_records(Exporter.read_jsonl(io.StringIO(edited)))
+    assert counts == {'added': 0, 'updated': 1, 'unchanged': 2}
+
+
+def test_import_rejects_ids_that_are_not_record_ids(tmp_path):
+    """Test that an imported ID can't point the filename outside the records."""
+    target = Storage(tmp_path / "a" / "b" / "records")
+    line = '{"id": "../../escaped", "timestamp": "2024-11-01T09:00:00", "content": "pwn"}\n'
+    for records in (lambda: Exporter.read_jsonl(io.StringIO(line)),
+                    lambda: [Record("pwn", record_id="../../escaped")]):
+        try:
+            target.import_records(records())
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("invalid id was imported")
+    assert not list(tmp_path.rglob("escaped*"))
+    assert list(target.records_dir.glob("*.md")) == []
@@ -0,0 +1,68 @@
+"""Tests for grep module."""
+
+from datetime import datetime
+
+from diane import grep
+
+
+def _records(tmp_path):
+    records_dir = tmp_path / "records"
+    records_dir.mkdir()
+    return records_dir
+
+
+def test_matches_body_only_with_smart_case(tmp_path, write_record):
+    """Test that frontmatter is skipped and case follows the pattern."""
+    records_dir = _records(tmp_path)
+    upper = write_record(records_dir, "Call Alice about the budget", datetime(2024, 11, 1, 9, 0))
+    lower = write_record(records_dir, "alice sent the draft\nbudget: 120", datetime(2024, 11, 2, 9, 0))
+    (records_dir / "empty.md").write_bytes(b"")
+    names = sorted(p.name for p in records_dir.iterdir())
+
+    def found(pattern, **kwargs):
+        regex = grep.compile_pattern(pattern, **kwargs)
+        return set(grep.grep_names(records_dir, names, regex, workers=1))
+
+    assert found("alice") == {upper.name, lower.name}
+    assert found("Alice") == {upper.name}
+    assert found("^budget: \\d+$") == {lower.name}
+    assert found("sources|timestamp") == set()
+    assert found("café") == set()
+
+
+def test_parallel_scan_matches_serial(tmp_path, write_record, monkeypatch):
+    """Test that the process pool (over mapped files) returns the same names in order."""
+    records_dir = _records(tmp_path)
+    for day in range(1, 21):
+        write_record(records_dir, f"entry {day} {'even' if day % 2 == 0 else 'odd'}",
+                     datetime(2024, 11, day, 9, 0))
+    names = sorted(p.name for p in records_dir.iterdir())
+    regex = grep.compile_pattern(r"\beven\b")
+
+    serial = grep.grep_names(records_dir, names, regex, workers=1)
+    monkeypatch.setattr(grep, 'PARALLEL_THRESHOLD', 0)
+    monkeypatch.setattr(grep, 'CHUNK_SIZE', 3)
+    monkeypatch.setattr(grep, 'MMAP_THRESHOLD', 0)
+    parallel = grep.grep_names(records_dir, names, regex, workers=2)
+
+    assert len(serial) == 10
+    assert parallel == serial
+
+
+def test_classes_and_case_folding_cover_non_ascii(tmp_path, write_record):
+    """Test that ASCII patterns with classes, '.' or ignored case see non-ASCII text."""
+    records_dir = _records(tmp_path)
+    cafe = write_record(records_dir, "un café avec Émile", datetime(2024, 11, 1, 9, 0))
+    write_record(records_dir, "a cafe without accents", datetime(2024, 11, 2, 9, 0))
+    names = sorted(p.name for p in records_dir.iterdir())
+
+    def found(pattern, case_sensitive=None):
+        regex = grep.compile_pattern(pattern, case_sensitive)
+        return set(grep.grep_names(records_dir, names, regex, workers=1))
+
+    assert found(r"caf\w\b") == set(names)
+    assert found(r"caf[^e] ") == {cafe.name}
+    assert found("caf. avec") == {cafe.name}
+    assert found("(?i)AVEC émile") == {cafe.name}
+    assert isinstance(grep.compile_pattern("cafe", True).pattern, bytes)
+    assert isinstance(grep.compile_pattern("cafe").pattern, str)
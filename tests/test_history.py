@@ -0,0 +1,43 @@
+"""Tests for history module."""
+
+from datetime import datetime, timezone
+
+from diane.history import BACKUP_REF_PREFIX, compact_history, compaction_report, read_history
+
+
+def test_compact_history_squashes_days_and_keeps_tree(tmp_path, git):
+    """Test daily squashing before the cutoff, replay after it, and the backup ref."""
+    records_dir = tmp_path / 'records'
+    records_dir.mkdir()
+    git(records_dir, 'init', '-q')
+    start = int(datetime(2024, 3, 1, tzinfo=timezone.utc).timestamp())
+    # 4 commits a day over 3 days, then 2 recent ones
+    for i in range(14):
+        (records_dir / f'{i}.md').write_text(f'record {i}\n')
+        git(records_dir, 'add', f'{i}.md')
+        date = start + (i // 4) * 86400 + (i % 4) * 3600 if i < 12 else start + 30 * 86400 + i
+        git(records_dir, 'commit', '-q', '-m', f'Record: {i}.md', date=date)
+
+    head = git(records_dir, 'rev-parse', 'HEAD')
+    tree = git(records_dir, 'rev-parse', 'HEAD^{tree}')
+    cutoff = datetime(2024, 3, 10)
+
+    report = compaction_report(records_dir, cutoff)
+    assert (report['commits_before'], report['commits_after'], report['days']) == (14, 5, 3)
+    assert report['bytes_after'] < report['bytes_before']
+    assert git(records_dir, 'rev-parse', 'HEAD') == head  # dry run changes nothing
+
+    success, msg = compact_history(records_dir, cutoff)
+    assert success, msg
+    assert git(records_dir, 'rev-parse', 'HEAD^{tree}') == tree
+    assert git(records_dir, 'status', '--porcelain') == ''
+
+    commits = read_history(records_dir)
+    assert len(commits) == 5
+    assert commits[0].message.startswith('Records of 2024-03-01 (4 commits)')
+    assert [c.message.strip() for c in commits[3:]] == ['Record: 12.md', 'Record: 13.md']
+
+    backups = git(records_dir, 'for-each-ref', '--format=%(objectname) %(refname)', 'refs/diane/backup')
+    assert backups.startswith(f'{head} {BACKUP_REF_PREFIX}')
+
+    assert compact_history(records_dir, cutoff) == (True, "Nothing to compact")
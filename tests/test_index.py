@@ -0,0 +1,57 @@
+"""Tests for index module."""
+
+from datetime import datetime, timedelta
+
+from diane.durability import atomic_write
+from diane.index import TermIndex, load_index, tokenize
+from diane.record import datetime_to_us
+
+
+def test_bm25_ranking_and_recency(tmp_path, write_record):
+    """Test that term frequency, length and recency order the results."""
+    records_dir = tmp_path / "records"
+    records_dir.mkdir()
+    old = datetime(2024, 1, 1, 9, 0)
+    write_record(records_dir, "garden garden garden plans", old)
+    write_record(records_dir, "garden plans and a very long list of other unrelated words", old)
+    write_record(records_dir, "nothing relevant here", old)
+    recent = write_record(records_dir, "garden notes", old + timedelta(days=365))
+    stale = write_record(records_dir, "garden notes", old)
+
+    index = load_index(records_dir, tmp_path / "index" / "terms.sqlite")
+    now_us = datetime_to_us(old + timedelta(days=366))
+    results = index.rank("Garden", limit=10, now_us=now_us)
+
+    names = [name for name, _ in results]
+    assert len(names) == 4
+    assert names[0].endswith("garden-garden-garden.md")
+    assert names.index(recent.name) < names.index(stale.name)
+    assert len(index.rank("garden", limit=2, now_us=now_us)) == 2
+    assert index.rank("missing", now_us=now_us) == []
+
+
+def test_incremental_refresh(tmp_path, write_record):
+    """Test that only new, changed or deleted files touch the stored index."""
+    records_dir = tmp_path / "records"
+    records_dir.mkdir()
+    index_path = tmp_path / "index" / "terms.sqlite"
+    first = write_record(records_dir, "alpha beta", datetime(2024, 1, 1))
+    write_record(records_dir, "beta gamma", datetime(2024, 1, 2))
+    load_index(records_dir, index_path).close()
+
+    index = TermIndex(records_dir, index_path)
+    assert index.refresh() == 0
+
+    first.unlink()
+    added = write_record(records_dir, "delta", datetime(2024, 1, 3))
+    assert index.refresh() == 2
+    assert [name for name, _ in index.rank("delta alpha")] == [added.name]
+    assert index.db.execute("SELECT df FROM terms WHERE term = 'beta'").fetchone() == (1,)
+    assert index.db.execute("SELECT count(*) FROM terms WHERE term = 'alpha'").fetchone() == (0,)
+    assert tokenize("Delta, delta!") == ["delta", "delta"]
+
+    # Edits are written through a rename, which the listing stamp notices
+    atomic_write(added, added.read_text().replace("delta", "epsilon"))
+    assert index.refresh() == 1
+    assert [name for name, _ in index.rank("epsilon")] == [added.name]
+    index.close()
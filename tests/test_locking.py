@@ -0,0 +1,105 @@
+"""Tests for locking module."""
+
+from datetime import datetime
+from pathlib import Path
+import multiprocessing
+import os
+import subprocess
+
+import pytest
+
+from diane.config import config
+from diane.locking import PendingCommits, RepoLock
+from diane.record import Record
+from diane.storage import Storage
+
+
+@pytest.fixture
+def git_storage(tmp_path, git_identity) -> Storage:
+    """A Storage with git on, its lock timing out after 0.2s."""
+    config.use_git = True
+    storage = Storage(tmp_path / 'records')
+    config.lock_timeout = 0.2
+    return storage
+
+
+def _capture(records_dir: str, count: int) -> int:
+    # Forked: the config and git identity of the test carry over
+    storage = Storage(Path(records_dir))
+    for i in range(count):
+        storage.save(Record(f"capture {os.getpid()} {i}"))
+    return count
+
+
+def _tracked(records_dir: Path) -> set:
+    output = subprocess.run(['git', 'ls-files', '*.md'], cwd=records_dir,
+                            check=True, capture_output=True, text=True).stdout
+    return set(output.split())
+
+
+def test_parallel_captures_all_committed(tmp_path, git_identity):
+    """Test N processes capturing at once: every record ends up committed."""
+    records_dir = tmp_path / 'records'
+    config.use_git = True
+    Storage(records_dir)
+
+    processes, per_process = 6, 15
+    with multiprocessing.get_context('fork').Pool(processes) as pool:
+        saved_count = sum(pool.starmap(_capture, [(str(records_dir), per_process)] * processes))
+    assert saved_count == processes * per_process
+
+    on_disk = {path.name for path in records_dir.glob('*.md')}
+    assert len(on_disk) == processes * per_process
+    # Anything left pending is committed by the next Storage
+    Storage(records_dir)
+    assert _tracked(records_dir) == on_disk
+    assert not PendingCommits(records_dir)
+    status = subprocess.run(['git', 'status', '--porcelain'], cwd=records_dir,
+                            capture_output=True, text=True).stdout
+    assert status == ''
+
+
+def test_lock_timeout_leaves_commit_pending(git_storage):
+    """Test that a capture blocked on the lock is committed by the next one."""
+    storage = git_storage
+    holder = RepoLock(storage.records_dir)
+    assert holder.acquire()
+    try:
+        # Waiters queue behind the holder and give up after the timeout
+        assert not RepoLock(storage.records_dir).acquire()
+        first = storage.save(Record("while locked"))
+    finally:
+        holder.release()
+
+    assert first.name not in _tracked(storage.records_dir)
+    assert storage.pending
+
+    second = storage.save(Record("after the lock"))
+    assert {first.name, second.name} <= _tracked(storage.records_dir)
+    assert not storage.pending
+    assert not list((storage.records_dir / '.git' / 'diane-lock').iterdir())
+
+
+def test_pack_blocked_on_lock_commits_deletions_later(git_storage):
+    """Test that a pack that can't take the lock leaves its deletions pending."""
+    storage = git_storage
+    old = storage.save(Record("old note", timestamp=datetime(2020, 3, 1, 9, 0)))
+
+    holder = RepoLock(storage.records_dir)
+    assert holder.acquire()
+    try:
+        assert storage.pack(older_than_days=30) == {"2020-03": 1}
+    finally:
+        holder.release()
+
+    assert old.name in _tracked(storage.records_dir)
+    assert old.name in PendingCommits(storage.records_dir).take()
+    PendingCommits(storage.records_dir).add(['packs', old.name])
+
+    # A pending path git never tracked (deleted before its commit) is dropped
+    PendingCommits(storage.records_dir).add(['never-committed.md'])
+    assert storage.commit_pending()
+    assert old.name not in _tracked(storage.records_dir)
+    status = subprocess.run(['git', 'status', '--porcelain'], cwd=storage.records_dir,
+                            check=True, capture_output=True, text=True).stdout
+    assert status == ''
@@ -0,0 +1,36 @@
+"""Tests for maintenance module."""
+
+from diane.config import config
+from diane.maintenance import Maintenance
+
+
+def test_maintenance_thresholds_and_timings(tmp_path, git):
+    """Test that growth is tracked and task timings are recorded."""
+    records_dir = tmp_path / 'records'
+    records_dir.mkdir()
+    git(records_dir, 'init', '-q')
+    for i in range(3):
+        (records_dir / f'{i}.md').write_text(f'record {i}\n')
+        git(records_dir, 'add', f'{i}.md')
+        git(records_dir, 'commit', '-q', '-m', str(i))
+
+    config.maintenance = True
+    config.maintenance_commits = 3
+    maintenance = Maintenance(records_dir)
+    maintenance.spawn = lambda: False  # run in-process below instead
+
+    maintenance.note_commit(2)
+    assert 'commit-graph' not in maintenance.due_tasks()
+    maintenance.note_commit()
+    assert 'commit-graph' in maintenance.due_tasks()
+
+    results = maintenance.run()
+    assert results['commit-graph']['ok']
+    assert maintenance.run(['loose-objects'])['loose-objects']['ok']
+    assert maintenance.pack_count() >= 1
+
+    status = maintenance.status()
+    assert status['commits'] == 0
+    assert 'commit-graph' not in status['due']
+    assert set(status['tasks']) >= {'commit-graph', 'loose-objects'}
+    assert not status['running']
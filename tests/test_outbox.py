@@ -0,0 +1,76 @@
+"""Tests for outbox module."""
+
+import time
+
+import pytest
+
+from diane.config import config
+from diane.outbox import SyncOutbox
+from diane.record import Record
+from diane.storage import Storage
+from diane.sync import GitSync
+
+
+@pytest.fixture
+def device(tmp_path, remote):
+    """The remote and a blobful clone of it holding one record."""
+    bare = remote(1)
+    device = GitSync(tmp_path / 'device')
+    assert device.clone(str(bare), blobless=False)[0]
+    return bare, device
+
+
+@pytest.fixture
+def commit(git):
+    """Commit a new record file."""
+    def add(records_dir, name: str) -> None:
+        (records_dir / name).write_text(f'{name}\n')
+        git(records_dir, 'add', name)
+        git(records_dir, 'commit', '-q', '-m', f'Record: {name}')
+    return add
+
+
+def test_requests_coalesce_into_one_sync(device, commit, git):
+    """Test that queued requests are answered by a single sync and then removed."""
+    bare, device = device
+    outbox = SyncOutbox(device.records_dir)
+    outbox.spawn = lambda: False  # drained in-process below
+    syncs = []
+    sync = outbox._sync
+    outbox._sync = lambda: syncs.append(1) or sync()
+
+    for i in range(5):
+        commit(device.records_dir, f'{i}.md')
+        assert outbox.request()
+    assert len(outbox.pending()) == 5
+
+    assert outbox.drain(retry_delays=()) == (True, "Smart sync completed (fast path)")
+    assert len(syncs) == 1
+    assert outbox.pending() == []
+    assert outbox.status()['last']['requests'] == 5
+    assert git(bare, 'rev-parse', 'HEAD') == git(device.records_dir, 'rev-parse', 'HEAD')
+
+
+def test_detached_worker_completes_after_requester_returns(device, commit, git):
+    """Test that the spawned worker process runs the sync on its own."""
+    bare, device = device
+    commit(device.records_dir, 'new.md')
+
+    outbox = SyncOutbox(device.records_dir)
+    assert outbox.request()
+
+    head = git(device.records_dir, 'rev-parse', 'HEAD')
+    deadline = time.time() + 20
+    while time.time() < deadline and (outbox.pending() or outbox.is_running()):
+        time.sleep(0.1)
+    assert outbox.pending() == []
+    assert git(bare, 'rev-parse', 'HEAD') == head
+
+
+def test_auto_sync_without_remote_queues_nothing(tmp_path, git_identity):
+    """Test that captures don't queue syncs (or start workers) with no remote."""
+    config.use_git, config.auto_sync = True, True
+    storage = Storage(tmp_path / 'records')
+    storage.save(Record("no remote yet"))
+    outbox = SyncOutbox(storage.records_dir)
+    assert outbox.pending() == [] and not outbox.is_running()
@@ -0,0 +1,56 @@
+"""Tests for packs module."""
+
+from datetime import datetime
+
+from diane.index import TermIndex
+from diane.packs import PACKS_DIR
+from diane.record import Record
+from diane.storage import Storage
+
+
+def test_packed_records_read_transparently(storage, tmp_path):
+    """Test that packing moves old records out of sight but not out of reach."""
+    storage.save(Record("old march note", timestamp=datetime(2020, 3, 1, 9, 0)))
+    storage.save(Record("old april note", timestamp=datetime(2020, 4, 1, 9, 0)))
+    storage.save(Record("fresh note", timestamp=datetime.now()))
+
+    index = TermIndex(storage.records_dir, tmp_path / "terms.sqlite")
+    index.refresh()
+
+    assert storage.pack(older_than_days=30, dry_run=True) == {"2020-03": 1, "2020-04": 1}
+    assert len(list(storage.records_dir.glob("*.md"))) == 3
+
+    assert storage.pack(older_than_days=30) == {"2020-03": 1, "2020-04": 1}
+    assert len(list(storage.records_dir.glob("*.md"))) == 1
+    assert len(list((storage.records_dir / PACKS_DIR).glob("*.pack"))) == 2
+
+    # A fresh Storage sees packed and loose records alike
+    storage = Storage(storage.records_dir)
+    assert [r.content for r in storage.list_records()] == [
+        "fresh note", "old april note", "old march note"
+    ]
+    assert [r.content for r in storage.regex_search("old")] == [
+        "old april note", "old march note"
+    ]
+    assert len(storage.list_records(until=datetime(2020, 3, 31))) == 1
+
+    # Packing keeps mtime and size, so the search index sees no change
+    assert index.refresh() == 0
+
+
+def test_pack_appends_and_loose_copies_shadow(storage):
+    """Test packing into an existing month and editing a packed record."""
+    first = Record("first", timestamp=datetime(2020, 3, 1, 9, 0))
+    storage.save(first)
+    storage.pack(older_than_days=30)
+    storage.save(Record("second", timestamp=datetime(2020, 3, 2, 9, 0)))
+    assert storage.pack(older_than_days=30) == {"2020-03": 1}
+
+    storage = Storage(storage.records_dir)
+    assert [r.content for r in storage.list_records()] == ["second", "first"]
+
+    # Re-importing an edited record writes a loose copy that wins
+    first.content = "first, edited"
+    assert storage.import_records([first])["updated"] == 1
+    storage = Storage(storage.records_dir)
+    assert [r.content for r in storage.list_records()] == ["second", "first, edited"]
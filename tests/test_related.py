@@ -0,0 +1,36 @@
+"""Tests for related module."""
+
+from diane.record import Record
+from diane.related import RelatedIndex
+
+NOTES = [
+    "Plant tomatoes and basil along the south fence of the garden",
+    "Quarterly budget review with finance on Thursday",
+    "The garden fence needs repair before the tomatoes go in",
+    "Book flights for the conference in Lisbon",
+    "Water the basil and tomatoes every morning in the garden",
+]
+
+
+def test_related_records_by_tfidf(storage):
+    """Test ranking by shared rare terms, incremental saves and removals."""
+    paths = [storage.save(Record(text)) for text in NOTES]
+
+    assert storage.find_name(paths[0].name[:20]) is None  # ambiguous prefix
+    assert storage.find_name(paths[0].name) == paths[0].name
+    assert storage.find_name(paths[0].stem[:33]) == paths[0].name
+
+    results = storage.related(paths[0].name)
+    assert [record.content for record, _ in results[:2]] == [NOTES[4], NOTES[2]]
+    assert all(NOTES[1] != record.content for record, _ in results)
+    assert all(0 < score <= 1 for _, score in results)
+
+    # Once built, the index is updated on save: no refresh needed
+    new = storage.save(Record("Basil pesto: basil, garlic, pine nuts from the garden"))
+    index = RelatedIndex(storage.records_dir, storage._index_path('related.sqlite'))
+    assert new.name in [name for name, _ in index.related(paths[0].name)]
+    index.close()
+
+    paths[4].unlink()
+    names = [record.content for record, _ in storage.related(paths[0].name)]
+    assert NOTES[4] not in names and NOTES[2] in names
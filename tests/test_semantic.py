@@ -0,0 +1,75 @@
+"""Tests for semantic module."""
+
+import math
+
+from diane import semantic
+from diane.config import config
+from diane.record import Record
+from diane.semantic import HashingEmbedder, SemanticIndex, get_embedder
+
+NOTES = [
+    "Meeting notes: the quarterly budget review moved to Thursday",
+    "Plant tomatoes and basil along the south fence of the garden",
+    "Book flights for the conference in Lisbon",
+    "Groceries: oat milk, coffee beans, lemons",
+]
+
+
+def test_hashing_embedder_is_unit_length_and_matches_word_forms():
+    """Test the model-free fallback embedder."""
+    embedder = HashingEmbedder('128')
+    a, b, c = embedder.embed(["budget meetings", "the budget meeting", "tomatoes in the garden"])
+    assert len(a) == 128 and math.isclose(sum(x * x for x in a), 1.0, rel_tol=1e-9)
+    assert sum(x * y for x, y in zip(a, b)) > sum(x * y for x, y in zip(a, c))
+    assert get_embedder('nonexistent-backend:model').name == 'hashing'
+
+
+def test_semantic_search_incremental_and_lsh(storage, monkeypatch):
+    """Test search, incremental embedding, the LSH path, compaction and the worker."""
+    config.embed_model = 'hashing:256'
+    monkeypatch.setattr(SemanticIndex, 'spawn', lambda self: False)  # run in-process below instead
+    monkeypatch.setattr(semantic, '_embedders', {})
+    paths = [storage.save(Record(text)) for text in NOTES]
+
+    results = storage.semantic_search("budget meetings", limit=2)
+    assert results[0][0].content == NOTES[0]
+    assert -1 <= results[1][1] <= results[0][1] <= 1
+
+    index = storage._semantic_index()
+    assert index.refresh() == 0  # nothing new
+    new_text = "Water the garden basil every morning"
+    new = storage.save(Record(new_text))
+    assert index.load_meta()['rows'] == len(NOTES)  # capture doesn't embed
+    assert semantic.main([str(storage.records_dir), str(index.directory)]) == 0
+    assert index.load_meta()['rows'] == len(NOTES) + 1
+
+    # Above EXACT_LIMIT, candidates come from the sorted LSH keys
+    monkeypatch.setattr(semantic, 'EXACT_LIMIT', 0)
+    index._sort_lsh(index.load_meta())
+    assert [name for name, _ in index.search(NOTES[1], limit=1)] == [paths[1].name]
+    assert [name for name, _ in index.search(new_text, limit=1)] == [new.name]
+    # Rows added since the keys were sorted are always scored; the worker
+    # leaves them unsorted until LSH_TAIL pile up, --full sorts them all
+    tail = storage.save(Record("Prune the basil in the garden"))
+    worker = [str(storage.records_dir), str(index.directory)]
+    assert semantic.main(worker) == 0
+    assert index.load_meta()['lsh_rows'] == len(NOTES) + 1
+    assert tail.name in [name for name, _ in index.search("basil garden", limit=2)]
+    assert semantic.main(worker + ['--full']) == 0
+    assert index.load_meta()['lsh_rows'] == index.load_meta()['rows'] == len(NOTES) + 2
+    assert tail.name in [name for name, _ in index.search("basil garden", limit=2)]
+
+    # Removed records are dropped (compacted into a new generation)
+    gen = index.load_meta()['gen']
+    paths[2].unlink()
+    index.refresh()
+    meta = index.load_meta()
+    assert meta['gen'] == gen + 1 and meta['rows'] == len(NOTES) + 1
+    assert paths[2].name not in [name for name, _ in index.search(NOTES[2], limit=5)]
+    assert sorted(p.name for p in index.directory.glob(f'*-{gen}.*')) == []
+
+    # Another backend (or dimension) rebuilds from scratch
+    config.embed_model = 'hashing:64'
+    semantic._embedders.clear()
+    assert storage.semantic_search(NOTES[3], limit=1)[0][0].content == NOTES[3]
+    assert storage._semantic_index().load_meta()['dim'] == 64
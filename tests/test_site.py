@@ -0,0 +1,49 @@
+"""Tests for site module."""
+
+from datetime import datetime
+
+from diane import site
+from diane.record import Record
+
+
+def test_incremental_rebuild(tmp_path, write_record):
+    """Test that reruns only render the pages whose records changed."""
+    records_dir = tmp_path / "records"
+    output_dir = tmp_path / "site"
+    records_dir.mkdir()
+    write_record(records_dir, "first <b>note</b>", datetime(2024, 10, 30, 9, 0))
+    old = write_record(records_dir, "second note", datetime(2024, 11, 1, 9, 0))
+
+    assert site.build_site(records_dir, output_dir, workers=1) == \
+        {'rendered': 5, 'unchanged': 0, 'removed': 0}
+    assert site.build_site(records_dir, output_dir, workers=1)['rendered'] == 0
+
+    new = write_record(records_dir, "third note", datetime(2024, 11, 1, 18, 0))
+    assert site.build_site(records_dir, output_dir, workers=1) == \
+        {'rendered': 3, 'unchanged': 2, 'removed': 0}
+
+    day_page = (output_dir / "days" / "2024-11-01.html").read_text()
+    assert f'id="{Record.from_file(new).id}"' in day_page
+    assert day_page.index("third note") < day_page.index("second note")
+    assert "&lt;b&gt;note&lt;/b&gt;" in (output_dir / "days" / "2024-10-30.html").read_text()
+
+    old.unlink()
+    new.unlink()
+    result = site.build_site(records_dir, output_dir, workers=1)
+    assert result['removed'] == 2
+    assert not (output_dir / "months" / "2024-11.html").exists()
+
+
+def test_parallel_render_matches_serial(tmp_path, write_record, monkeypatch):
+    """Test that day pages rendered on the process pool are identical."""
+    records_dir = tmp_path / "records"
+    records_dir.mkdir()
+    for day in range(1, 6):
+        write_record(records_dir, f"day {day}", datetime(2024, 11, day, 9, 0))
+
+    site.build_site(records_dir, tmp_path / "serial", workers=1)
+    monkeypatch.setattr(site, 'PARALLEL_THRESHOLD', 0)
+    site.build_site(records_dir, tmp_path / "parallel", workers=2)
+
+    for page in (tmp_path / "serial" / "days").iterdir():
+        assert page.read_text() == (tmp_path / "parallel" / "days" / page.name).read_text()
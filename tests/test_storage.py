@@ -0,0 +1,147 @@
+"""Tests for storage module."""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import subprocess
+
+from diane.config import config
+from diane.record import Record
+from diane.storage import Storage
+
+
+def test_same_second_captures_do_not_overwrite(storage):
+    """Test that identical captures in the same second get distinct files."""
+    moment = datetime(2024, 11, 6, 13, 30, 45)
+
+    paths = {storage.save(Record("same text", timestamp=moment)) for _ in range(3)}
+
+    assert len(paths) == 3
+    assert len(list(storage.records_dir.glob('*.md'))) == 3
+
+
+def test_concurrent_capture_stress(storage):
+    """Test thousands of parallel captures with zero loss and ID order."""
+    workers, per_worker = 8, 250
+
+    def capture(worker):
+        return [storage.save(Record(f"clipboard {worker}")).name
+                for _ in range(per_worker)]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        names = [name for batch in pool.map(capture, range(workers)) for name in batch]
+
+    assert len(set(names)) == workers * per_worker
+    assert len(list(storage.records_dir.glob('*.md'))) == workers * per_worker
+
+    records = storage.list_records()
+    timestamps = [r.timestamp for r in records]
+    assert timestamps == sorted(timestamps, reverse=True)
+
+
+def test_legacy_record_parses_with_filename_id(tmp_path):
+    """Test records written before IDs existed."""
+    filepath = tmp_path / "2024-11-06--13-30-45--meeting.md"
+    filepath.write_text("---\ntimestamp: 2024-11-06 13:30\nsources: [stdin]\n---\n\nMeeting\n")
+
+    record = Record.from_file(filepath)
+
+    assert record.id == "2024-11-06--13-30-45"
+    assert record.timestamp == datetime(2024, 11, 6, 13, 30)
+
+
+def test_record_id_round_trip(storage):
+    """Test that the ID and its microsecond timestamp survive a save/load."""
+    record = Record("precise capture")
+
+    loaded = Record.from_file(storage.save(record))
+
+    assert loaded.id == record.id
+    assert loaded.timestamp == record.timestamp
+
+
+def test_iter_records_streams_into_statistics(storage):
+    """Test that stats computed from the record stream match the full list."""
+    from diane.stats import Statistics
+
+    for day in range(1, 6):
+        storage.save(Record(f"entry number {day}", timestamp=datetime(2024, 11, day, 9, 0)))
+
+    records = storage.iter_records()
+    assert next(records).content == "entry number 5"
+
+    assert [r.id for r in storage.iter_records(limit=2)] == \
+        [r.id for r in storage.list_records()[:2]]
+    assert Statistics(storage.iter_records()).summary() == \
+        Statistics(storage.list_records()).summary()
+    assert [r.content for r in storage.iter_search("NUMBER 3")] == ["entry number 3"]
+
+
+def test_cursor_pagination(storage):
+    """Test offset/before/until seeks against the ID-sorted listing."""
+    for day in range(1, 8):
+        storage.save(Record(f"day {day}", timestamp=datetime(2024, 11, day, 9, 0)))
+
+    first_page = storage.list_records(limit=3)
+    assert [r.content for r in first_page] == ["day 7", "day 6", "day 5"]
+
+    next_page = storage.list_records(limit=3, before=first_page[-1].id)
+    assert [r.content for r in next_page] == ["day 4", "day 3", "day 2"]
+    assert [r.content for r in storage.list_records(limit=3, offset=3)] == \
+        [r.content for r in next_page]
+
+    bounded = storage.list_records(
+        since=datetime(2024, 11, 2), until=datetime(2024, 11, 4, 9, 0)
+    )
+    assert [r.content for r in bounded] == ["day 4", "day 3", "day 2"]
+
+
+def test_date_range_from_filenames(storage, monkeypatch):
+    """Test that ranges are cut from filenames and only those files are opened."""
+    from diane.storage import id_range
+
+    names = sorted([
+        "2024-11-05--23-59-59-999999-aaaa--late.md",
+        "2024-11-06--00-00-00--legacy.md",
+        "2024-11-06--00-00-00-000001-aaaa--early.md",
+        "2024-11-06--12-00-00-000000-bbbb.md",
+        "2024-11-07--00-00-00-000000-aaaa--next.md",
+    ])
+    day = datetime(2024, 11, 6)
+    end_of_day = datetime(2024, 11, 6, 23, 59, 59, 999999)
+
+    lo, hi = id_range(names, since=day, until=end_of_day)
+    assert names[lo:hi] == names[1:4]
+    lo, hi = id_range(names, since=datetime(2024, 11, 6, 0, 0, 0, 1))
+    assert names[lo:hi] == names[2:]
+    lo, hi = id_range(names, until=day)
+    assert names[lo:hi] == names[:2]
+
+    for hour in range(10):
+        storage.save(Record(f"hour {hour}", timestamp=datetime(2024, 11, 6, hour, 30)))
+
+    from_text = Record.__dict__['from_text']
+    opened = []
+    monkeypatch.setattr(Record, 'from_text', classmethod(
+        lambda cls, text, name: opened.append(name) or from_text.__func__(cls, text, name)
+    ))
+    records = storage.list_records(
+        since=datetime(2024, 11, 6, 3), until=datetime(2024, 11, 6, 5, 30)
+    )
+
+    assert [r.content for r in records] == ["hour 5", "hour 4", "hour 3"]
+    assert len(opened) == 3
+
+
+def test_transcribed_file_outside_records_is_not_committed(tmp_path, git_identity):
+    """Test saving a record whose audio is the user's own file, with git on."""
+    config.use_git = True
+    storage = Storage(tmp_path / "records")
+    memo = tmp_path / "memo.ogg"
+    memo.write_bytes(b"OggS")
+
+    path = storage.save(Record("from a file", sources=["audio-file"], audio_file=str(memo)))
+
+    tracked = subprocess.run(['git', 'ls-files'], cwd=storage.records_dir,
+                             check=True, capture_output=True, text=True).stdout
+    assert path.name in tracked.split() and memo.name not in tracked
+    assert memo.exists()
@@ -0,0 +1,115 @@
+"""Tests for sync module."""
+
+from diane.config import config
+from diane.sync import GitSync
+
+
+def test_clone_blobless_and_shallow(tmp_path, git, remote):
+    """Test bootstrapping a device with a partial clone and deepening a shallow one."""
+    bare = remote(5)
+
+    blobless = GitSync(tmp_path / 'blobless' / 'records')
+    success, msg = blobless.clone(str(bare))
+    assert success, msg
+    assert len(list(blobless.records_dir.glob('*.md'))) == 5
+    assert git(blobless.records_dir, 'config', 'remote.origin.promisor') == 'true'
+    assert git(blobless.records_dir, 'config', 'commit.gpgsign') == 'false'
+    assert not blobless.is_shallow()
+
+    # Never over an existing repository
+    assert not blobless.clone(str(bare))[0]
+
+    shallow = GitSync(tmp_path / 'shallow' / 'records')
+    success, msg = shallow.clone(str(bare), depth=1)
+    assert success, msg
+    assert shallow.is_shallow()
+    assert shallow.status()['shallow']
+    assert len(list(shallow.records_dir.glob('*.md'))) == 5
+    assert git(shallow.records_dir, 'rev-list', '--count', 'HEAD') == '1'
+
+    assert shallow.deepen(2)[0]
+    assert git(shallow.records_dir, 'rev-list', '--count', 'HEAD') == '3'
+    assert shallow.deepen()[0]
+    assert not shallow.is_shallow()
+    assert git(shallow.records_dir, 'rev-list', '--count', 'HEAD') == '5'
+
+
+def test_disjoint_sync_merges_without_rebase(tmp_path, git, remote):
+    """Test the fast path for new records on both sides, and the fallback on overlap."""
+    bare = remote(2)
+    laptop = GitSync(tmp_path / 'laptop')
+    phone = GitSync(tmp_path / 'phone')
+    assert laptop.clone(str(bare), blobless=False)[0]
+    assert phone.clone(str(bare), blobless=False)[0]
+
+    (laptop.records_dir / 'laptop.md').write_text('from the laptop\n')
+    git(laptop.records_dir, 'add', 'laptop.md')
+    git(laptop.records_dir, 'commit', '-q', '-m', 'Record: laptop.md')
+    assert laptop._do_smart_sync() == (True, "Smart sync completed (fast path)")
+
+    (phone.records_dir / 'phone.md').write_text('from the phone\n')
+    git(phone.records_dir, 'add', 'phone.md')
+    git(phone.records_dir, 'commit', '-q', '-m', 'Record: phone.md')
+    assert phone._do_smart_sync() == (True, "Smart sync completed (fast path)")
+    assert (phone.records_dir / 'laptop.md').read_text() == 'from the laptop\n'
+    assert git(phone.records_dir, 'status', '--porcelain') == ''
+    assert git(phone.records_dir, 'rev-parse', 'HEAD') == git(bare, 'rev-parse', 'HEAD')
+
+    # Fast-forward on the laptop
+    assert laptop._do_smart_sync() == (True, "Smart sync completed (fast path)")
+    assert (laptop.records_dir / 'phone.md').exists()
+    assert git(laptop.records_dir, 'status', '--porcelain') == ''
+
+    # Both sides edit the same record: the rebase path has to handle it
+    for device, text in ((laptop, 'laptop edit\n'), (phone, 'phone edit\n')):
+        (device.records_dir / '0.md').write_text(text)
+        git(device.records_dir, 'commit', '-q', '-am', 'Edit 0.md')
+    assert laptop._do_smart_sync()[0]
+    git(phone.records_dir, 'fetch', '-q', 'origin')
+    assert phone._disjoint_sync(phone._current_branch()) is None
+
+
+def test_replicate_to_several_remotes(tmp_path, git, remote):
+    """Test concurrent replication with push-only, slow and unreachable remotes."""
+    hub = remote(2)
+    backup = tmp_path / 'backup.git'
+    slow = tmp_path / 'slow.git'
+    git(tmp_path, 'init', '-q', '--bare', str(backup))
+    git(tmp_path, 'init', '-q', '--bare', str(slow))
+
+    laptop = GitSync(tmp_path / 'laptop')
+    assert laptop.clone(str(hub), blobless=False)[0]
+    assert laptop.set_remote(str(backup), name='backup', policy='push')[0]
+    assert laptop.set_remote(str(slow), name='slow', policy='push')[0]
+    assert laptop.set_remote(str(tmp_path / 'missing.git'), name='offline')[0]
+    git(laptop.records_dir, 'config', 'remote.slow.receivepack', 'sleep 5; git-receive-pack')
+    assert laptop.remotes()['backup'] == {'url': str(backup), 'policy': 'push'}
+    assert laptop.remotes()['offline']['policy'] == 'sync'
+
+    # Another device adds a record to the hub
+    seed = tmp_path / 'seed'
+    (seed / 'phone.md').write_text('from the phone\n')
+    git(seed, 'add', 'phone.md')
+    git(seed, 'commit', '-q', '-m', 'Record: phone.md')
+    git(seed, 'push', '-q', 'origin', 'HEAD')
+
+    (laptop.records_dir / 'laptop.md').write_text('from the laptop\n')
+    git(laptop.records_dir, 'add', 'laptop.md')
+    git(laptop.records_dir, 'commit', '-q', '-m', 'Record: laptop.md')
+
+    config.sync_timeout = 2
+    results = laptop.replicate()
+    assert results['origin'][:2] == (True, "Pushed")
+    assert results['backup'][:2] == (True, "Pushed")
+    assert not results['offline'][0] and results['offline'][1].startswith('Fetch failed')
+    assert not results['slow'][0] and 'Timed out' in results['slow'][1]
+    assert results['slow'][2] < 4
+
+    assert (laptop.records_dir / 'phone.md').exists()
+    head = git(laptop.records_dir, 'rev-parse', 'HEAD')
+    assert git(hub, 'rev-parse', 'HEAD') == head
+    assert git(backup, 'rev-parse', 'HEAD') == head
+
+    status = laptop.remote_status()
+    assert status['backup']['ahead'] == 0 and status['backup']['last']['ok']
+    assert status['offline']['ahead'] is None and not status['offline']['last']['ok']
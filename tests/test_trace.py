@@ -0,0 +1,48 @@
+"""Tests for trace module."""
+
+from pathlib import Path
+import sys
+
+from diane import trace
+
+
+def test_spans_are_written_and_summarized(tmp_path, monkeypatch):
+    """Test recording nested spans, subprocess spans and summarizing them."""
+    path = tmp_path / "trace.jsonl"
+    tracer = trace.Tracer()
+    tracer.enable(path)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(trace, 'tracer', tracer)
+        with trace.span('storage.parse', op='list') as attrs:
+            trace.run([sys.executable, '-c', 'pass'], check=True)
+            attrs['records'] = 3
+
+    tracer.flush()
+
+    rows = {row['name']: row for row in trace.summarize(path)}
+    assert rows['storage.parse']['count'] == 1
+    assert Path(sys.executable).name in rows
+    assert len(path.read_text().splitlines()) == 2
+
+
+def test_disabled_tracer_records_nothing():
+    """Test that spans are no-ops unless tracing is enabled."""
+    tracer = trace.Tracer()
+    with tracer.span('noop'):
+        pass
+    assert tracer.spans == []
+
+
+def test_clean_exit_is_not_an_error():
+    """Test that a command span ending in SystemExit(0) is not marked failed."""
+    tracer = trace.Tracer()
+    tracer.enabled = True
+    for code in (0, 2):
+        try:
+            with tracer.span('command'):
+                sys.exit(code)
+        except SystemExit:
+            pass
+    assert 'error' not in tracer.spans[0]['attrs']
+    assert tracer.spans[1]['attrs'] == {'error': 'SystemExit', 'exit_code': 2}